@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib import admin
-from .models import Book, Category, Recommendation
+from .models import Book, Category, Recommendation, RecommendationJob
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -20,4 +20,10 @@ class BookAdmin(admin.ModelAdmin):
 
 @admin.register(Recommendation)
 class RecommendationAdmin(admin.ModelAdmin):
-    list_display = ('user', 'book', 'created_at')
\ No newline at end of file
+    list_display = ('user', 'book', 'created_at')
+
+@admin.register(RecommendationJob)
+class RecommendationJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'status', 'attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
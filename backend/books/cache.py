@@ -0,0 +1,146 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# 프로세스 메모리 캐시 (TTL + LRU + stale-while-revalidate)
+# 이름으로 등록해두면 cache_stats()로 한 번에 적중률을 볼 수 있다.
+
+MISSING = object()
+# 도서가 추가/수정/삭제될 때 갱신하는 버전 표시 이름 (자동완성 인덱스 등 도서 메모리 인덱스가 확인)
+BOOKS_VERSION = 'books_version'
+# 찜/소장/채팅이 바뀔 때 갱신하는 버전 표시 이름 (동시 출현 행렬이 확인)
+COOCCURRENCE_VERSION = 'cooccurrence_version'
+_registry = {}
+
+
+class TTLCache:
+    """
+    - ttl 안의 값은 그대로 반환 (hit)
+    - ttl은 지났지만 stale_ttl 안이면 오래된 값을 즉시 반환하고 백그라운드에서 갱신 (stale hit)
+    - 그 이후이거나 없으면 MISSING (miss) → 호출자가 직접 조회 후 set
+    - maxsize를 넘으면 가장 오래 쓰지 않은 항목부터 제거 (LRU)
+    """
+
+    def __init__(self, name, ttl, stale_ttl=0, maxsize=1024, executor=None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.executor = executor
+        self._data = OrderedDict()  # key -> (저장 시각, 값)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "evictions": 0}
+        _registry[name] = self
+
+    def get(self, key, loader=None):
+        """캐시 값 조회. stale이면 loader(key)로 백그라운드 갱신을 1회만 예약"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return MISSING
+            stored_at, value = entry
+            age = now - stored_at
+            if age <= self.ttl:
+                self._data.move_to_end(key)
+                self._counters["hits"] += 1
+                return value
+            if age > self.ttl + self.stale_ttl:
+                del self._data[key]
+                self._counters["misses"] += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self._counters["stale_hits"] += 1
+            schedule = loader is not None and key not in self._refreshing
+            if schedule:
+                self._refreshing.add(key)
+
+        if schedule:
+            self._schedule_refresh(key, loader)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, key=MISSING):
+        with self._lock:
+            if key is MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def _schedule_refresh(self, key, loader):
+        def refresh():
+            try:
+                self.set(key, loader(key))
+                with self._lock:
+                    self._counters["refreshes"] += 1
+            except Exception as e:
+                # 갱신 실패 시 기존 stale 값을 유지 (만료되면 자연히 miss 처리)
+                print(f"⚠️ 캐시 갱신 실패({self.name} {key}): {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        if self.executor is not None:
+            self.executor.submit(refresh)
+        else:
+            threading.Thread(target=refresh, daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["stale_hits"] + self._counters["misses"]
+            served = self._counters["hits"] + self._counters["stale_hits"]
+            return {
+                **self._counters,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            }
+
+
+def cache_stats():
+    """등록된 모든 캐시의 적중/미스 카운터"""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+class SharedVersion:
+    """
+    프로세스 간 메모리 인덱스 무효화용 버전 표시 (SyncState 행 1개)
+    데이터를 바꾼 프로세스(수집 커맨드 등)가 bump()하면, 인덱스를 가진 다른 프로세스(웹 서버/워커)는
+    조회 중 changed()로 check_interval마다 한 번 DB의 버전을 확인해 다시 빌드한다.
+    """
+
+    def __init__(self, name, check_interval=30):
+        self.name = name
+        self.check_interval = check_interval
+        self._built_version = None
+        self._checked_at = 0.0
+
+    def current(self):
+        from .models import SyncState
+        return SyncState.load(self.name).get('version')
+
+    def bump(self):
+        from .models import SyncState
+        SyncState.save_value(self.name, {'version': uuid.uuid4().hex})
+
+    def mark_built(self, version):
+        """빌드 직전에 읽은 버전 기록 (빌드 도중 bump된 변경은 다음 확인 때 잡힌다)"""
+        self._built_version = version
+        self._checked_at = time.monotonic()
+
+    def changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        return self.current() != self._built_version
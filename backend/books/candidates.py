@@ -0,0 +1,187 @@
+import math
+import threading
+
+import numpy as np
+
+from .cache import BOOKS_VERSION, SharedVersion
+
+# AI 추천 후보 도서 풀 (카테고리별 메모리 배열)
+# 카테고리마다 후보 도서 id 배열과 인기도 가중치의 누적합 배열을 들고 있다가,
+# 난수 k개를 누적합에서 searchsorted로 찾아 가중 무작위 추출한다. (ORDER BY RANDOM() 전체 정렬 없음)
+# 도서가 바뀌면 해당 카테고리만 dirty로 표시하고 다음 추출 때 그 카테고리 배열만 다시 만든다.
+# 다른 프로세스(웹 서버/수집 커맨드)에서 바뀐 도서는 DB의 버전 표시를 보고 풀 전체를 다시 만든다 (추천 워커용).
+
+ALL = None  # 전체 카테고리를 합친 풀의 키 (선호 카테고리가 없는 사용자용)
+
+
+def popularity_weight(loan_count):
+    """대출 건수가 많을수록 자주 뽑히되 한두 권이 독식하지 않도록 로그 스케일"""
+    return 1.0 + math.log1p(max(loan_count or 0, 0))
+
+
+def is_eligible(book):
+    # 프롬프트에 카테고리명과 줄거리를 넣으므로 둘 다 있는 도서만 후보
+    return book.category_id is not None and book.description is not None
+
+
+class CandidatePool:
+    """카테고리별 가중 후보 풀 (스레드 안전)"""
+
+    def __init__(self, seed=None):
+        self._lock = threading.RLock()
+        self._built = False
+        self._weights = {}      # category_id -> {book_id: 가중치}
+        self._category_of = {}  # book_id -> category_id (갱신/삭제용)
+        self._arrays = {}       # category_id(또는 ALL) -> (id 배열, 누적 가중치 배열)
+        self._dirty = set()
+        self._rng = np.random.default_rng(seed)
+        self._version = SharedVersion(BOOKS_VERSION)
+
+    @property
+    def built(self):
+        return self._built
+
+    def build(self, rows):
+        """rows: (book_id, category_id, loan_count) 목록"""
+        with self._lock:
+            self._weights, self._category_of, self._arrays = {}, {}, {}
+            for book_id, category_id, loan_count in rows:
+                self._weights.setdefault(category_id, {})[book_id] = popularity_weight(loan_count)
+                self._category_of[book_id] = category_id
+            self._dirty = set(self._weights) | {ALL}
+            self._built = True
+
+    def ensure_built(self):
+        # 이미 빌드됐어도 다른 프로세스가 도서를 바꿨으면 다시 빌드
+        rebuild = self._built and self._version.changed()
+        if self._built and not rebuild:
+            return
+        from .models import Book
+        with self._lock:
+            if self._built and not rebuild:
+                return
+            version = self._version.current()
+            self.build(
+                Book.objects.filter(category__isnull=False, description__isnull=False)
+                .values_list('id', 'category_id', 'loan_count')
+            )
+            self._version.mark_built(version)
+
+    def _discard(self, book_id):
+        category_id = self._category_of.pop(book_id, None)
+        if category_id is not None:
+            self._weights.get(category_id, {}).pop(book_id, None)
+            self._dirty.update((category_id, ALL))
+
+    def update(self, book):
+        """도서 1권 저장 시 증분 반영 (아직 빌드 전이면 무시: 첫 추출 때 통째로 빌드됨)"""
+        if not self._built:
+            return
+        with self._lock:
+            self._discard(book.id)
+            if is_eligible(book):
+                self._weights.setdefault(book.category_id, {})[book.id] = popularity_weight(book.loan_count)
+                self._category_of[book.id] = book.category_id
+                self._dirty.update((book.category_id, ALL))
+
+    def update_loan_count(self, book_id, loan_count):
+        """대출 건수만 바뀐 경우 (카테고리/줄거리 필드를 읽지 않음)"""
+        if not self._built:
+            return
+        with self._lock:
+            category_id = self._category_of.get(book_id)
+            if category_id is not None:
+                self._weights[category_id][book_id] = popularity_weight(loan_count)
+                self._dirty.update((category_id, ALL))
+
+    def remove(self, book_id):
+        if not self._built:
+            return
+        with self._lock:
+            self._discard(book_id)
+
+    def _array(self, category_id):
+        """카테고리의 (id 배열, 누적 가중치 배열). 바뀐 카테고리만 다시 만든다 (lock 안에서 호출)"""
+        if category_id in self._dirty or category_id not in self._arrays:
+            if category_id is ALL:
+                weights = {book_id: w for per_category in self._weights.values() for book_id, w in per_category.items()}
+            else:
+                weights = self._weights.get(category_id, {})
+            ids = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+            cumulative = np.cumsum(np.fromiter(weights.values(), dtype=float, count=len(weights)))
+            self._arrays[category_id] = (ids, cumulative)
+            self._dirty.discard(category_id)
+        return self._arrays[category_id]
+
+    def _draw(self, rng, ids, cumulative, k, taken):
+        """가중치 비례로 taken에 없는 서로 다른 id k개 (k는 남은 후보 수 이하). 난수 1개당 이진 탐색 1번"""
+        if k <= 0:
+            return []
+        if 2 * (k + len(taken)) >= len(ids):
+            # 풀의 절반 이상을 뽑거나 이미 뽑힌 id가 많으면 거절이 많아지므로 한 번에 비복원 추출
+            weights = np.diff(cumulative, prepend=0.0)
+            if taken:
+                weights[np.isin(ids, list(taken))] = 0.0
+            chosen = rng.choice(ids, size=k, replace=False, p=weights / weights.sum())
+            picked = [int(i) for i in chosen]
+            taken.update(picked)
+            return picked
+        picked = []
+        while len(picked) < k:
+            # 중복으로 버려질 몫을 감안해 조금 넉넉히 뽑는다
+            points = rng.random(2 * (k - len(picked)) + 4) * cumulative[-1]
+            for i in np.searchsorted(cumulative, points, side='right'):
+                book_id = int(ids[min(i, len(ids) - 1)])
+                if book_id not in taken:
+                    taken.add(book_id)
+                    picked.append(book_id)
+                    if len(picked) == k:
+                        break
+        return picked
+
+    @staticmethod
+    def _available(ids, taken):
+        """풀에서 아직 뽑을 수 있는 (taken에 없는) id 수"""
+        return len(ids) - (int(np.isin(ids, list(taken)).sum()) if taken else 0)
+
+    def sample(self, category_ids=None, k=30, seed=None, exclude=()):
+        """
+        category_ids 카테고리들에서 인기도 가중 무작위로 도서 id k개 (카테고리별로 고르게 배분)
+        category_ids가 비어 있으면 전체 카테고리 대상, exclude의 id(이미 고른 후보)는 뽑지 않음
+        seed를 주면 풀이 같은 동안 같은 결과 (같은 코호트 사용자가 같은 후보를 받도록)
+        """
+        self.ensure_built()
+        if k <= 0:
+            return []
+        rng = self._rng if seed is None else np.random.default_rng(seed)
+        taken = set(exclude)
+        with self._lock:
+            if not category_ids:
+                # 전체 대상이면 카테고리 구분 없이 하나의 풀에서
+                ids, cumulative = self._array(ALL)
+                return self._draw(rng, ids, cumulative, min(k, self._available(ids, taken)), taken)
+
+            pools = [(cid, *self._array(cid)) for cid in category_ids if self._weights.get(cid)]
+
+            # 선호 카테고리가 여러 개면 k를 나눠 고르게 뽑고, 후보가 모자란 카테고리 몫은 다른 카테고리로
+            # (도서는 카테고리 1개에만 속하므로 카테고리별 남은 수는 제외 목록만 빼고 세면 된다)
+            result = []
+            remaining = {cid: self._available(ids, taken) for cid, ids, _ in pools}
+            active = [pool for pool in pools if remaining[pool[0]] > 0]
+            while active and len(result) < k:
+                share = max(1, (k - len(result)) // len(active))
+                still = []
+                for cid, ids, cumulative in active:
+                    n = min(share, k - len(result), remaining[cid])
+                    picked = self._draw(rng, ids, cumulative, n, taken)
+                    remaining[cid] -= len(picked)
+                    result.extend(picked)
+                    if remaining[cid] > 0:
+                        still.append((cid, ids, cumulative))
+                    if len(result) >= k:
+                        break
+                active = still
+            return result
+
+
+candidate_pool = CandidatePool()
@@ -0,0 +1,211 @@
+import heapq
+import threading
+from collections import defaultdict
+
+import numpy as np
+from scipy import sparse
+
+from .cache import COOCCURRENCE_VERSION, SharedVersion
+
+# 아이템-아이템 협업 필터링 (함께 찜/소장/대화한 도서)
+# 사용자 × 도서 행동 행렬 R(찜 1.0, 소장 1.0, 채팅 0.5 가중치 합)로부터
+# 도서 × 도서 동시 출현 행렬 C = RᵀR (대각 0)을 희소 행렬로 만든다.
+# - 이벤트(찜/소장/채팅)마다 해당 사용자의 다른 도서와의 칸만 delta에 더한다 (O(사용자 도서 수))
+# - delta가 COMPACT_THRESHOLD를 넘으면 본 행렬에 합친다
+# - 사용자 점수 = 사용자가 반응한 도서 행들의 가중합 (희소 행 몇 개 합산이라 ms 단위)
+# - 다른 프로세스(웹 서버/워커)에서 생긴 이벤트는 버전 표시(COOCCURRENCE_VERSION)를 보고 DB로 다시 빌드
+
+KIND_WEIGHTS = {"wish": 1.0, "own": 1.0, "chat": 0.5}
+COMPACT_THRESHOLD = 20000
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 30
+
+
+class CooccurrenceModel:
+    """도서 동시 출현 희소 행렬 (스레드 안전, 프로세스 메모리)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._signals = defaultdict(set)   # (user_id, book_id) -> {"wish", "own", "chat"}
+        self._profiles = defaultdict(dict)  # user_id -> {book_id: 가중치}
+        self._col = {}                      # book_id -> 행/열 번호
+        self._book_ids = []                 # 행/열 번호 -> book_id
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._delta = defaultdict(lambda: defaultdict(float))  # 행 -> {열: 증감}
+        self._delta_size = 0
+        self._version = SharedVersion(COOCCURRENCE_VERSION)
+
+    @property
+    def built(self):
+        return self._built
+
+    def _index(self, book_id):
+        col = self._col.get(book_id)
+        if col is None:
+            col = self._col[book_id] = len(self._book_ids)
+            self._book_ids.append(book_id)
+        return col
+
+    @staticmethod
+    def _weight(kinds):
+        return sum(KIND_WEIGHTS[k] for k in kinds)
+
+    # --- 빌드 ---
+
+    def build(self, events):
+        """events: (user_id, book_id, kind) 목록으로 전체 행렬을 새로 계산"""
+        with self._lock:
+            self._signals = defaultdict(set)
+            self._profiles = defaultdict(dict)
+            self._col, self._book_ids = {}, []
+            for user_id, book_id, kind in events:
+                self._signals[(user_id, book_id)].add(kind)
+            for (user_id, book_id), kinds in self._signals.items():
+                self._profiles[user_id][book_id] = self._weight(kinds)
+                self._index(book_id)
+
+            users = list(self._profiles)
+            rows, cols, vals = [], [], []
+            for row, user_id in enumerate(users):
+                for book_id, weight in self._profiles[user_id].items():
+                    rows.append(row)
+                    cols.append(self._col[book_id])
+                    vals.append(weight)
+            n = len(self._book_ids)
+            R = sparse.csr_matrix((vals, (rows, cols)), shape=(len(users), n), dtype=np.float32)
+            C = (R.T @ R).tocsr()
+            C.setdiag(0)
+            C.eliminate_zeros()
+            self._matrix = C
+            self._delta = defaultdict(lambda: defaultdict(float))
+            self._delta_size = 0
+            self._built = True
+
+    def ensure_built(self):
+        # 이미 빌드됐어도 다른 프로세스에서 찜/소장/채팅이 바뀌었으면 다시 빌드
+        rebuild = self._built and self._version.changed()
+        if self._built and not rebuild:
+            return
+        with self._lock:
+            if self._built and not rebuild:
+                return
+            version = self._version.current()
+            self.build(load_events())
+            self._version.mark_built(version)
+
+    def invalidate(self):
+        """일괄 변경(clear 등)처럼 증분 반영이 어려운 경우: 다음 조회 때 DB로 다시 빌드"""
+        self._built = False
+
+    # --- 증분 갱신 ---
+
+    def record(self, user_id, book_id, kind, present=True):
+        """사용자의 도서 행동 1건 추가/취소 (아직 빌드 전이면 무시: 첫 조회 때 통째로 빌드됨)"""
+        if not self._built:
+            return
+        with self._lock:
+            kinds = self._signals[(user_id, book_id)]
+            old = self._weight(kinds)
+            if present:
+                kinds.add(kind)
+            else:
+                kinds.discard(kind)
+            new = self._weight(kinds)
+            if new == old:
+                return
+            profile = self._profiles[user_id]
+            col = self._index(book_id)
+            # 이 사용자가 반응한 다른 도서들과의 동시 출현 값만 바뀐다
+            for other_id, other_weight in profile.items():
+                if other_id == book_id:
+                    continue
+                change = (new - old) * other_weight
+                other = self._col[other_id]
+                self._delta[col][other] += change
+                self._delta[other][col] += change
+                self._delta_size += 2
+            if new:
+                profile[book_id] = new
+            else:
+                profile.pop(book_id, None)
+                del self._signals[(user_id, book_id)]
+            if self._delta_size > COMPACT_THRESHOLD:
+                self._compact()
+
+    def _compact(self):
+        n = len(self._book_ids)
+        rows, cols, vals = [], [], []
+        for row, changes in self._delta.items():
+            for col, value in changes.items():
+                rows.append(row)
+                cols.append(col)
+                vals.append(value)
+        matrix = self._matrix.copy()
+        matrix.resize((n, n))
+        matrix = matrix + sparse.csr_matrix((vals, (rows, cols)), shape=(n, n), dtype=np.float32)
+        matrix.eliminate_zeros()
+        self._matrix = matrix.tocsr()
+        self._delta = defaultdict(lambda: defaultdict(float))
+        self._delta_size = 0
+
+    # --- 조회 ---
+
+    def _scores(self, weights_by_col):
+        """{행: 가중치} 행들의 가중합 → {열: 점수}"""
+        scores = defaultdict(float)
+        base_rows = [r for r in weights_by_col if r < self._matrix.shape[0]]
+        if base_rows:
+            block = self._matrix[base_rows]
+            summed = block.T @ np.array([weights_by_col[r] for r in base_rows], dtype=np.float32)
+            for col in np.flatnonzero(summed):
+                scores[int(col)] += float(summed[col])
+        for row, weight in weights_by_col.items():
+            for col, value in self._delta.get(row, {}).items():
+                scores[col] += weight * value
+        return scores
+
+    def _top(self, scores, k, exclude_cols):
+        items = ((score, col) for col, score in scores.items() if score > 1e-6 and col not in exclude_cols)
+        return [(self._book_ids[col], round(score, 4)) for score, col in heapq.nlargest(k, items)]
+
+    def related(self, book_id, k=DEFAULT_LIMIT):
+        """이 도서에 반응한 사람들이 함께 반응한 도서 [(book_id, 점수)]"""
+        self.ensure_built()
+        with self._lock:
+            col = self._col.get(book_id)
+            if col is None:
+                return []
+            return self._top(self._scores({col: 1.0}), k, {col})
+
+    def reacted(self, user_id):
+        """사용자가 찜/소장/채팅한 도서 id 집합"""
+        self.ensure_built()
+        with self._lock:
+            return set(self._profiles.get(user_id, ()))
+
+    def recommend(self, user_id, k=DEFAULT_LIMIT):
+        """사용자가 반응한 도서들과 함께 자주 반응된 도서 [(book_id, 점수)] (이미 반응한 도서 제외)"""
+        self.ensure_built()
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if not profile:
+                return []
+            weights = {self._col[book_id]: weight for book_id, weight in profile.items()}
+            return self._top(self._scores(weights), k, set(weights))
+
+
+def load_events():
+    """DB의 찜/소장/채팅 기록을 (user_id, book_id, kind)로"""
+    from community.models import ChatMessage
+    from .models import Book, UserBookStock
+
+    for user_id, book_id in Book.wish_users.through.objects.values_list('user_id', 'book_id').iterator():
+        yield user_id, book_id, "wish"
+    for user_id, book_id in UserBookStock.objects.values_list('user_id', 'book_id').iterator():
+        yield user_id, book_id, "own"
+    for user_id, book_id in ChatMessage.objects.values_list('user_id', 'book_id').distinct().iterator():
+        yield user_id, book_id, "chat"
+
+
+cooccurrence = CooccurrenceModel()
@@ -0,0 +1,178 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from xml.parsers.expat import ExpatError
+
+import requests
+import xmltodict
+from django.conf import settings
+
+from .replay import build_adapter
+
+# 도서관정보나루(data4library) 공용 HTTP 클라이언트
+# - keep-alive 커넥션 풀을 프로세스 전체가 공유
+# - API별 타임아웃 / 재시도 횟수
+# - 지터(jitter)를 섞은 지수 백오프 재시도
+# - API별 서킷 브레이커: 최근 오류율이 높으면 일정 시간 바로 실패시켜 워커가 묶이지 않게 함
+
+BASE_URL = "http://data4library.kr/api/"
+
+# API별 (타임아웃 초, 재시도 횟수). 상세 페이지에서 쓰는 bookExist는 마감 시간이 있어 재시도하지 않는다.
+ENDPOINT_POLICIES = {
+    "bookExist": (1.5, 0),
+    "srchDtlList": (5, 2),
+    "loanItemSrch": (10, 2),
+    "libSrch": (10, 2),
+}
+DEFAULT_POLICY = (10, 2)
+
+RETRY_BACKOFF_BASE = 0.3   # 첫 재시도 최대 대기 (초), 이후 2배씩
+RETRY_BACKOFF_MAX = 5.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class Data4LibraryError(Exception):
+    """도서관정보나루 호출 실패 (네트워크 오류, 5xx, 잘못된 응답 등)"""
+
+
+class CircuitOpenError(Data4LibraryError):
+    """서킷 브레이커가 열려 있어 호출하지 않고 바로 실패"""
+
+
+class CircuitBreaker:
+    """
+    최근 window번 호출 중 min_calls번 이상 호출됐고 오류율이 failure_rate 이상이면 open
+    open 후 cooldown초가 지나면 half-open 상태로 1번 시험 호출을 허용하고, 성공하면 close
+    allow()가 돌려준 토큰으로 record()해서, 상태가 바뀌기 전에 시작된 호출의 늦은 결과는 무시한다.
+    """
+
+    def __init__(self, name, window=20, min_calls=10, failure_rate=0.5, cooldown=30):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self._results = deque(maxlen=window)
+        self._opened_at = None
+        self._generation = 0  # open/close 될 때마다 증가
+        self._trial = None    # half-open 시험 호출 토큰
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """호출을 허용하면 record()에 넘길 토큰 (세대, 시험 호출 여부), 아니면 None"""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return (self._generation, False)
+            if state == "half-open" and self._trial is None:
+                self._trial = (self._generation, True)
+                return self._trial
+            return None
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._generation += 1
+
+    def record(self, token, success):
+        with self._lock:
+            if token[0] != self._generation:
+                # open 전에 시작됐거나 이전 세대의 호출: 현재 상태에 영향을 주지 않음
+                return
+            if token[1]:
+                # half-open 시험 호출 결과
+                self._trial = None
+                if success:
+                    self._opened_at = None
+                    self._generation += 1
+                    self._results.clear()
+                else:
+                    self._open()
+                return
+            self._results.append(success)
+            failures = self._results.count(False)
+            if len(self._results) >= self.min_calls and failures / len(self._results) >= self.failure_rate:
+                self._open()
+                print(f"⚠️ data4library 서킷 open: {self.name} (최근 {len(self._results)}회 중 {failures}회 실패)")
+
+
+class Data4LibraryClient:
+    def __init__(self, pool_size=None):
+        pool_size = pool_size or getattr(settings, 'DATA4LIBRARY_POOL_SIZE', 32)
+        self.session = requests.Session()
+        # DATA4LIBRARY_MODE가 record/replay면 녹화/재생 전송 계층으로 교체 (books.replay)
+        adapter = build_adapter(pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint):
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(endpoint)
+            return self._breakers[endpoint]
+
+    def policy(self, endpoint):
+        overrides = getattr(settings, 'DATA4LIBRARY_POLICIES', {})
+        return overrides.get(endpoint) or ENDPOINT_POLICIES.get(endpoint, DEFAULT_POLICY)
+
+    def get(self, endpoint, params=None, timeout=None, retries=None):
+        """
+        API 호출 후 파싱된 응답(dict) 반환. authKey/format은 자동으로 채운다.
+        실패하면 Data4LibraryError (서킷이 열려 있으면 CircuitOpenError)
+        """
+        default_timeout, default_retries = self.policy(endpoint)
+        timeout = default_timeout if timeout is None else timeout
+        retries = default_retries if retries is None else retries
+        params = {"authKey": getattr(settings, 'LIBRARY_API_KEY', None), "format": "json", **(params or {})}
+
+        breaker = self.breaker(endpoint)
+        last_error = None
+        for attempt in range(retries + 1):
+            token = breaker.allow()
+            if token is None:
+                raise CircuitOpenError(f"{endpoint}: 서킷 open 상태")
+            try:
+                response = self.session.get(BASE_URL + endpoint, params=params, timeout=timeout)
+                if response.status_code in RETRY_STATUS_CODES:
+                    raise Data4LibraryError(f"HTTP {response.status_code}")
+                data = self._parse(response) if response.status_code < 400 else None
+            except (requests.RequestException, ValueError, ExpatError, Data4LibraryError) as e:
+                breaker.record(token, False)
+                last_error = e
+                if attempt < retries:
+                    # full jitter: 0 ~ base * 2^attempt 사이 임의 대기
+                    time.sleep(random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt)))
+                continue
+            except BaseException:
+                # 예상하지 못한 예외도 실패로 기록 (half-open 시험 호출 토큰이 반납되지 않으면 서킷이 계속 막힘)
+                breaker.record(token, False)
+                raise
+            breaker.record(token, True)
+            if data is None:
+                # 잘못된 요청(4xx)은 재시도해도 같으므로 바로 실패 (업스트림 장애로 치지 않음)
+                raise Data4LibraryError(f"{endpoint}: HTTP {response.status_code}")
+            return data
+        raise Data4LibraryError(f"{endpoint}: {last_error}") from last_error
+
+    def _parse(self, response):
+        if 'xml' in response.headers.get('Content-Type', ''):
+            return json.loads(json.dumps(xmltodict.parse(response.content)))
+        return response.json()
+
+
+client = Data4LibraryClient()
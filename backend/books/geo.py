@@ -0,0 +1,173 @@
+import heapq
+import math
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from .cache import SharedVersion
+
+# 도서관 위치 기반 조회용 메모리 공간 인덱스
+# 위경도를 CELL_DEG 크기의 격자로 나눠 버킷에 담고, 기준점 주변 격자부터 바깥으로 넓혀가며
+# 실제 haversine 거리로 가까운 도서관 k곳을 찾는다. (전체 도서관을 매 요청마다 정렬하지 않음)
+# 다른 프로세스(도서관 동기화/임포트 커맨드)가 도서관을 바꾸면 DB의 버전 표시를 보고 다시 만든다.
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180  # 위도 1도 ≈ 111.2km
+CELL_DEG = 0.1
+INDEX_VERSION_STATE = 'library_index_version'
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """두 지점 사이의 대원 거리 (km)"""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) \
+        * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def haversine_many(lat, lon, lats, lons):
+    """한 지점에서 N개 좌표까지의 대원 거리 (km)를 NumPy 배열 연산으로 한 번에 계산"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def rank_by_distance(lat, lon, lats, lons, k=None):
+    """가까운 순서의 인덱스 배열과 거리 배열 반환 (k가 있으면 상위 k개만 부분 정렬)"""
+    distances = haversine_many(lat, lon, lats, lons)
+    if k is None or k >= len(distances):
+        order = np.argsort(distances, kind='stable')
+    else:
+        top = np.argpartition(distances, k)[:k]
+        order = top[np.argsort(distances[top], kind='stable')]
+    return order, distances
+
+
+def _cell(lat, lon):
+    return int(math.floor(lat / CELL_DEG)), int(math.floor(lon / CELL_DEG))
+
+
+def _ring_cells(center_r, center_c, ring, bounds):
+    """중심 격자에서 ring칸 떨어진 고리(테두리) 격자 중 격자 범위 안에 있는 것만"""
+    row_min, row_max, col_min, col_max = bounds
+    if ring == 0:
+        yield center_r, center_c
+        return
+    c_lo, c_hi = max(center_c - ring, col_min), min(center_c + ring, col_max)
+    for r in (center_r - ring, center_r + ring):
+        if row_min <= r <= row_max:
+            for c in range(c_lo, c_hi + 1):
+                yield r, c
+    r_lo, r_hi = max(center_r - ring + 1, row_min), min(center_r + ring - 1, row_max)
+    for c in (center_c - ring, center_c + ring):
+        if col_min <= c <= col_max:
+            for r in range(r_lo, r_hi + 1):
+                yield r, c
+
+
+class LibrarySpatialIndex:
+    """격자(grid) 기반 최근접 도서관 인덱스. Library가 바뀌면 invalidate() 후 다음 조회 때 다시 만든다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None  # (격자 dict, 전체 격자 범위, (도서관 목록, 위도 배열, 경도 배열))
+        self._version = SharedVersion(INDEX_VERSION_STATE)
+
+    def invalidate(self):
+        """이 프로세스의 인덱스를 버리고, 다른 프로세스도 다시 만들도록 버전 표시 갱신"""
+        self._snapshot = None
+        self._version.bump()
+
+    def _build(self):
+        from .models import Library
+
+        grid = defaultdict(list)
+        rows, cols = [], []
+        # 좌표가 없는 도서관은 거리 계산이 불가능하므로 제외
+        libs = list(Library.objects.filter(latitude__isnull=False, longitude__isnull=False))
+        for lib in libs:
+            cell = _cell(lib.latitude, lib.longitude)
+            grid[cell].append(lib)
+            rows.append(cell[0])
+            cols.append(cell[1])
+        bounds = (min(rows), max(rows), min(cols), max(cols)) if rows else None
+        # 전체 거리 순위용 좌표 배열 (요청마다 다시 만들지 않고 재사용)
+        coords = (
+            libs,
+            np.array([l.latitude for l in libs], dtype=float),
+            np.array([l.longitude for l in libs], dtype=float),
+        )
+        return dict(grid), bounds, coords
+
+    def ensure_built(self):
+        self._get_snapshot()
+
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is not None and self._version.changed():
+            snapshot = self._snapshot = None
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    version = self._version.current()
+                    self._snapshot = self._build()
+                    self._version.mark_built(version)
+                snapshot = self._snapshot
+        return snapshot
+
+    def nearest(self, lat, lon, k=5, exclude=()):
+        """(lat, lon)에서 가까운 순으로 도서관 k곳 반환 (exclude의 lib_code는 제외)"""
+        grid, bounds, _ = self._get_snapshot()
+        if not bounds or k <= 0:
+            return []
+        exclude = set(exclude)
+        row_min, row_max, col_min, col_max = bounds
+        center_r, center_c = _cell(lat, lon)
+        if not (row_min <= center_r <= row_max and col_min <= center_c <= col_max):
+            # 격자 범위 밖(좌표 누락으로 (0, 0)이 들어온 경우 등)은 고리를 넓히는 비용이 커지므로 전체 거리 순위로
+            return [lib for lib, _ in self.rank(lat, lon, k=k + len(exclude)) if lib.lib_code not in exclude][:k]
+
+        # 탐색을 끝까지 넓혀도 되는 최대 반경 (격자 전체를 덮을 때까지)
+        max_ring = max(center_r - row_min, row_max - center_r, center_c - col_min, col_max - center_c)
+        # 경도 1도의 거리는 위도가 높을수록 짧아지므로, 보수적으로 더 높은 위도 기준으로 하한을 잡는다
+        lon_scale = math.cos(math.radians(min(abs(lat) + 5, 89)))
+
+        best = []  # (-거리, lib_code, lib) 최대 힙으로 k개 유지
+        ring = 0
+        while ring <= max_ring:
+            for cell in _ring_cells(center_r, center_c, ring, bounds):
+                for lib in grid.get(cell, ()):
+                    if lib.lib_code in exclude:
+                        continue
+                    item = (-haversine(lat, lon, lib.latitude, lib.longitude), lib.lib_code, lib)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item[0] > best[0][0]:
+                        heapq.heapreplace(best, item)
+            # 아직 안 본 격자의 도서관은 최소 ring * CELL_DEG 도 이상 떨어져 있다
+            # → k번째 후보까지의 거리보다 멀어지는 고리에서 멈춘다
+            if len(best) == k:
+                lower_bound = ring * CELL_DEG * KM_PER_DEG * lon_scale
+                if -best[0][0] <= lower_bound:
+                    break
+            ring += 1
+
+        return [lib for _, _, lib in sorted(best, key=lambda x: (-x[0], x[1]))]
+
+    def coordinates(self):
+        """캐시된 (도서관 목록, 위도 배열, 경도 배열)"""
+        return self._get_snapshot()[2]
+
+    def rank(self, lat, lon, k=None):
+        """전체 도서관을 거리순으로 [(도서관, 거리 km)] 반환 (NumPy 일괄 계산)"""
+        libs, lats, lons = self.coordinates()
+        if not libs:
+            return []
+        order, distances = rank_by_distance(lat, lon, lats, lons, k)
+        return [(libs[i], float(distances[i])) for i in order]
+
+
+library_index = LibrarySpatialIndex()
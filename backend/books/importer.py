@@ -0,0 +1,179 @@
+import json
+import time
+
+from django.db import transaction
+
+from .models import Category, Library
+from .ingest import upsert_books
+
+# fixtures/books.json 스트리밍 임포트
+# 파일 전체를 json.load 하지 않고 청크 단위로 읽으며 레코드를 하나씩 디코딩하고,
+# 모델별로 batch_size만큼 모이면 트랜잭션 안에서 bulk upsert 한다. (파일 크기와 무관하게 메모리 일정)
+
+READ_CHUNK = 64 * 1024
+LIBRARY_UPSERT_FIELDS = ['lib_name', 'address', 'tel', 'latitude', 'longitude', 'homepage']
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK):
+    """JSON 배열 파일에서 원소를 하나씩 꺼내는 제너레이터 (raw_decode 기반 점진 파싱)"""
+    decoder = json.JSONDecoder()
+    buffer, pos = "", 0
+    started = eof = False
+    while True:
+        # 공백과 원소 구분자(,) 건너뛰기
+        while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ',')):
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("JSON 배열 형식의 파일이 아닙니다.")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # 숫자/리터럴은 청크 경계에서 잘렸을 수 있다 ("1.5e3"이 "1." 까지만 읽히면 1로 디코딩됨)
+                # → 객체/배열/문자열이거나, 바로 뒤가 구분자(, ] 공백)일 때만 완성된 값으로 인정하고 아니면 더 읽는다
+                complete = buffer[end - 1] in '}]"' or (
+                    end < len(buffer) and (buffer[end] in ',]' or buffer[end].isspace())
+                )
+                if complete or eof:
+                    yield item
+                    pos = end
+                    continue
+        if eof:
+            raise ValueError("JSON 배열이 닫히지 않았습니다.")
+        # 처리한 앞부분은 버리고 다음 청크를 이어 붙임
+        buffer, pos = buffer[pos:], 0
+        chunk = f.read(chunk_size)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+
+
+def _pub_year(fields):
+    pub_year = fields.get('pub_year')
+    if not pub_year and fields.get('pub_date'):
+        try:
+            pub_year = int(str(fields.get('pub_date'))[:4])
+        except ValueError:
+            pub_year = None
+    return pub_year
+
+
+class FixtureImporter:
+    """카테고리 → 도서관 → 도서 순으로 의존성을 지키며 배치 upsert"""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.categories = []
+        self.libraries = []
+        self.books = []
+        self.category_ids = set(Category.objects.values_list('id', flat=True))
+        self.counts = {"category": 0, "library": 0, "book": 0, "skipped": 0}
+
+    def add(self, item):
+        model, fields = item.get('model'), item.get('fields', {})
+        if model == 'books.category':
+            self.categories.append(Category(id=item['pk'], name=fields.get('name')))
+            self.category_ids.add(item['pk'])
+            if len(self.categories) >= self.batch_size:
+                self.flush_categories()
+        elif model == 'books.library':
+            self.libraries.append(Library(
+                lib_code=item['pk'],
+                lib_name=fields.get('lib_name'),
+                address=fields.get('address'),
+                tel=fields.get('tel'),
+                latitude=fields.get('latitude'),
+                longitude=fields.get('longitude'),
+                homepage=fields.get('homepage'),
+            ))
+            if len(self.libraries) >= self.batch_size:
+                self.flush_libraries()
+        elif model == 'books.book' and fields.get('isbn'):
+            category_id = fields.get('category')
+            self.books.append({
+                'isbn': fields.get('isbn'),
+                'title': fields.get('title'),
+                'author': fields.get('author'),
+                'publisher': fields.get('publisher'),
+                'description': fields.get('description'),
+                'cover_url': fields.get('cover_url') or fields.get('cover'),
+                # 없는 카테고리를 가리키면 기존 동작처럼 미분류로 저장
+                'category_id': category_id if category_id in self.category_ids else None,
+                'pub_year': _pub_year(fields),
+                'loan_count': fields.get('loan_count', 0),
+            })
+            if len(self.books) >= self.batch_size:
+                self.flush_books()
+        else:
+            # 사용자에 의존하는 모델(보유/추천 등)은 loaddata로 불러온다
+            self.counts["skipped"] += 1
+
+    def flush_categories(self):
+        if not self.categories:
+            return
+        with transaction.atomic():
+            Category.objects.bulk_create(
+                self.categories, update_conflicts=True, unique_fields=['id'], update_fields=['name'],
+            )
+        self.counts["category"] += len(self.categories)
+        self.categories = []
+
+    def flush_libraries(self):
+        from .geo import library_index
+
+        if not self.libraries:
+            return
+        with transaction.atomic():
+            Library.objects.bulk_create(
+                self.libraries, update_conflicts=True, unique_fields=['lib_code'],
+                update_fields=LIBRARY_UPSERT_FIELDS,
+            )
+        # bulk 쓰기는 시그널을 거치지 않으므로 위치 인덱스를 직접 무효화 (다른 프로세스에는 DB 버전 표시로 전달)
+        library_index.invalidate()
+        self.counts["library"] += len(self.libraries)
+        self.libraries = []
+
+    def flush_books(self):
+        if not self.books:
+            return
+        # 도서가 참조하는 카테고리가 먼저 저장되어 있어야 함
+        self.flush_categories()
+        self.counts["book"] += upsert_books(self.books)
+        self.books = []
+
+    def flush(self):
+        self.flush_categories()
+        self.flush_libraries()
+        self.flush_books()
+
+
+def import_fixture(path, batch_size=500, progress=print):
+    """fixture 파일을 스트리밍으로 읽어 저장하고 모델별 건수와 처리량(rows/s)을 반환"""
+    importer = FixtureImporter(batch_size)
+    started = time.monotonic()
+    rows = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for item in iter_json_array(f):
+            importer.add(item)
+            rows += 1
+            if progress and rows % (batch_size * 10) == 0:
+                elapsed = time.monotonic() - started
+                progress(f"📦 {rows}건 처리 ({rows / elapsed:.0f} rows/s)")
+    importer.flush()
+    elapsed = time.monotonic() - started
+    return {
+        **importer.counts,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else 0,
+    }
@@ -0,0 +1,640 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from .models import Book, Category, DemographicPopularity, Library, SyncState
+from .data4library import client as data4library, CircuitOpenError, Data4LibraryError
+
+# KDC 분류별 인기 도서 수집 파이프라인
+# 목록 페이지 조회 → 도서별 상세 조회를 스레드 풀에서 동시에 실행하되 전체 호출 속도는
+# RateLimiter 하나로 제한하고, DB 쓰기는 메인 스레드에서 배치 단위 bulk upsert로 처리한다.
+# 증분 동기화: KDC별 워터마크(마지막으로 반영한 조회 기간)와 목록 해시를 SyncState에,
+# 도서별 목록 응답 해시를 Book.content_hash에 저장해 바뀐 것만 상세 조회/저장한다.
+
+BOOK_UPSERT_FIELDS = ['title', 'author', 'publisher', 'description', 'cover_url', 'category', 'loan_count', 'list_loan_count', 'pub_year', 'content_hash']
+# 상세 조회에 실패한 도서: 저장된 줄거리를 덮어쓰지 않고, 해시도 남기지 않아 다음 실행 때 다시 조회
+BOOK_UPSERT_FIELDS_WITHOUT_DETAIL = [f for f in BOOK_UPSERT_FIELDS if f not in ('description', 'content_hash')]
+POPULAR_SYNC_STATE = 'popular_books_sync'
+# 도서 내용 해시에 쓰는 목록 API 필드 (대출 건수는 매번 바뀌므로 따로 비교)
+BOOK_HASH_FIELDS = ('bookname', 'authors', 'publisher', 'publication_year', 'bookImageURL', 'class_nm')
+
+
+class RateLimiter:
+    """토큰 버킷 방식 호출 속도 제한 (여러 스레드가 공유, 초당 rate회 / 최대 burst회 몰아서 허용)"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def default_rate_limiter():
+    return RateLimiter(getattr(settings, 'DATA4LIBRARY_RATE_LIMIT', 8))
+
+
+class CategoryCache:
+    """카테고리 이름 -> Category 메모리 캐시 (도서마다 get_or_create 하지 않도록)"""
+
+    def __init__(self):
+        self._by_name = {c.name: c for c in Category.objects.all()}
+
+    def get(self, name):
+        category = self._by_name.get(name)
+        if category is None:
+            category, _ = Category.objects.get_or_create(name=name)
+            self._by_name[name] = category
+        return category
+
+
+def _bulk_upsert(rows, update_fields):
+    with transaction.atomic():
+        Book.objects.bulk_create(
+            [Book(**row) for row in rows],
+            update_conflicts=True,
+            unique_fields=['isbn'],
+            update_fields=update_fields,
+        )
+
+
+def upsert_books(rows, update_fields=BOOK_UPSERT_FIELDS):
+    """
+    isbn 기준 bulk upsert (배치당 트랜잭션 1번, 이미 있는 도서는 update_fields만 갱신)
+    배치 저장이 실패하면 그 배치만 1행씩 다시 저장해 잘못된 행만 건너뛴다 (건너뛴 ISBN은 로그로 남김).
+    bulk 쓰기는 post_save 시그널을 거치지 않으므로 검색/자동완성 인덱스를 직접 갱신한다.
+    """
+    from .signals import notify_books_changed
+
+    if not rows:
+        return 0
+    try:
+        _bulk_upsert(rows, update_fields)
+        isbns = [row['isbn'] for row in rows]
+    except (DatabaseError, ValueError, TypeError) as e:
+        print(f"⚠️ 도서 {len(rows)}권 일괄 저장 실패, 1권씩 다시 저장: {e}")
+        isbns, rejected = [], []
+        for row in rows:
+            try:
+                _bulk_upsert([row], update_fields)
+                isbns.append(row['isbn'])
+            except (DatabaseError, ValueError, TypeError) as row_error:
+                rejected.append(row.get('isbn'))
+                print(f"❌ 도서 저장 건너뜀({row.get('isbn')}): {row_error}")
+        if rejected:
+            print(f"⚠️ 저장하지 못한 ISBN {len(rejected)}건: {', '.join(map(str, rejected))}")
+    saved = list(Book.objects.select_related('category').filter(isbn__in=isbns))
+    notify_books_changed(saved)
+    return len(saved)
+
+
+def _fetch_list_page(limiter, kdc, page, start_dt, end_dt):
+    params = {"kdc": kdc, "startDt": start_dt, "endDt": end_dt, "pageSize": 50, "pageNo": page}
+    limiter.acquire()
+    return data4library.get("loanItemSrch", params).get('response', {}).get('docs', [])
+
+
+def _fetch_detail(limiter, isbn):
+    """상세 조회 (호출 실패는 Data4LibraryError로 전달: 줄거리가 없는 도서와 구분)"""
+    from .utils import fetch_book_detail
+    limiter.acquire()
+    return fetch_book_detail(isbn)
+
+
+def book_content_hash(b_info):
+    payload = json.dumps([b_info.get(f) for f in BOOK_HASH_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def list_loan_count(b_info):
+    try:
+        return int(b_info.get('loanCnt') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def build_book_row(b_info, detailed, category):
+    """
+    목록 + 상세 응답으로 저장할 행 구성
+    detailed가 None(상세 조회 실패)이면 목록 값만 쓰고 content_hash를 비워 다음 실행 때 다시 조회되게 한다.
+    """
+    from .utils import clean_book_data
+    title, author = clean_book_data(b_info.get('bookname', ''), b_info.get('authors', ''))
+    content_hash = book_content_hash(b_info) if detailed is not None else ''
+    detailed = detailed or {"loan_count": 0, "description": ""}
+    return {
+        'isbn': b_info.get('isbn13'),
+        'title': title, 'author': author, 'publisher': b_info.get('publisher'),
+        'description': detailed["description"] or b_info.get('description', ""),
+        'cover_url': b_info.get('bookImageURL'), 'category': category,
+        'loan_count': max(list_loan_count(b_info), detailed["loan_count"]),
+        'list_loan_count': list_loan_count(b_info),
+        'pub_year': int(str(b_info.get('publication_year'))[:4]) if b_info.get('publication_year') else None,
+        'content_hash': content_hash,
+    }
+
+
+def update_loan_counts(loan_counts):
+    """
+    대출 건수만 바뀐 도서: 대출 건수 컬럼만 bulk_update (검색 점수는 books_book을 직접 읽으므로 자동완성/후보 풀만 갱신)
+    loan_counts는 {isbn: 목록 loanCnt}. loan_count는 build_book_row와 같이 저장된 값과의 최댓값으로 둔다.
+    """
+    from .suggest import suggest_index
+    from .candidates import candidate_pool
+    from .signals import books_version
+
+    if not loan_counts:
+        return 0
+    books = list(
+        Book.objects.filter(isbn__in=loan_counts).only('id', 'isbn', 'title', 'author', 'loan_count', 'list_loan_count')
+    )
+    for book in books:
+        book.list_loan_count = loan_counts[book.isbn]
+        book.loan_count = max(book.loan_count, book.list_loan_count)
+    with transaction.atomic():
+        Book.objects.bulk_update(books, ['loan_count', 'list_loan_count'])
+    for book in books:
+        suggest_index.update(book)
+        candidate_pool.update_loan_count(book.id, book.loan_count)
+    books_version.bump()
+    return len(books)
+
+
+def category_name(b_info):
+    return b_info.get('class_nm', '').split('>')[0].strip() or "기타"
+
+
+def _page_hash(docs):
+    items = sorted(
+        (d.get('doc', {}).get('isbn13') or '', book_content_hash(d.get('doc', {})), list_loan_count(d.get('doc', {})))
+        for d in docs
+    )
+    return hashlib.sha1(json.dumps(items).encode('utf-8')).hexdigest()
+
+
+def _classify(candidates):
+    """
+    후보 도서를 DB와 비교해 분류
+    - full: 새 도서이거나 목록 내용이 바뀐 도서 → 상세 조회 후 upsert
+    - loan_only: 내용은 같고 목록 대출 건수만 바뀐 도서 → 대출 건수만 갱신
+      (저장된 loan_count는 상세 누적 건수와 합친 값이므로 지난번 목록 loanCnt와 비교)
+    - 나머지: 변경 없음 → 건너뜀
+    """
+    stored = {
+        row['isbn']: row
+        for row in Book.objects.filter(isbn__in=list(candidates)).values('isbn', 'content_hash', 'list_loan_count')
+    }
+    full, loan_only, unchanged = [], {}, 0
+    for isbn, b_info in candidates.items():
+        row = stored.get(isbn)
+        if row is None or row['content_hash'] != book_content_hash(b_info):
+            full.append(b_info)
+        elif list_loan_count(b_info) != row['list_loan_count']:
+            loan_only[isbn] = list_loan_count(b_info)
+        else:
+            unchanged += 1
+    return full, loan_only, unchanged
+
+
+def run_popular_books_sync(pages=2, workers=None, rate=None, batch_size=200, dry_run=False, force=False):
+    """
+    KDC 0~9 × pages 페이지를 동시에 수집해 바뀐 도서만 배치로 저장하고 처리량(books/s)을 출력
+    dry_run이면 목록만 조회해 바뀔 행 수를 보고하고 상세 조회/저장/워터마크 갱신은 하지 않는다.
+    force면 워터마크/해시를 무시하고 전부 다시 받는다.
+    """
+    from .similarity import similarity_index
+
+    workers = workers or getattr(settings, 'SYNC_WORKERS', 8)
+    limiter = RateLimiter(rate) if rate else default_rate_limiter()
+    if not dry_run:
+        # 새로 저장되는 도서를 유사 도서 모델에 반영하기 위해 미리 로드 (끝나면 flush로 저장)
+        similarity_index.ensure_loaded()
+    start_dt = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
+    end_dt = datetime.now().strftime('%Y-%m-%d')
+
+    state = {} if force else SyncState.load(POPULAR_SYNC_STATE)
+    # 1. 워터마크: 같은 조회 기간을 같은 페이지 수 이상으로 이미 반영한 KDC는 목록 조회도 생략
+    kdcs = [
+        str(kdc) for kdc in range(10)
+        if not (state.get(str(kdc), {}).get('end_dt') == end_dt and state[str(kdc)].get('pages', 0) >= pages)
+    ]
+    skipped_kdcs = 10 - len(kdcs)
+
+    categories = CategoryCache()
+    started = time.monotonic()
+    candidates, kdc_docs, failed_kdcs, detail_failed_isbns = {}, {}, set(), set()
+    saved = loan_updated = 0
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kdc-sync') as pool:
+        page_futures = {
+            pool.submit(_fetch_list_page, limiter, kdc, page, start_dt, end_dt): (kdc, page)
+            for kdc in kdcs for page in range(1, pages + 1)
+        }
+        for future in as_completed(page_futures):
+            kdc, page = page_futures[future]
+            try:
+                docs = future.result()
+            except Exception as e:
+                failed_kdcs.add(kdc)
+                print(f"❌ 에러({kdc}-{page}): {e}")
+                continue
+            kdc_docs.setdefault(kdc, []).extend(docs)
+
+        # 2. 목록 해시가 지난번과 같은 KDC는 도서 비교도 생략
+        unchanged_kdcs = []
+        for kdc, docs in kdc_docs.items():
+            if kdc in failed_kdcs:
+                continue
+            if state.get(kdc, {}).get('hash') == _page_hash(docs):
+                unchanged_kdcs.append(kdc)
+                continue
+            for item in docs:
+                b_info = item.get('doc', {})
+                if b_info.get('isbn13'):
+                    candidates.setdefault(b_info['isbn13'], b_info)
+
+        # 3. 도서별 해시 비교
+        full, loan_only, unchanged = _classify(candidates)
+        print(
+            f"🔎 KDC 생략 {skipped_kdcs + len(unchanged_kdcs)}개 / 후보 {len(candidates)}권: "
+            f"신규·변경 {len(full)} / 대출 건수만 {len(loan_only)} / 변경 없음 {unchanged}"
+        )
+
+        if not dry_run:
+            loan_updated = update_loan_counts(loan_only)
+            # 4. 신규·변경 도서만 상세 조회 후 배치 upsert
+            detail_futures = {pool.submit(_fetch_detail, limiter, b['isbn13']): b for b in full}
+            batch, partial = [], []  # 상세 조회 성공 / 실패 (실패한 도서는 줄거리·해시를 갱신하지 않음)
+            for future in as_completed(detail_futures):
+                b_info = detail_futures[future]
+                try:
+                    detailed = future.result()
+                except Data4LibraryError as e:
+                    detailed = None
+                    detail_failed_isbns.add(b_info['isbn13'])
+                    print(f"⚠️ 상세 조회 실패({b_info['isbn13']}): {e}")
+                try:
+                    row = build_book_row(b_info, detailed, categories.get(category_name(b_info)))
+                except (ValueError, TypeError) as e:
+                    # 출판 연도 등 형식이 잘못된 도서 1권만 건너뜀
+                    print(f"❌ 도서 건너뜀({b_info['isbn13']}): {e}")
+                    continue
+                (batch if detailed is not None else partial).append(row)
+                if len(batch) + len(partial) >= batch_size:
+                    saved += upsert_books(batch) + upsert_books(partial, BOOK_UPSERT_FIELDS_WITHOUT_DETAIL)
+                    batch, partial = [], []
+                    elapsed = time.monotonic() - started
+                    print(f"📦 {saved}권 저장 ({saved / elapsed:.1f} books/s)")
+            saved += upsert_books(batch) + upsert_books(partial, BOOK_UPSERT_FIELDS_WITHOUT_DETAIL)
+
+    if not dry_run:
+        # 5. 성공한 KDC만 워터마크 갱신 (실패한 KDC나 상세 조회에 실패한 도서가 있는 KDC는 다음 실행 때 다시)
+        for kdc, docs in kdc_docs.items():
+            has_failed_detail = any(d.get('doc', {}).get('isbn13') in detail_failed_isbns for d in docs)
+            if kdc not in failed_kdcs and not has_failed_detail:
+                state[kdc] = {'end_dt': end_dt, 'pages': pages, 'hash': _page_hash(docs)}
+        SyncState.save_value(POPULAR_SYNC_STATE, state)
+        similarity_index.flush()
+
+    elapsed = time.monotonic() - started
+    if dry_run:
+        print(f"🧪 dry-run: 저장 {len(full)}권 / 대출 건수 갱신 {len(loan_only)}권 예정 ({elapsed:.1f}초)")
+    else:
+        print(
+            f"✨ 동기화 완료: {saved}권 저장 (상세 조회 실패 {len(detail_failed_isbns)}권) / 대출 건수 {loan_updated}권 갱신 / {elapsed:.1f}초 "
+            f"({saved / elapsed if elapsed else 0:.1f} books/s)"
+        )
+    return {
+        "books": saved, "loan_updated": loan_updated, "detail_failed": len(detail_failed_isbns),
+        "would_write": len(full), "would_update_loan": len(loan_only), "unchanged": unchanged,
+        "skipped_kdcs": skipped_kdcs + len(unchanged_kdcs), "dry_run": dry_run,
+        "seconds": round(elapsed, 2), "books_per_sec": round(saved / elapsed, 2) if elapsed else 0,
+    }
+
+
+# --- 줄거리 보강(backfill) ---
+# 체크포인트(마지막 처리 id)와 일시적 오류로 실패한 ISBN 재시도 목록을 SyncState에 저장해
+# 프로세스가 죽어도 이어서 실행한다. API가 정상 응답했지만 줄거리가 없는 도서는 안내 문구로 채워 다시 조회하지 않는다.
+
+DESCRIPTION_BACKFILL_STATE = 'description_backfill'
+DESCRIPTION_PLACEHOLDER = "상세 정보가 제공되지 않는 도서입니다."
+
+
+def missing_description_q():
+    return Q(description__isnull=True) | Q(description="") | Q(description__contains="준비 중")
+
+
+def _fetch_description(limiter, isbn):
+    from .utils import fetch_book_detail
+    limiter.acquire()
+    return fetch_book_detail(isbn)["description"]
+
+
+def _fetch_descriptions(pool, limiter, books):
+    """
+    books의 줄거리를 동시에 조회해 객체에 채움 (저장은 호출자가 체크포인트와 함께)
+    반환: (바뀐 도서 목록, 보강된 권수, 일시적 오류로 실패한 ISBN 목록, 서킷 open 여부)
+    """
+    futures = {pool.submit(_fetch_description, limiter, book.isbn): book for book in books}
+    changed, failed, circuit_open = [], [], False
+    filled = 0
+    for future in as_completed(futures):
+        book = futures[future]
+        try:
+            description = future.result()
+        except Data4LibraryError as e:
+            failed.append(book.isbn)
+            circuit_open = circuit_open or isinstance(e, CircuitOpenError)
+            continue
+        if description:
+            filled += 1
+        book.description = description or DESCRIPTION_PLACEHOLDER
+        changed.append(book)
+    return changed, filled, failed, circuit_open
+
+
+def _save_descriptions(books, state):
+    """description만 bulk_update 하고 같은 트랜잭션에서 체크포인트 저장"""
+    from .signals import notify_books_changed
+
+    with transaction.atomic():
+        if books:
+            Book.objects.bulk_update(books, ['description'])
+        SyncState.save_value(DESCRIPTION_BACKFILL_STATE, state)
+    # 줄거리도 검색 대상이므로 bulk 쓰기 후 인덱스를 직접 갱신
+    notify_books_changed(books)
+
+
+def run_description_backfill(workers=None, rate=None, batch_size=100, restart=False):
+    """
+    줄거리가 없는 도서를 id 순서로 batch_size씩 보강하고, 배치마다 체크포인트를 저장
+    1. 지난번 재시도 목록(retry) 먼저 처리
+    2. 체크포인트(last_id) 이후 도서를 이어서 처리
+    3. 끝까지 처리하면 체크포인트를 초기화 (재시도 목록은 남김)
+    """
+    workers = workers or getattr(settings, 'SYNC_WORKERS', 8)
+    limiter = RateLimiter(rate) if rate else default_rate_limiter()
+    state = {} if restart else SyncState.load(DESCRIPTION_BACKFILL_STATE)
+    last_id = state.get('last_id', 0)
+    retry = list(dict.fromkeys(state.get('retry', [])))
+
+    started = time.monotonic()
+    processed = filled = 0
+    interrupted = False
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='desc-backfill') as pool:
+        # 1. 재시도 목록 (그 사이 줄거리가 채워진 도서는 자연히 빠짐)
+        if retry:
+            print(f"🔁 재시도 {len(retry)}권")
+        pending, retry = retry, []
+        for i in range(0, len(pending), batch_size):
+            isbns = pending[i:i + batch_size]
+            books = list(Book.objects.filter(missing_description_q(), isbn__in=isbns))
+            changed, n, failed, interrupted = _fetch_descriptions(pool, limiter, books)
+            retry.extend(failed)
+            if interrupted:
+                retry.extend(pending[i + batch_size:])
+            _save_descriptions(changed, {'last_id': last_id, 'retry': retry})
+            processed += len(books)
+            filled += n
+            if interrupted:
+                break
+
+        # 2. 체크포인트 이후 도서
+        targets = Book.objects.filter(missing_description_q()).order_by('id')
+        if not interrupted:
+            print(f"🚀 줄거리 보강 시작 (id > {last_id}, 남은 {targets.filter(id__gt=last_id).count()}권)")
+        while not interrupted:
+            books = list(targets.filter(id__gt=last_id)[:batch_size])
+            if not books:
+                break
+            changed, n, failed, interrupted = _fetch_descriptions(pool, limiter, books)
+            retry.extend(failed)
+            last_id = books[-1].id
+            _save_descriptions(changed, {'last_id': last_id, 'retry': retry})
+            processed += len(books)
+            filled += n
+            elapsed = time.monotonic() - started
+            print(f"📦 id {last_id}까지 {processed}권 처리, {filled}권 보강 ({processed / elapsed:.1f} books/s)")
+
+    if interrupted:
+        print("⚠️ API 서킷이 열려 중단했습니다. 잠시 후 다시 실행하면 체크포인트부터 이어서 진행합니다.")
+    else:
+        # 3. 한 바퀴 완료: 다음 실행은 처음부터 (이미 보강된 도서는 대상에서 빠짐)
+        SyncState.save_value(DESCRIPTION_BACKFILL_STATE, {'last_id': 0, 'retry': retry})
+
+    elapsed = time.monotonic() - started
+    print(f"✨ 완료: {processed}권 중 {filled}권 보강됨 / 재시도 대기 {len(retry)}권 ({elapsed:.1f}초)")
+    return {
+        "processed": processed, "filled": filled, "retry": len(retry),
+        "interrupted": interrupted, "seconds": round(elapsed, 2),
+    }
+
+
+# --- 도서관 목록 동기화 ---
+# 지역별로 모든 페이지를 끝까지 조회하고(지역끼리는 동시에), 기존 Library 행과 비교해
+# 새로 생겼거나 값이 바뀐 도서관만 bulk로 저장한다.
+
+LIBRARY_REGIONS = ["11", "31", "22", "21", "23", "24", "25", "26", "32", "33", "34", "35", "36", "37", "38", "39"]
+LIBRARY_SYNC_FIELDS = ['lib_name', 'address', 'tel', 'latitude', 'longitude', 'homepage']
+LIBRARY_PAGE_SIZE = 100
+
+
+def _to_float(value):
+    try:
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def build_library_row(lib_info):
+    return {
+        'lib_name': lib_info.get('libName'),
+        'address': lib_info.get('address'),
+        'tel': lib_info.get('tel'),
+        'latitude': _to_float(lib_info.get('latitude')),
+        'longitude': _to_float(lib_info.get('longitude')),
+        'homepage': lib_info.get('homepage'),
+    }
+
+
+def _fetch_region_libraries(limiter, region, page_size=LIBRARY_PAGE_SIZE):
+    """
+    한 지역의 도서관을 모든 페이지에 걸쳐 조회
+    pageSize보다 적게 온 페이지를 마지막으로 보고, numFound는 (빠졌거나 틀릴 수 있으므로) 상한으로만 쓴다.
+    """
+    libs, page = [], 1
+    while True:
+        limiter.acquire()
+        resp = data4library.get("libSrch", {"region": region, "pageNo": page, "pageSize": page_size}).get('response', {})
+        items = resp.get('libs', [])
+        libs.extend(item.get('lib', {}) for item in items)
+        total = int(resp.get('numFound') or 0)
+        if len(items) < page_size or (total and len(libs) >= total):
+            return libs
+        page += 1
+
+
+def run_library_sync(workers=None, rate=None, page_size=LIBRARY_PAGE_SIZE):
+    """전국 도서관 목록을 동기화하고 바뀐 행만 저장 (삭제는 하지 않음)"""
+    from .geo import library_index
+
+    workers = workers or getattr(settings, 'SYNC_WORKERS', 8)
+    limiter = RateLimiter(rate) if rate else default_rate_limiter()
+    started = time.monotonic()
+
+    # 1. 지역별 전체 페이지 동시 조회 (같은 도서관이 여러 번 나오면 마지막 값 사용)
+    fetched, failed_regions = {}, []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lib-sync') as pool:
+        futures = {pool.submit(_fetch_region_libraries, limiter, region, page_size): region for region in LIBRARY_REGIONS}
+        for future in as_completed(futures):
+            region = futures[future]
+            try:
+                libs = future.result()
+            except Exception as e:
+                failed_regions.append(region)
+                print(f"Error region {region}: {e}")
+                continue
+            for lib_info in libs:
+                if lib_info.get('libCode'):
+                    fetched[lib_info['libCode']] = build_library_row(lib_info)
+
+    # 2. 기존 행과 비교해 새 도서관 / 바뀐 도서관만 골라내기
+    existing = Library.objects.in_bulk(list(fetched.keys()))
+    created, changed = [], []
+    for code, row in fetched.items():
+        lib = existing.get(code)
+        if lib is None:
+            created.append(Library(lib_code=code, **row))
+        elif any(getattr(lib, field) != value for field, value in row.items()):
+            for field, value in row.items():
+                setattr(lib, field, value)
+            changed.append(lib)
+
+    # 3. bulk 저장 (시그널을 거치지 않으므로 위치 인덱스는 직접 무효화: 웹 서버 등 다른 프로세스는 DB 버전 표시를 보고 다시 만든다)
+    with transaction.atomic():
+        Library.objects.bulk_create(created, batch_size=500)
+        Library.objects.bulk_update(changed, LIBRARY_SYNC_FIELDS, batch_size=500)
+    if created or changed:
+        library_index.invalidate()
+
+    elapsed = time.monotonic() - started
+    print(
+        f"✅ 도서관 {len(fetched)}곳 조회: 신규 {len(created)} / 변경 {len(changed)} / "
+        f"그대로 {len(fetched) - len(created) - len(changed)} ({elapsed:.1f}초)"
+    )
+    if failed_regions:
+        print(f"⚠️ 조회 실패 지역: {', '.join(sorted(failed_regions))}")
+    return {
+        "fetched": len(fetched), "created": len(created), "updated": len(changed),
+        "failed_regions": sorted(failed_regions), "seconds": round(elapsed, 2),
+    }
+
+
+# --- 성별/연령대별 인기 도서 스냅샷 ---
+# AI 추천 프롬프트의 "해당 연령대/성별 인기 도서"는 (성별, 연령, 집계 기간)에만 의존하고 기간은 하루 1번 바뀐다.
+# 추천 때마다 loanItemSrch를 부르지 않고 코호트 18개를 미리 받아 테이블에 저장해 두고 읽는다.
+# 갱신에 실패해도 이전 스냅샷이 남아 있으므로 추천은 가장 최근 값을 계속 쓴다.
+
+DEMOGRAPHIC_GENDERS = ['0', '1', '2']
+DEMOGRAPHIC_AGES = {'10s': '14', '20s': '20', '30s': '30', '40s': '40', '50s': '50', '60s+': '60'}
+DEMOGRAPHIC_WINDOW_DAYS = 90
+DEMOGRAPHIC_TOP_N = 10
+DEMOGRAPHIC_KEEP_DAYS = 7  # 코호트별로 이 기간보다 오래된 스냅샷은 새 스냅샷 저장 시 삭제
+
+
+def demographic_codes(gender, age_group):
+    """User.gender / age_group → 도서관정보나루 (성별 코드, 연령 코드)"""
+    gender_code = '0' if gender == 'M' else '1' if gender == 'F' else '2'
+    return gender_code, DEMOGRAPHIC_AGES.get(age_group, '20')
+
+
+def demographic_window():
+    """집계 기간 (시작일, 종료일): 어제까지 최근 90일"""
+    end = datetime.now().date() - timedelta(days=1)
+    return end - timedelta(days=DEMOGRAPHIC_WINDOW_DAYS - 1), end
+
+
+def _fetch_demographic(limiter, gender, age, start, end):
+    params = {
+        "startDt": start.isoformat(), "endDt": end.isoformat(),
+        "gender": gender, "age": age, "pageSize": DEMOGRAPHIC_TOP_N,
+    }
+    limiter.acquire()
+    docs = data4library.get("loanItemSrch", params).get('response', {}).get('docs', [])
+    books = []
+    for d in docs:
+        b_info = d.get('doc', {})
+        if b_info.get('bookname'):
+            books.append({"isbn13": b_info.get('isbn13'), "title": b_info['bookname'], "loan_count": list_loan_count(b_info)})
+    return books
+
+
+def demographic_popularity_is_stale():
+    """오늘 기준 집계 기간의 스냅샷이 없는 코호트가 있으면 True"""
+    _, end = demographic_window()
+    cohorts = len(DEMOGRAPHIC_GENDERS) * len(DEMOGRAPHIC_AGES)
+    return DemographicPopularity.objects.filter(end_dt=end).count() < cohorts
+
+
+def run_demographic_popularity_refresh(workers=None, rate=None, force=False):
+    """성별 × 연령대 코호트별 인기 대출 도서를 받아 스냅샷 저장 (이미 오늘 스냅샷이 있는 코호트는 건너뜀)"""
+    if not getattr(settings, 'LIBRARY_API_KEY', None):
+        print("⚠️ LIBRARY_API_KEY 미설정: 인기 도서 스냅샷 갱신 건너뜀")
+        return {"refreshed": 0, "skipped": 0, "failed": 0}
+
+    workers = workers or getattr(settings, 'SYNC_WORKERS', 8)
+    limiter = RateLimiter(rate) if rate else default_rate_limiter()
+    start, end = demographic_window()
+    started = time.monotonic()
+
+    cohorts = [(g, a) for g in DEMOGRAPHIC_GENDERS for a in DEMOGRAPHIC_AGES.values()]
+    done = set() if force else set(
+        DemographicPopularity.objects.filter(end_dt=end).values_list('gender', 'age')
+    )
+    todo = [c for c in cohorts if c not in done]
+
+    fetched, failed = {}, []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='demographic') as pool:
+        futures = {pool.submit(_fetch_demographic, limiter, g, a, start, end): (g, a) for g, a in todo}
+        for future in as_completed(futures):
+            cohort = futures[future]
+            try:
+                fetched[cohort] = future.result()
+            except Exception as e:
+                failed.append(cohort)
+                print(f"Error demographic {cohort}: {e}")
+
+    cutoff = end - timedelta(days=DEMOGRAPHIC_KEEP_DAYS)
+    with transaction.atomic():
+        for (gender, age), books in fetched.items():
+            DemographicPopularity.objects.update_or_create(
+                gender=gender, age=age, end_dt=end, defaults={'books': books}
+            )
+            DemographicPopularity.objects.filter(gender=gender, age=age, end_dt__lt=cutoff).delete()
+
+    elapsed = time.monotonic() - started
+    print(
+        f"✅ 성별/연령대 인기 도서 스냅샷({end}): 갱신 {len(fetched)} / 건너뜀 {len(done)} / "
+        f"실패 {len(failed)} ({elapsed:.1f}초)"
+    )
+    return {"refreshed": len(fetched), "skipped": len(done), "failed": len(failed), "seconds": round(elapsed, 2)}
@@ -0,0 +1,319 @@
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import RecommendationJob
+
+# AI 추천 생성 작업 큐 (DB 테이블 + 고정 크기 워커 풀)
+# - 회원가입/프로필 수정 요청은 작업 행만 넣고 바로 응답한다 (요청마다 스레드를 띄우지 않음)
+# - 사용자당 대기 작업은 1개: 연속 저장은 기존 작업의 실행 시각만 뒤로 미룬다 (디바운스)
+# - 워커 프로세스(python manage.py recommendation_worker)가 N개 스레드로 꺼내 실행, 실패 시 지수 백오프 재시도
+# - 실행 중 워커가 죽은 작업은 RECOMMENDATION_JOB_TIMEOUT 후 다시 대기로 돌린다
+# - 찜/소장/채팅 시그널은 웹 프로세스에서만 발생하므로 워커의 동시 출현 행렬/후보 풀은
+#   웹 프로세스가 갱신한 버전 표시를 보고 스스로 다시 빌드한다
+
+STATS_INTERVAL = 60   # 워커 통계 출력/정리 주기 (초)
+STATS_WINDOW = 200    # 지연 통계에 쓰는 최근 완료 작업 수
+DEMOGRAPHIC_REFRESH_INTERVAL = 3600  # 인기 도서 스냅샷이 오래됐는지 확인하는 주기 (초)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# --- 등록 ---
+
+def enqueue_recommendation(user, force=True, delay=None):
+    """
+    사용자 추천 생성 작업 등록. 이미 대기 중이면 새로 만들지 않고 실행 시각만 미룬다.
+    반환: 새 작업을 만들었으면 True, 기존 대기 작업에 합쳤으면 False
+    """
+    if delay is None:
+        delay = _setting('RECOMMENDATION_JOB_DEBOUNCE', 5)
+    run_after = timezone.now() + timedelta(seconds=delay)
+    changes = {'run_after': run_after}
+    if force:
+        changes['force'] = True
+
+    if RecommendationJob.objects.filter(user=user, status=RecommendationJob.PENDING).update(**changes):
+        return False
+    try:
+        with transaction.atomic():
+            RecommendationJob.objects.create(user=user, force=force, run_after=run_after)
+        return True
+    except IntegrityError:
+        # 동시에 들어온 요청이 먼저 만들었으면 그 작업에 합친다
+        RecommendationJob.objects.filter(user=user, status=RecommendationJob.PENDING).update(**changes)
+        return False
+
+
+def request_recommendation_refresh(user):
+    """
+    추천 조회 중 추천이 없거나 오래된 것을 발견했을 때 백그라운드 갱신 요청.
+    이미 대기/실행 중이거나 RECOMMENDATION_REFRESH_COOLDOWN 안에 시도한 작업이 있으면 다시 넣지 않는다.
+    """
+    recent = timezone.now() - timedelta(seconds=_setting('RECOMMENDATION_REFRESH_COOLDOWN', 600))
+    busy = RecommendationJob.objects.filter(user=user).filter(
+        Q(status__in=[RecommendationJob.PENDING, RecommendationJob.RUNNING]) | Q(created_at__gte=recent)
+    )
+    if busy.exists():
+        return False
+    # 디바운스 시간 안에 스트리밍 요청이 오면 그 요청이 작업을 가져가 바로 생성한다 (claim_pending_job)
+    return enqueue_recommendation(user, force=True)
+
+
+# --- 실행 ---
+
+def claim_next_job():
+    """실행 시각이 지난 대기 작업 1개를 실행 중으로 바꿔 가져온다 (같은 사용자 작업은 동시에 실행하지 않음)"""
+    for _ in range(5):
+        now = timezone.now()
+        running_users = RecommendationJob.objects.filter(status=RecommendationJob.RUNNING).values('user_id')
+        job_id = (
+            RecommendationJob.objects.filter(status=RecommendationJob.PENDING, run_after__lte=now)
+            .exclude(user_id__in=running_users)
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        # 상태 조건부 UPDATE로 선점: 다른 워커가 먼저 가져갔으면 0건이므로 다음 후보로
+        claimed = RecommendationJob.objects.filter(id=job_id, status=RecommendationJob.PENDING).update(
+            status=RecommendationJob.RUNNING, started_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return RecommendationJob.objects.select_related('user').get(id=job_id)
+    return None
+
+
+def claim_pending_job(user):
+    """워커 대신 요청 처리 중에 바로 실행할 때(스트리밍 추천) 사용자의 대기 작업을 선점. 없으면 None"""
+    job_id = RecommendationJob.objects.filter(user=user, status=RecommendationJob.PENDING).values_list('id', flat=True).first()
+    if job_id is None:
+        return None
+    claimed = RecommendationJob.objects.filter(id=job_id, status=RecommendationJob.PENDING).update(
+        status=RecommendationJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+    )
+    return RecommendationJob.objects.get(id=job_id) if claimed else None
+
+
+def _backoff(attempts):
+    base = _setting('RECOMMENDATION_JOB_BACKOFF', 30)
+    return base * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+
+
+def finish_job(job, status, error=''):
+    RecommendationJob.objects.filter(id=job.id).update(status=status, finished_at=timezone.now(), last_error=error)
+
+
+def fail_job(job, error):
+    """재시도 횟수가 남았으면 백오프 후 다시 대기, 아니면 실패로 종료"""
+    if job.attempts >= _setting('RECOMMENDATION_JOB_MAX_ATTEMPTS', 4):
+        finish_job(job, RecommendationJob.FAILED, error)
+        print(f"❌ 추천 작업 실패 (user={job.user_id}, {job.attempts}회 시도): {error}")
+        return
+    try:
+        RecommendationJob.objects.filter(id=job.id).update(
+            status=RecommendationJob.PENDING,
+            run_after=timezone.now() + timedelta(seconds=_backoff(job.attempts)),
+            last_error=error,
+        )
+    except IntegrityError:
+        # 실행 중에 같은 사용자 작업이 새로 들어왔으면 그 작업이 대신 처리한다
+        finish_job(job, RecommendationJob.FAILED, f"{error} (대기 중인 새 작업으로 대체)")
+
+
+def supersede_pending_jobs(user_ids, before):
+    """
+    일괄 사전 계산으로 추천을 새로 만든 사용자의 대기 작업을 완료 처리 (같은 추천을 다시 만들지 않도록)
+    before 이후로 실행 시각이 밀린 작업(계산 도중 프로필 수정)은 그대로 둔다.
+    """
+    now = timezone.now()
+    return RecommendationJob.objects.filter(
+        user_id__in=user_ids, status=RecommendationJob.PENDING, run_after__lte=before
+    ).update(status=RecommendationJob.DONE, started_at=now, finished_at=now, last_error='일괄 사전 계산으로 대체')
+
+
+def run_job(job):
+    from .utils import generate_ai_recommendations
+
+    if not settings.OPENAI_API_KEY:
+        # 설정 문제는 재시도해도 같으므로 바로 실패
+        finish_job(job, RecommendationJob.FAILED, "OPENAI_API_KEY 미설정")
+        return False
+    try:
+        ok = generate_ai_recommendations(job.user, job.force)
+    except Exception as e:
+        ok, error = False, str(e)
+    else:
+        error = "" if ok else "AI 추천 생성 실패"
+    if ok:
+        finish_job(job, RecommendationJob.DONE)
+    else:
+        fail_job(job, error)
+    return ok
+
+
+def requeue_stale_jobs():
+    """실행 중 상태로 RECOMMENDATION_JOB_TIMEOUT을 넘긴 작업(워커 비정상 종료)을 다시 처리 대상으로"""
+    deadline = timezone.now() - timedelta(seconds=_setting('RECOMMENDATION_JOB_TIMEOUT', 300))
+    stale = list(RecommendationJob.objects.filter(status=RecommendationJob.RUNNING, started_at__lt=deadline))
+    for job in stale:
+        fail_job(job, "실행 시간 초과 (워커 중단)")
+    return len(stale)
+
+
+def prune_finished_jobs():
+    """보관 기간이 지난 완료/실패 작업 삭제"""
+    cutoff = timezone.now() - timedelta(days=_setting('RECOMMENDATION_JOB_RETENTION_DAYS', 7))
+    deleted, _ = RecommendationJob.objects.filter(
+        status__in=[RecommendationJob.DONE, RecommendationJob.FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+# --- 통계 ---
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def queue_stats():
+    """대기열 깊이와 최근 완료 작업의 지연 시간(초)"""
+    now = timezone.now()
+    jobs = RecommendationJob.objects
+    pending = jobs.filter(status=RecommendationJob.PENDING)
+    oldest = pending.order_by('run_after').values_list('run_after', flat=True).first()
+
+    recent = list(
+        jobs.filter(status=RecommendationJob.DONE)
+        .order_by('-finished_at')
+        .values_list('created_at', 'started_at', 'finished_at')[:STATS_WINDOW]
+    )
+    total = [(finished - created).total_seconds() for created, _, finished in recent]
+    run = [(finished - started).total_seconds() for _, started, finished in recent]
+    return {
+        'pending': pending.count(),
+        'due': pending.filter(run_after__lte=now).count(),
+        'running': jobs.filter(status=RecommendationJob.RUNNING).count(),
+        'failed': jobs.filter(status=RecommendationJob.FAILED).count(),
+        'oldest_due_age': max(0.0, (now - oldest).total_seconds()) if oldest else 0.0,
+        'done_sampled': len(recent),
+        'latency_p50': _percentile(total, 0.5),
+        'latency_p95': _percentile(total, 0.95),
+        'run_p50': _percentile(run, 0.5),
+        'run_p95': _percentile(run, 0.95),
+    }
+
+
+def format_stats(stats):
+    def sec(value):
+        return "-" if value is None else f"{value:.1f}s"
+
+    return (
+        f"대기 {stats['pending']} (실행 가능 {stats['due']}, 최장 {sec(stats['oldest_due_age'])}) · "
+        f"실행 중 {stats['running']} · 실패 {stats['failed']} · "
+        f"지연 p50 {sec(stats['latency_p50'])} / p95 {sec(stats['latency_p95'])} · "
+        f"실행 p50 {sec(stats['run_p50'])} / p95 {sec(stats['run_p95'])} (최근 {stats['done_sampled']}건)"
+    )
+
+
+# --- 워커 ---
+
+def _refresh_demographic_popularity():
+    """추천 프롬프트가 읽는 성별/연령대별 인기 도서 스냅샷을 하루 1번 갱신 (실패해도 이전 스냅샷 사용)"""
+    from .ingest import demographic_popularity_is_stale, run_demographic_popularity_refresh
+
+    try:
+        if demographic_popularity_is_stale():
+            run_demographic_popularity_refresh()
+    except Exception as e:
+        print(f"⚠️ 인기 도서 스냅샷 갱신 실패: {e}")
+
+
+def _worker_loop(stop, poll_interval, burst, processed):
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if burst:
+                    return
+                stop.wait(poll_interval)
+                continue
+            run_job(job)
+            processed.append(job.id)
+    finally:
+        connection.close()
+
+
+def run_worker(workers=None, poll_interval=1.0, burst=False, stop=None, refresh_demographics=True):
+    """
+    고정 개수 스레드로 작업 처리. burst=True면 실행 가능한 작업이 없어질 때 종료.
+    stop(threading.Event)을 set하면 진행 중인 작업만 마치고 종료.
+    refresh_demographics=False면 인기 도서 스냅샷을 갱신하지 않음 (웹 프로세스 내장 워커)
+    """
+    workers = workers or _setting('RECOMMENDATION_WORKERS', 2)
+    stop = stop or threading.Event()
+    processed = []  # list.append는 스레드 안전
+
+    requeue_stale_jobs()
+    threads = [
+        threading.Thread(
+            target=_worker_loop, args=(stop, poll_interval, burst, processed), name=f"rec-worker-{i}", daemon=True
+        )
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+    print(f"👷 추천 작업 워커 시작 (스레드 {workers}개)")
+
+    last_tick = time.monotonic()
+    last_refresh = None
+    try:
+        while any(t.is_alive() for t in threads):
+            if refresh_demographics and not burst and (last_refresh is None or time.monotonic() - last_refresh >= DEMOGRAPHIC_REFRESH_INTERVAL):
+                last_refresh = time.monotonic()
+                _refresh_demographic_popularity()
+            for t in threads:
+                t.join(timeout=1.0)
+            if time.monotonic() - last_tick >= STATS_INTERVAL:
+                last_tick = time.monotonic()
+                requeue_stale_jobs()
+                prune_finished_jobs()
+                print(f"📊 추천 작업 큐: {format_stats(queue_stats())}")
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        connection.close()
+    return len(processed)
+
+
+_embedded_lock = threading.Lock()
+_embedded_started = False
+
+
+def start_embedded_worker():
+    """
+    웹 서버 프로세스 안에서 워커 풀을 백그라운드로 실행 (RECOMMENDATION_WORKER_EMBEDDED로 켠 경우만)
+    인기 도서 스냅샷 갱신(외부 API 호출)은 웹 프로세스에서 돌리지 않는다.
+    """
+    global _embedded_started
+    with _embedded_lock:
+        if _embedded_started:
+            return
+        _embedded_started = True
+    threading.Thread(
+        target=run_worker, kwargs={'refresh_demographics': False}, name="rec-worker-main", daemon=True
+    ).start()
@@ -0,0 +1,303 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from .cache import TTLCache, MISSING
+
+# OpenAI 호출 게이트웨이
+# - 프로세스 공용 클라이언트 1개 (커넥션 재사용), 호출 타임아웃/재시도 횟수 고정
+# - 동시 호출 수 제한 (세마포어): 추천 작업이 몰려도 업스트림 요청은 LLM_MAX_CONCURRENCY개까지
+# - 정규화한 프롬프트 지문(fingerprint)으로 응답 캐시: 같은 코호트(연령대/성별/장르)의 같은 프롬프트는 1번만 호출
+# - 같은 지문의 요청이 진행 중이면 새로 호출하지 않고 그 결과를 기다린다 (single-flight)
+# - 호출마다 토큰 사용량/지연 시간 기록
+# - 스트리밍 호출: JSON 배열 응답의 객체가 완성되는 대로 1개씩 넘겨 첫 결과까지의 시간을 줄인다 (캐시/single-flight 공유)
+
+DEFAULT_BASE_URL = "https://gms.ssafy.io/gmsapi/api.openai.com/v1"
+RECENT_CALLS = 500  # 지연 통계에 쓰는 최근 호출 수
+
+
+class LLMError(Exception):
+    """LLM 호출 실패 (미설정, 타임아웃, 동시 호출 한도 초과, 잘못된 응답 등)"""
+
+
+def _normalize(text):
+    # 들여쓰기/빈 줄/연속 공백 차이는 같은 프롬프트로 본다
+    lines = (re.sub(r"\s+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def iter_json_objects(chunks):
+    """
+    스트리밍 텍스트 조각에서 최상위 JSON 객체({...})가 완성될 때마다 dict로 반환
+    배열 괄호, 쉼표, 코드 펜스(```json) 등 객체 밖의 글자는 무시하고, 해석할 수 없는 객체는 건너뛴다.
+    """
+    buf, depth, in_string, escaped = [], 0, False, False
+    for chunk in chunks:
+        for ch in chunk:
+            if depth:
+                buf.append(ch)
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = bool(depth)
+            elif ch == "{":
+                if not depth:
+                    buf = ["{"]
+                depth += 1
+            elif ch == "}" and depth:
+                depth -= 1
+                if not depth:
+                    try:
+                        yield json.loads("".join(buf))
+                    except ValueError:
+                        pass
+
+
+def fingerprint(model, messages, temperature):
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": [(m["role"], _normalize(m["content"])) for m in messages],
+    }
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """진행 중인 업스트림 호출 1건 (같은 지문의 후속 요청이 결과를 기다림)"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LLMGateway:
+    def __init__(self):
+        self.timeout = getattr(settings, 'LLM_TIMEOUT', 20)
+        self.max_retries = getattr(settings, 'LLM_MAX_RETRIES', 1)
+        self._slots = threading.BoundedSemaphore(getattr(settings, 'LLM_MAX_CONCURRENCY', 4))
+        self._cache = TTLCache(
+            'llm_responses',
+            ttl=getattr(settings, 'LLM_CACHE_TTL', 6 * 3600),
+            maxsize=getattr(settings, 'LLM_CACHE_MAXSIZE', 2048),
+        )
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "requests": 0, "cache_hits": 0, "coalesced": 0, "calls": 0, "errors": 0,
+            "prompt_tokens": 0, "completion_tokens": 0,
+        }
+        self._latencies = deque(maxlen=RECENT_CALLS)
+        self._first_token = deque(maxlen=RECENT_CALLS)  # 스트리밍 호출의 첫 토큰까지 걸린 시간
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+
+                    self._client = OpenAI(
+                        api_key=settings.OPENAI_API_KEY,
+                        base_url=getattr(settings, 'OPENAI_BASE_URL', DEFAULT_BASE_URL),
+                        timeout=self.timeout,
+                        max_retries=self.max_retries,
+                    )
+        return self._client
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self._counters[name] += delta
+
+    def complete(self, messages, model=None, temperature=0.8, parse=None, purpose="", use_cache=True):
+        """
+        채팅 완성 1건. parse(content)를 주면 그 결과를 반환/캐시한다 (parse가 실패한 응답은 캐시하지 않음)
+        같은 지문은 캐시 → 진행 중 호출 순으로 재사용하고, 둘 다 없을 때만 업스트림을 호출한다.
+        """
+        model, key, cached, flight, leader = self._prepare(messages, model, temperature, use_cache)
+        if cached is not MISSING:
+            return cached
+        if not leader:
+            return self._wait(flight)
+
+        try:
+            content = self._call(model, messages, temperature, purpose)
+            try:
+                result = parse(content) if parse else content
+            except Exception as e:
+                raise LLMError(f"응답 해석 실패: {e}") from e
+            if use_cache:
+                self._cache.set(key, result)
+            flight.result = result
+            return result
+        except Exception as e:
+            flight.error = e if isinstance(e, LLMError) else LLMError(str(e))
+            raise
+        finally:
+            self._finish_flight(key, flight)
+
+    def _prepare(self, messages, model, temperature, use_cache):
+        """(모델, 지문, 캐시 값 또는 MISSING, 진행 중 호출, 선두 여부)"""
+        if not settings.OPENAI_API_KEY:
+            raise LLMError("OPENAI_API_KEY 미설정")
+        model = model or getattr(settings, 'OPENAI_MODEL', "gpt-4o-mini")
+        key = fingerprint(model, messages, temperature)
+        self._count(requests=1)
+        if use_cache:
+            cached = self._cache.get(key)
+            if cached is not MISSING:
+                self._count(cache_hits=1)
+                return model, key, cached, None, False
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        return model, key, MISSING, flight, leader
+
+    def _wait(self, flight):
+        """같은 지문의 진행 중 호출 결과를 기다린다"""
+        self._count(coalesced=1)
+        # 세마포어 대기 + 타임아웃 × (재시도 + 1)을 넘기면 포기
+        if not flight.done.wait(self.timeout * (self.max_retries + 2)):
+            raise LLMError("동일 요청 대기 시간 초과")
+        if flight.error is not None:
+            raise flight.error
+        if flight.result is None:
+            raise LLMError("동일 요청이 중단됨")
+        return flight.result
+
+    def _finish_flight(self, key, flight):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        flight.done.set()
+
+    def stream_objects(self, messages, model=None, temperature=0.8, purpose="", use_cache=True):
+        """
+        스트리밍 호출: 응답(JSON 배열)의 객체가 완성될 때마다 dict로 yield
+        complete(parse=JSON 배열 해석)와 같은 지문/캐시를 쓰므로 캐시에 있으면 바로, 진행 중이면 기다렸다가 넘긴다.
+        """
+        model, key, cached, flight, leader = self._prepare(messages, model, temperature, use_cache)
+        if cached is not MISSING:
+            yield from cached
+            return
+        if not leader:
+            yield from self._wait(flight)
+            return
+
+        items = []
+        try:
+            for item in iter_json_objects(self._stream(model, messages, temperature, purpose)):
+                items.append(item)
+                yield item
+            if use_cache and items:
+                self._cache.set(key, items)
+            flight.result = items
+        except Exception as e:
+            flight.error = e if isinstance(e, LLMError) else LLMError(str(e))
+            raise
+        finally:
+            # 소비자가 중간에 끊으면(GeneratorExit) 결과 없이 끝나고, 기다리던 요청은 LLMError를 받는다
+            self._finish_flight(key, flight)
+
+    def _stream(self, model, messages, temperature, purpose):
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count(errors=1)
+            raise LLMError("LLM 동시 호출 한도 초과")
+        started = time.perf_counter()
+        first_token, usage, stream = None, None, None
+        try:
+            stream = self.client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature,
+                stream=True, stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            self._count(errors=1)
+            raise LLMError(f"{type(e).__name__}: {e}") from e
+        finally:
+            self._slots.release()
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        self._count(calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        with self._stats_lock:
+            self._latencies.append(elapsed)
+            if first_token is not None:
+                self._first_token.append(first_token)
+        print(
+            f"🤖 LLM 스트리밍{f'({purpose})' if purpose else ''}: 첫 토큰 {first_token or 0:.2f}s · 전체 {elapsed:.2f}s · "
+            f"토큰 {prompt_tokens}+{completion_tokens}"
+        )
+
+    def _call(self, model, messages, temperature, purpose):
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count(errors=1)
+            raise LLMError("LLM 동시 호출 한도 초과")
+        started = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature
+            )
+        except Exception as e:
+            self._count(errors=1)
+            raise LLMError(f"{type(e).__name__}: {e}") from e
+        finally:
+            self._slots.release()
+
+        elapsed = time.perf_counter() - started
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        self._count(calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        with self._stats_lock:
+            self._latencies.append(elapsed)
+        print(
+            f"🤖 LLM 호출{f'({purpose})' if purpose else ''}: {elapsed:.2f}s · "
+            f"토큰 {prompt_tokens}+{completion_tokens}"
+        )
+        return response.choices[0].message.content or ""
+
+    def stats(self):
+        with self._stats_lock:
+            counters = dict(self._counters)
+            latencies = sorted(self._latencies)
+            first_token = sorted(self._first_token)
+        served = counters["cache_hits"] + counters["coalesced"]
+
+        def pct(values, q):
+            return round(values[min(len(values) - 1, int(len(values) * q))], 3) if values else None
+
+        return {
+            **counters,
+            "saved_rate": round(served / counters["requests"], 4) if counters["requests"] else 0.0,
+            "latency_p50": pct(latencies, 0.5),
+            "latency_p95": pct(latencies, 0.95),
+            "first_token_p50": pct(first_token, 0.5),
+        }
+
+
+llm = LLMGateway()
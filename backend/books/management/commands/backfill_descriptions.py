@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from books.ingest import run_description_backfill
+
+
+class Command(BaseCommand):
+    help = "줄거리가 없는 도서를 상세 API로 보강합니다. 중단되면 다음 실행 때 체크포인트부터 이어서 진행합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="동시 호출 스레드 수 (기본 SYNC_WORKERS)")
+        parser.add_argument('--rate', type=float, default=None, help="초당 최대 호출 수 (기본 DATA4LIBRARY_RATE_LIMIT)")
+        parser.add_argument('--batch-size', type=int, default=100, help="한 번에 저장할 권수 (체크포인트 단위)")
+        parser.add_argument('--restart', action='store_true', help="체크포인트와 재시도 목록을 버리고 처음부터")
+
+    def handle(self, *args, **options):
+        run_description_backfill(
+            workers=options['workers'], rate=options['rate'],
+            batch_size=options['batch_size'], restart=options['restart'],
+        )
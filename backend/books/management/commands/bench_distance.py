@@ -0,0 +1,50 @@
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from books.geo import haversine, rank_by_distance
+from books.utils import DEFAULT_LAT, DEFAULT_LON
+
+
+class Command(BaseCommand):
+    help = "거리 계산 벤치마크: 순수 파이썬 haversine 반복 vs NumPy 일괄 계산"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--k', type=int, default=5, help='상위 k개 순위 비교')
+
+    def _best_of(self, repeat, fn):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        k, repeat = options['k'], options['repeat']
+        self.stdout.write(f"{'N':>8} | {'스칼라 루프(ms)':>14} | {'NumPy(ms)':>10} | {'배수':>6}")
+        for n in options['sizes']:
+            # 국내 위경도 범위 안의 임의 좌표
+            lats = [rng.uniform(33.1, 38.6) for _ in range(n)]
+            lons = [rng.uniform(124.6, 131.9) for _ in range(n)]
+            lat_arr, lon_arr = np.array(lats), np.array(lons)
+
+            def scalar():
+                distances = [haversine(DEFAULT_LAT, DEFAULT_LON, la, lo) for la, lo in zip(lats, lons)]
+                return sorted(range(n), key=distances.__getitem__)[:k]
+
+            def vectorized():
+                order, _ = rank_by_distance(DEFAULT_LAT, DEFAULT_LON, lat_arr, lon_arr, k)
+                return order
+
+            if list(scalar()) != [int(i) for i in vectorized()]:
+                self.stderr.write(f"⚠️ N={n}: 두 방식의 순위가 다릅니다")
+
+            scalar_ms = self._best_of(repeat, scalar)
+            vector_ms = self._best_of(repeat, vectorized)
+            self.stdout.write(f"{n:>8} | {scalar_ms:>14.2f} | {vector_ms:>10.2f} | {scalar_ms / vector_ms:>5.1f}x")
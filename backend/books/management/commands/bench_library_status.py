@@ -0,0 +1,49 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from books.geo import library_index
+from books.models import Book
+from books.utils import DEFAULT_LAT, DEFAULT_LON, LIBRARY_STATUS_UNKNOWN, book_exist_cache, get_library_full_status
+
+
+class Command(BaseCommand):
+    help = (
+        "도서 상세 페이지의 도서관 실시간 소장 조회(get_library_full_status) 지연 시간 벤치마크. "
+        "DATA4LIBRARY_MODE=replay로 실행하면 네트워크 없이 주입한 지연/오류율 아래에서 측정합니다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='측정할 상세 페이지 요청 수')
+        parser.add_argument('--libraries', type=int, default=5, help='요청당 조회할 도서관 수')
+        parser.add_argument('--cold', action='store_true', help='요청마다 소장 캐시를 비워 항상 외부 호출')
+
+    def handle(self, *args, **options):
+        n, k = options['requests'], options['libraries']
+        libraries = library_index.nearest(DEFAULT_LAT, DEFAULT_LON, k=k)
+        isbns = list(Book.objects.order_by('-loan_count').values_list('isbn', flat=True)[:n])
+        if not libraries or not isbns:
+            self.stderr.write("❌ 도서관 또는 도서 데이터가 없습니다.")
+            return
+
+        self.stdout.write(
+            f"모드 {getattr(settings, 'DATA4LIBRARY_MODE', 'live')} / 요청 {len(isbns)}회 × 도서관 {len(libraries)}곳"
+            f"{' / 캐시 미사용' if options['cold'] else ''}"
+        )
+        latencies, unknown = [], 0
+        for isbn in isbns:
+            if options['cold']:
+                book_exist_cache.invalidate()
+            start = time.perf_counter()
+            results = get_library_full_status(isbn, libraries, DEFAULT_LAT, DEFAULT_LON)
+            latencies.append((time.perf_counter() - start) * 1000)
+            unknown += sum(1 for r in results if r['hasBook'] == LIBRARY_STATUS_UNKNOWN)
+
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        self.stdout.write(
+            f"지연(ms) p50 {p50:.1f} / p95 {p95:.1f} / p99 {p99:.1f} / 최대 {max(latencies):.1f}"
+        )
+        self.stdout.write(f"unknown 비율 {unknown / (len(isbns) * len(libraries)):.1%}")
+        self.stdout.write(f"캐시 {book_exist_cache.stats()}")
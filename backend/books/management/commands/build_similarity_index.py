@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from books.similarity import similarity_index
+
+
+class Command(BaseCommand):
+    help = "유사 도서 엔진(TF-IDF 희소 행렬)을 DB 전체로 다시 만들어 저장합니다. (IDF 재계산)"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = similarity_index.build()
+        similarity_index.save()
+        self.stdout.write(
+            f"✅ {count}권 / {time.perf_counter() - start:.1f}초 → {similarity_index.model_dir}"
+        )
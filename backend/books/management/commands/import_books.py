@@ -0,0 +1,28 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importer import import_fixture
+
+
+class Command(BaseCommand):
+    help = "fixture(JSON 배열)를 스트리밍으로 읽어 카테고리/도서관/도서를 배치 upsert 합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=os.path.join(settings.BASE_DIR, 'fixtures', 'books.json'))
+        parser.add_argument('--batch-size', type=int, default=500, help="모델별 한 번에 저장할 행 수")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"파일을 찾을 수 없습니다: {path}")
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size는 1 이상이어야 합니다.")
+
+        result = import_fixture(path, batch_size=options['batch_size'], progress=self.stdout.write)
+        self.stdout.write(
+            f"✅ 카테고리 {result['category']}개 / 도서관 {result['library']}개 / 도서 {result['book']}권 "
+            f"(건너뜀 {result['skipped']}건)"
+        )
+        self.stdout.write(f"⏱️ {result['rows']}건 / {result['seconds']}초 ({result['rows_per_sec']} rows/s)")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from books.precompute import run_recommendation_precompute
+
+
+class Command(BaseCommand):
+    help = "오래된 AI 추천을 코호트(연령대/성별/선호 장르) 단위로 묶어 일괄 재생성합니다. (야간 배치)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="동시 LLM 호출 스레드 수 (기본 LLM_MAX_CONCURRENCY)")
+        parser.add_argument('--batch-size', type=int, default=None, help="트랜잭션 1번에 저장하는 사용자 수 (기본 RECOMMENDATION_PRECOMPUTE_BATCH_SIZE)")
+        parser.add_argument('--active-days', type=int, default=None, help="이 기간 안에 로그인한 사용자만 (0이면 전체, 기본 RECOMMENDATION_PRECOMPUTE_ACTIVE_DAYS)")
+        parser.add_argument('--all', action='store_true', help="추천이 최신인 사용자도 다시 만들기")
+        parser.add_argument('--dry-run', action='store_true', help="대상 사용자/코호트 수만 출력")
+
+    def handle(self, *args, **options):
+        run_recommendation_precompute(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            active_days=options['active_days'],
+            include_fresh=options['all'],
+            dry_run=options['dry_run'],
+        )
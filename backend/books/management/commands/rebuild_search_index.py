@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from books import search
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = "도서 전문 검색(FTS5) 인덱스를 처음부터 다시 만듭니다."
+
+    def handle(self, *args, **options):
+        if not search.is_available(refresh=True):
+            self.stderr.write("❌ 검색 인덱스 테이블이 없습니다. migrate를 먼저 실행하세요.")
+            return
+        count = search.rebuild_index(Book.objects.all())
+        self.stdout.write(f"✅ {count}권 재색인 완료")
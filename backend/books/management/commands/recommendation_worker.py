@@ -0,0 +1,34 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from books.jobs import format_stats, queue_stats, run_worker
+
+
+class Command(BaseCommand):
+    help = "AI 추천 생성 작업 큐를 처리하는 워커를 실행합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="동시 처리 스레드 수 (기본 RECOMMENDATION_WORKERS)")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="대기열이 비었을 때 확인 간격 (초)")
+        parser.add_argument('--burst', action='store_true', help="실행 가능한 작업을 모두 처리하면 종료")
+        parser.add_argument('--stats', action='store_true', help="대기열 깊이/지연 통계만 출력하고 종료")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(format_stats(queue_stats()))
+            return
+
+        # SIGTERM(배포 재시작 등)에도 진행 중인 작업은 마치고 종료
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        try:
+            processed = run_worker(
+                workers=options['workers'], poll_interval=options['poll_interval'],
+                burst=options['burst'], stop=stop,
+            )
+        except KeyboardInterrupt:
+            stop.set()
+            return
+        self.stdout.write(f"✅ 처리한 작업 {processed}건 · {format_stats(queue_stats())}")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from books.ingest import run_demographic_popularity_refresh
+
+
+class Command(BaseCommand):
+    help = "성별/연령대별 인기 대출 도서 스냅샷을 갱신합니다. (AI 추천 프롬프트용, 하루 1번)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="동시 호출 스레드 수 (기본 SYNC_WORKERS)")
+        parser.add_argument('--rate', type=float, default=None, help="초당 최대 호출 수 (기본 DATA4LIBRARY_RATE_LIMIT)")
+        parser.add_argument('--force', action='store_true', help="오늘 스냅샷이 있어도 다시 받기")
+
+    def handle(self, *args, **options):
+        run_demographic_popularity_refresh(workers=options['workers'], rate=options['rate'], force=options['force'])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from books.ingest import run_popular_books_sync
+
+
+class Command(BaseCommand):
+    help = "KDC 분류별 인기 도서를 증분 동기화합니다. (바뀐 도서만 상세 조회/저장)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=2, help="KDC별 목록 페이지 수 (페이지당 50권)")
+        parser.add_argument('--workers', type=int, default=None, help="동시 호출 스레드 수 (기본 SYNC_WORKERS)")
+        parser.add_argument('--rate', type=float, default=None, help="초당 최대 호출 수 (기본 DATA4LIBRARY_RATE_LIMIT)")
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--dry-run', action='store_true', help="저장하지 않고 바뀔 행 수만 보고")
+        parser.add_argument('--force', action='store_true', help="워터마크/해시를 무시하고 전부 다시 받기")
+
+    def handle(self, *args, **options):
+        run_popular_books_sync(
+            pages=options['pages'], workers=options['workers'], rate=options['rate'],
+            batch_size=options['batch_size'], dry_run=options['dry_run'], force=options['force'],
+        )
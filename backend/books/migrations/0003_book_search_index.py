@@ -0,0 +1,56 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+# 이 마이그레이션 시점의 FTS 테이블 정의와 토큰화 방식을 그대로 고정해 둔다
+# (books.search가 나중에 바뀌어도 기존 마이그레이션이 깨지지 않도록 런타임 모듈을 import하지 않음)
+FTS_TABLE = "books_book_fts"
+FTS_COLUMNS = ("title", "author", "publisher", "description")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _tokenize(text):
+    tokens = []
+    for word in _WORD_RE.findall(unicodedata.normalize("NFC", text or "").lower()):
+        tokens.extend([word] if len(word) < 2 else [word[i:i + 2] for i in range(len(word) - 1)])
+    return " ".join(tokens)
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5는 SQLite 전용이므로 다른 DB에서는 건너뛴다 (검색은 icontains로 대체됨)
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    Book = apps.get_model("books", "Book")
+    placeholders = ", ".join(["%s"] * (len(FTS_COLUMNS) + 1))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5({', '.join(FTS_COLUMNS)}, tokenize='unicode61')"
+        )
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        rows = (
+            (book_id, *(_tokenize(value) for value in values))
+            for book_id, *values in Book.objects.values_list('id', *FTS_COLUMNS).iterator(chunk_size=500)
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) VALUES ({placeholders})", list(rows)
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
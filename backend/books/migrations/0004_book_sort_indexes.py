@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-loan_count', '-id'], name='book_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-pub_year', '-id'], name='book_latest_idx'),
+        ),
+    ]
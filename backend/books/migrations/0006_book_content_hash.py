@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_sync_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_recommendation_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemographicPopularity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gender', models.CharField(max_length=1)),
+                ('age', models.CharField(max_length=2)),
+                ('end_dt', models.DateField()),
+                ('books', models.JSONField(default=list)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('gender', 'age', 'end_dt')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_demographic_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='list_loan_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -20,6 +20,11 @@ class Book(models.Model):
     # 관계 설정
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='books')
     loan_count = models.IntegerField(default=0)
+
+    # 인기 도서 동기화 때 목록 API 응답(대출 건수 제외)의 해시. 같으면 상세 조회/재저장을 건너뜀
+    content_hash = models.CharField(max_length=40, blank=True, default='')
+    # 마지막으로 반영한 목록 API의 loanCnt (loan_count는 상세 조회의 누적 건수와 합친 값이라 목록끼리 비교할 때 사용)
+    list_loan_count = models.IntegerField(default=0)
     
     # 구매 원해요 
     wish_users = models.ManyToManyField(
@@ -34,6 +39,13 @@ class Book(models.Model):
         blank=True
     )
 
+    class Meta:
+        # 목록 정렬 키 (커서 페이지네이션이 이 인덱스를 타고 seek 함)
+        indexes = [
+            models.Index(fields=['-loan_count', '-id'], name='book_popular_idx'),
+            models.Index(fields=['-pub_year', '-id'], name='book_latest_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -77,4 +89,68 @@ class Library(models.Model):
     homepage = models.URLField(max_length=500, null=True, blank=True)
 
     def __str__(self):
-        return self.lib_name
\ No newline at end of file
+        return self.lib_name
+
+class SyncState(models.Model):
+    """수집/보강 작업의 진행 상태(체크포인트) 저장소. 작업이 중단돼도 이어서 실행할 수 있게 한다."""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def load(cls, name):
+        state = cls.objects.filter(name=name).first()
+        return dict(state.value) if state else {}
+
+    @classmethod
+    def save_value(cls, name, value):
+        cls.objects.update_or_create(name=name, defaults={'value': value})
+
+class RecommendationJob(models.Model):
+    """AI 추천 생성 작업 큐 (DB 보관: 서버가 재시작돼도 유지되고 별도 워커 프로세스가 처리)"""
+    PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+    STATUS_CHOICES = [
+        (PENDING, '대기'),
+        (RUNNING, '실행 중'),
+        (DONE, '완료'),
+        (FAILED, '실패'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recommendation_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    force = models.BooleanField(default=True)  # 기존 추천이 있어도 다시 생성
+    run_after = models.DateTimeField()         # 디바운스/재시도 대기: 이 시각 이후에 실행
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'], name='rec_job_status_run_after')]
+        constraints = [
+            # 사용자당 대기 작업은 1개만 (중복 요청은 기존 대기 작업에 합쳐진다)
+            models.UniqueConstraint(
+                fields=['user'], condition=models.Q(status='pending'), name='rec_job_one_pending_per_user'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.status}"
+
+class DemographicPopularity(models.Model):
+    """성별/연령대별 최근 인기 대출 도서 스냅샷 (AI 추천 프롬프트용, 하루 1번 갱신)"""
+    gender = models.CharField(max_length=1)  # 도서관정보나루 성별 코드 (0 남성, 1 여성, 2 기타)
+    age = models.CharField(max_length=2)     # 도서관정보나루 연령 코드 (14, 20, 30, 40, 50, 60)
+    end_dt = models.DateField()              # 집계 기간 마지막 날 (시작일은 그 90일 전)
+    books = models.JSONField(default=list)   # 순위순 [{"isbn13", "title", "loan_count"}]
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('gender', 'age', 'end_dt')
+
+    def __str__(self):
+        return f"{self.gender}/{self.age} {self.end_dt}"
@@ -0,0 +1,154 @@
+import base64
+import json
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class BookPagination(PageNumberPagination):
+    page_size = 100             # 한 페이지당 100권
+    page_size_query_param = 'page_size' # 프론트에서 ?page_size= 로 조절 가능
+    max_page_size = 200
+
+
+class BookKeysetPagination(BasePagination):
+    """
+    정렬 키 튜플 기반 커서(keyset) 페이지네이션 (무한 스크롤용)
+    OFFSET 대신 마지막 행의 정렬 키 값 이후만 조회하므로 N번째 페이지도 첫 페이지와 비용이 같다.
+    ?count=true 일 때만 전체 개수(COUNT)를 함께 반환한다.
+    """
+    page_size = BookPagination.page_size
+    page_size_query_param = 'page_size'
+    max_page_size = BookPagination.max_page_size
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = '잘못된 커서입니다.'
+
+    def paginate_queryset(self, queryset, request, ordering, nullable=(), view=None):
+        """
+        ordering: ['-loan_count', '-id'] 처럼 마지막 키가 유일한 정렬 필드 목록
+        nullable: NULL이 들어갈 수 있는 필드 (내림차순이면 NULL을 맨 뒤로 보냄)
+        """
+        self.request = request
+        self.ordering = ordering
+        self.nullable = set(nullable)
+        self.page_size = self.get_page_size(request)
+
+        values, reverse = self.decode_cursor(request)
+        self.count = queryset.count() if request.query_params.get(self.count_query_param) == 'true' else None
+
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, reverse))
+        queryset = queryset.order_by(*self._order_by(reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # 정방향이면 '다음'은 더 있을 때만, '이전'은 커서로 들어왔을 때만 존재 (역방향은 반대)
+        has_next = has_more if not reverse else values is not None
+        has_prev = values is not None if not reverse else has_more
+        self.next_cursor = self._row_key(rows[-1]) if rows and has_next else None
+        self.prev_cursor = self._row_key(rows[0]) if rows and has_prev else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    # --- 커서 인코딩 ---
+
+    def encode_cursor(self, values, reverse=False):
+        raw = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            values = data['v']
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return values, bool(data.get('r'))
+        except (ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _row_key(self, row):
+        return [getattr(row, name.lstrip('-')) for name in self.ordering]
+
+    # --- seek 조건 ---
+
+    def _order_by(self, reverse):
+        result = []
+        for name in self.ordering:
+            field, desc = name.lstrip('-'), name.startswith('-')
+            if reverse:
+                desc = not desc
+            nulls = {}
+            if field in self.nullable:
+                # 원래 방향 기준으로 NULL은 항상 맨 뒤, 역방향 조회에서는 맨 앞
+                nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            result.append(F(field).desc(**nulls) if desc else F(field).asc(**nulls))
+        return result
+
+    def _after(self, field, desc, value, reverse):
+        """field가 value보다 '뒤'에 오는 행 조건 (NULL은 원래 방향 기준 맨 뒤)"""
+        nullable = field in self.nullable
+        if not reverse:
+            if value is None:
+                return None
+            cond = Q(**{f'{field}__lt' if desc else f'{field}__gt': value})
+            return cond | Q(**{f'{field}__isnull': True}) if nullable else cond
+        if value is None:
+            return Q(**{f'{field}__isnull': False})
+        return Q(**{f'{field}__gt' if desc else f'{field}__lt': value})
+
+    def _seek_filter(self, values, reverse):
+        # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        condition = Q(pk__in=[])
+        equal = Q()
+        for name, value in zip(self.ordering, values):
+            field, desc = name.lstrip('-'), name.startswith('-')
+            after = self._after(field, desc, value, reverse)
+            if after is not None:
+                condition |= equal & after
+            equal &= Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+        return condition
+
+    # --- 응답 ---
+
+    def _link(self, values, reverse):
+        if values is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values, reverse))
+
+    def get_next_link(self):
+        return self._link(self.next_cursor, False)
+
+    def get_previous_link(self):
+        return self._link(self.prev_cursor, True)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload['count'] = self.count
+        return Response(payload)
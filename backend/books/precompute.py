@@ -0,0 +1,153 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .cooccurrence import cooccurrence
+from .jobs import supersede_pending_jobs
+from .llm import llm
+from .models import Book, Recommendation
+
+# 야간 AI 추천 일괄 사전 계산 (python manage.py precompute_recommendations)
+# - 대상: 최근 로그인한 활성 사용자 중 추천이 없거나 RECOMMENDATION_MAX_AGE보다 오래된 사용자
+# - 연령대/성별/선호 카테고리가 같은 사용자를 코호트로 묶어 코호트당 LLM 호출 1번 (프롬프트는 DB 조회라 메인 스레드에서,
+#   업스트림 호출만 스레드 풀에서 동시 실행)
+# - 사용자별 마무리는 로컬 계산: 이미 찜/소장/채팅한 도서를 빼고, 모자라면 동시 출현 점수 상위 도서로 채운다
+# - 저장은 배치마다 트랜잭션 1번 (기존 추천 일괄 삭제 + bulk_create), 갱신된 사용자의 대기 작업은 완료 처리
+
+PICKS_PER_USER = 5
+COOCCURRENCE_REASON = "함께 찜한 독자들이 많이 고른 책!"
+
+
+def cohort_key(user):
+    """LLM 프롬프트(personal=False)를 결정하는 값: 연령대/성별/선호 카테고리 (카테고리가 없으면 선호 장르 문자열)"""
+    category_ids = tuple(sorted(c.id for c in user.preferred_categories.all()))
+    return (user.age_group, user.gender, category_ids, '' if category_ids else (user.preferred_genres or ''))
+
+
+def stale_users(active_days=None, include_fresh=False):
+    """사전 계산 대상 사용자 (선호 카테고리 prefetch, id 순)"""
+    if active_days is None:
+        active_days = getattr(settings, 'RECOMMENDATION_PRECOMPUTE_ACTIVE_DAYS', 30)
+    now = timezone.now()
+    users = get_user_model().objects.filter(is_active=True)
+    if active_days:
+        users = users.filter(last_login__gte=now - timedelta(days=active_days))
+    if not include_fresh:
+        max_age = timedelta(seconds=getattr(settings, 'RECOMMENDATION_MAX_AGE', 7 * 24 * 3600))
+        users = users.annotate(latest=Max('recommendations__created_at')).filter(
+            Q(latest__isnull=True) | Q(latest__lt=now - max_age)
+        )
+    return list(users.prefetch_related('preferred_categories').order_by('id'))
+
+
+def _personalize(user, answer, books, extra_books):
+    """코호트 LLM 응답 → 사용자 1명의 저장 전 Recommendation 목록 (이미 반응한 도서 제외, 모자라면 동시 출현 도서로 채움)"""
+    from .utils import _pick_recommendation
+
+    reacted = cooccurrence.reacted(user.id)
+    picked = {}
+    for rec in answer:
+        if isinstance(rec, dict) and rec.get('book_id') not in reacted:
+            _pick_recommendation(user, books, rec, picked)
+    if len(picked) < PICKS_PER_USER:
+        for book_id, _ in cooccurrence.recommend(user.id, k=PICKS_PER_USER * 2):
+            book = extra_books.get(book_id)
+            if book is not None and book.id not in picked and len(picked) < PICKS_PER_USER:
+                picked[book.id] = Recommendation(user=user, book=book, reason=COOCCURRENCE_REASON)
+    return list(picked.values())
+
+
+def _save_batch(users, recommendations, started_at):
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=[u.id for u in users]).delete()
+        Recommendation.objects.bulk_create(recommendations, batch_size=1000)
+    supersede_pending_jobs([u.id for u in users], started_at)
+
+
+def run_recommendation_precompute(workers=None, batch_size=None, active_days=None, include_fresh=False, dry_run=False):
+    """
+    오래된 추천을 코호트 단위 LLM 호출로 일괄 재생성
+    반환: 사용자/코호트/LLM 호출 수, 코호트 묶음으로 아낀 호출 수, 처리 속도 등
+    """
+    from .utils import _parse_recommendations, build_recommendation_request
+
+    if not settings.OPENAI_API_KEY:
+        print("⚠️ OPENAI_API_KEY 미설정: 추천 사전 계산 건너뜀")
+        return {"users": 0, "cohorts": 0, "llm_calls": 0, "saved_calls": 0, "failed": 0}
+
+    workers = workers or getattr(settings, 'LLM_MAX_CONCURRENCY', 4)
+    batch_size = batch_size or getattr(settings, 'RECOMMENDATION_PRECOMPUTE_BATCH_SIZE', 500)
+    started_at = timezone.now()
+    started = time.monotonic()
+    before = llm.stats()
+
+    # 1. 대상 사용자 → 코호트 묶음
+    users = stale_users(active_days, include_fresh)
+    cohorts = {}
+    for user in users:
+        cohorts.setdefault(cohort_key(user), []).append(user)
+    print(f"🗂️ 추천 사전 계산 대상: 사용자 {len(users)}명 / 코호트 {len(cohorts)}개")
+    if dry_run or not users:
+        return {"users": len(users), "cohorts": len(cohorts), "llm_calls": 0, "saved_calls": 0, "failed": 0}
+
+    # 2. 코호트별 프롬프트 (대표 사용자 1명 기준, DB 조회는 메인 스레드에서)
+    requests = {key: build_recommendation_request(members[0], personal=False) for key, members in cohorts.items()}
+
+    # 3. 코호트별 LLM 호출 동시 실행 (게이트웨이의 동시 호출 제한/캐시 공유)
+    answers, failed = {}, []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='precompute') as pool:
+        futures = {
+            pool.submit(llm.complete, messages, temperature=0.8, parse=_parse_recommendations, purpose="precompute"): key
+            for key, (messages, _) in requests.items()
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                answers[key] = future.result()
+            except Exception as e:
+                failed.append(key)
+                print(f"Error precompute cohort {key}: {e}")
+
+    # 4. 사용자별 마무리 + 배치 저장 (실패한 코호트의 사용자는 기존 추천 유지)
+    targets = [u for key in answers for u in cohorts[key]]
+    extra_ids = {book_id for u in targets for book_id, _ in cooccurrence.recommend(u.id, k=PICKS_PER_USER * 2)}
+    extra_books = Book.objects.in_bulk(extra_ids)
+    updated, saved_rows = 0, 0
+    for i in range(0, len(targets), batch_size):
+        batch, rows = [], []
+        for user in targets[i:i + batch_size]:
+            picks = _personalize(user, answers[cohort_key(user)], requests[cohort_key(user)][1], extra_books)
+            if picks:
+                batch.append(user)
+                rows.extend(picks)
+        if batch:
+            _save_batch(batch, rows, started_at)
+            updated += len(batch)
+            saved_rows += len(rows)
+
+    elapsed = time.monotonic() - started
+    after = llm.stats()
+    calls = after["calls"] - before["calls"]
+    result = {
+        "users": updated,
+        "cohorts": len(cohorts),
+        "llm_calls": calls,
+        "cache_hits": after["cache_hits"] - before["cache_hits"],
+        "saved_calls": updated - calls,  # 사용자마다 호출했을 때 대비
+        "recommendations": saved_rows,
+        "failed": sum(len(cohorts[key]) for key in failed),
+        "seconds": round(elapsed, 2),
+        "users_per_sec": round(updated / elapsed, 1) if elapsed else 0.0,
+    }
+    print(
+        f"✅ 추천 사전 계산: 사용자 {updated}명 / 코호트 {len(cohorts)}개 → LLM 호출 {calls}회 "
+        f"(캐시 {result['cache_hits']}, 절약 {result['saved_calls']}회), 추천 {saved_rows}건 저장, "
+        f"실패 {result['failed']}명 ({elapsed:.1f}초, {result['users_per_sec']}명/s)"
+    )
+    return result
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# 도서관정보나루 응답 녹화/재생 (오프라인 벤치마크·부하 테스트용)
+# - record: 실제 API를 호출하고 응답을 카세트 디렉터리에 저장
+# - replay: 네트워크 없이 저장된 응답을 돌려주되, 지연 시간과 오류율을 주입해 실제 업스트림처럼 흉내
+# 카세트 파일: <디렉터리>/<API 이름>/<요청 파라미터 해시>.json (authKey는 키와 파일에서 제외)
+
+IGNORED_PARAMS = {"authKey"}
+
+
+def cassette_key(endpoint, params):
+    items = sorted((k, str(v)) for k, v in params.items() if k not in IGNORED_PARAMS)
+    return hashlib.sha1(json.dumps([endpoint, items], ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _split_request(request):
+    parts = urlsplit(request.url)
+    endpoint = parts.path.rstrip('/').rsplit('/', 1)[-1]
+    return endpoint, dict(parse_qsl(parts.query))
+
+
+class CassetteStore:
+    def __init__(self, root):
+        self.root = str(root)
+        self._index = {}  # endpoint -> 파일 이름 목록 (재생 시 대체 응답 선택용)
+        self._lock = threading.Lock()
+
+    def path(self, endpoint, key):
+        return os.path.join(self.root, endpoint, f"{key}.json")
+
+    def save(self, endpoint, params, response):
+        os.makedirs(os.path.join(self.root, endpoint), exist_ok=True)
+        record = {
+            "endpoint": endpoint,
+            "params": {k: v for k, v in params.items() if k not in IGNORED_PARAMS},
+            "status": response.status_code,
+            "content_type": response.headers.get('Content-Type', ''),
+            "body": response.content.decode(response.encoding or 'utf-8', errors='replace'),
+        }
+        with open(self.path(endpoint, cassette_key(endpoint, params)), 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        with self._lock:
+            self._index.pop(endpoint, None)
+
+    def load(self, endpoint, params, fallback=False):
+        """같은 요청의 카세트. 없고 fallback이면 같은 API의 다른 카세트 중 하나를 (요청마다 고정으로) 선택"""
+        key = cassette_key(endpoint, params)
+        path = self.path(endpoint, key)
+        if not os.path.exists(path):
+            if not fallback:
+                return None
+            names = self._names(endpoint)
+            if not names:
+                return None
+            path = os.path.join(self.root, endpoint, names[int(key, 16) % len(names)])
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _names(self, endpoint):
+        with self._lock:
+            if endpoint not in self._index:
+                directory = os.path.join(self.root, endpoint)
+                self._index[endpoint] = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+            return self._index[endpoint]
+
+
+class RecordingAdapter(HTTPAdapter):
+    """실제로 호출하고 정상 응답(2xx)만 카세트로 저장"""
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code < 300:
+            endpoint, params = _split_request(request)
+            self.store.save(endpoint, params, response)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    카세트 응답을 돌려주는 가짜 전송 계층
+    - latency ± jitter 초만큼 대기 (요청 timeout보다 길면 그만큼 기다린 뒤 ReadTimeout)
+    - error_rate 확률로 연결 오류 / 503을 반반 섞어 발생
+    - 카세트가 없으면 404 (fallback이면 같은 API의 다른 응답으로 대체)
+    """
+
+    def __init__(self, store, latency=0.0, jitter=0.0, error_rate=0.0, fallback=True, seed=None):
+        super().__init__()
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fallback = fallback
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            return delay, self._random.random(), self._random.random()
+
+    def send(self, request, timeout=None, **kwargs):
+        delay, error_roll, error_kind = self._draw()
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and delay > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.exceptions.ReadTimeout(f"replay: {delay:.2f}s > timeout {read_timeout}s", request=request)
+        time.sleep(delay)
+
+        if error_roll < self.error_rate and error_kind < 0.5:
+            raise requests.exceptions.ConnectionError("replay: 주입된 연결 오류", request=request)
+
+        endpoint, params = _split_request(request)
+        if error_roll < self.error_rate:
+            return self._response(request, 503, 'text/plain', "replay: 주입된 서버 오류")
+        record = self.store.load(endpoint, params, fallback=self.fallback)
+        if record is None:
+            return self._response(request, 404, 'text/plain', f"replay: 카세트 없음 ({endpoint})")
+        return self._response(request, record["status"], record["content_type"], record["body"])
+
+    def _response(self, request, status, content_type, body):
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict({'Content-Type': content_type or 'application/json'})
+        response._content = body.encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def build_adapter(pool_size):
+    """DATA4LIBRARY_MODE 설정(live / record / replay)에 맞는 전송 계층"""
+    from django.conf import settings
+
+    mode = getattr(settings, 'DATA4LIBRARY_MODE', 'live')
+    if mode == 'live':
+        return HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    store = CassetteStore(getattr(settings, 'DATA4LIBRARY_CASSETTE_DIR', 'cassettes'))
+    if mode == 'record':
+        return RecordingAdapter(store, pool_connections=4, pool_maxsize=pool_size)
+    if mode == 'replay':
+        return ReplayAdapter(
+            store,
+            latency=getattr(settings, 'DATA4LIBRARY_REPLAY_LATENCY', 0.0),
+            jitter=getattr(settings, 'DATA4LIBRARY_REPLAY_JITTER', 0.0),
+            error_rate=getattr(settings, 'DATA4LIBRARY_REPLAY_ERROR_RATE', 0.0),
+            fallback=getattr(settings, 'DATA4LIBRARY_REPLAY_FALLBACK', True),
+        )
+    raise ValueError(f"알 수 없는 DATA4LIBRARY_MODE: {mode}")
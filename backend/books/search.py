@@ -0,0 +1,153 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 기반 도서 전문 검색 인덱스
+# 한글은 띄어쓰기 단위 토큰화로는 부분 검색("한강" -> "한강의 기적")이 안 되므로
+# 단어를 2글자(bigram) 단위로 쪼개서 색인하고, 검색어도 같은 방식으로 쪼개 구(phrase) 검색을 한다.
+
+FTS_TABLE = "books_book_fts"
+FTS_COLUMNS = ("title", "author", "publisher", "description")
+
+# bm25 컬럼 가중치 (제목 > 저자 > 출판사 > 줄거리)
+COLUMN_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+# 최종 점수 = 텍스트 관련도 + POPULARITY_WEIGHT * ln(1 + 대출 건수)
+POPULARITY_WEIGHT = 0.5
+MATCH_SQL = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+# bm25는 MATCH 쿼리 안에서만 계산되므로 도서별 상관 서브쿼리로 구한다
+SCORE_SQL = (
+    f"(SELECT -bm25({FTS_TABLE}, {', '.join(str(w) for w in COLUMN_WEIGHTS)}) FROM {FTS_TABLE} "
+    f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = books_book.id) "
+    f"+ {POPULARITY_WEIGHT} * LN(1 + MAX(books_book.loan_count, 0))"
+)
+
+_WORD_RE = re.compile(r"\w+")
+_fts_ready = None
+
+
+def normalize(text):
+    """NFC 정규화 + 소문자 변환 (자모가 분리된 입력도 완성형으로 맞춤)"""
+    return unicodedata.normalize("NFC", text or "").lower()
+
+
+def _word_bigrams(word):
+    if len(word) < 2:
+        return [word]
+    return [word[i:i + 2] for i in range(len(word) - 1)]
+
+
+def tokenize(text):
+    """색인용 텍스트: 각 단어를 bigram 토큰으로 펼쳐 공백으로 연결"""
+    tokens = []
+    for word in _WORD_RE.findall(normalize(text)):
+        tokens.extend(_word_bigrams(word))
+    return " ".join(tokens)
+
+
+def build_match_query(query):
+    """
+    검색어를 FTS5 MATCH 구문으로 변환
+    단어마다 bigram 구(phrase)를 만들고 AND로 묶는다. 1글자 단어만 있으면 None 반환
+    """
+    phrases = []
+    for word in _WORD_RE.findall(normalize(query)):
+        if len(word) < 2:
+            continue
+        phrases.append('"%s"' % " ".join(_word_bigrams(word)))
+    if not phrases:
+        return None
+    return " AND ".join(phrases)
+
+
+def is_available(refresh=False):
+    """현재 DB에 FTS 인덱스 테이블이 준비되어 있는지 확인 (프로세스당 1회 조회)"""
+    global _fts_ready
+    if _fts_ready is None or refresh:
+        _fts_ready = (
+            connection.vendor == "sqlite"
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_ready
+
+
+# --- 인덱스 생성/갱신 ---
+
+def create_index(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5({', '.join(FTS_COLUMNS)}, tokenize='unicode61')"
+    )
+
+
+def drop_index(cursor):
+    cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def _row(book):
+    return (
+        book.id,
+        tokenize(book.title),
+        tokenize(book.author),
+        tokenize(book.publisher),
+        tokenize(book.description),
+    )
+
+
+def index_books(books):
+    """Book 객체(들)를 인덱스에 반영 (이미 있으면 교체)"""
+    if not is_available():
+        return
+    rows = [_row(b) for b in books]
+    if not rows:
+        return
+    placeholders = ", ".join(["%s"] * (len(FTS_COLUMNS) + 1))
+    with connection.cursor() as cur:
+        cur.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(r[0],) for r in rows])
+        cur.executemany(
+            f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) VALUES ({placeholders})",
+            rows,
+        )
+
+
+def remove_books(book_ids):
+    if not is_available() or not book_ids:
+        return
+    with connection.cursor() as cur:
+        cur.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(i,) for i in book_ids])
+
+
+def rebuild_index(book_queryset, batch_size=500):
+    """전체 재색인 (마이그레이션/관리 명령에서 사용)"""
+    if not is_available():
+        return 0
+    with connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {FTS_TABLE}")
+    count = 0
+    batch = []
+    for book in book_queryset.iterator(chunk_size=batch_size):
+        batch.append(book)
+        if len(batch) >= batch_size:
+            index_books(batch)
+            count += len(batch)
+            batch = []
+    index_books(batch)
+    return count + len(batch)
+
+
+# --- 검색 ---
+
+def search_books(queryset, query):
+    """
+    queryset을 검색어로 필터링하고 search_score(관련도 + 인기도)를 붙여 반환
+    인덱스를 쓸 수 없거나 1글자 검색이면 기존 icontains 검색으로 대체
+    """
+    match = build_match_query(query) if is_available() else None
+    if match is None:
+        return queryset.filter(Q(title__icontains=query) | Q(author__icontains=query)), False
+
+    return queryset.filter(id__in=RawSQL(MATCH_SQL, [match])).annotate(
+        search_score=RawSQL(SCORE_SQL, [match])
+    ), True
@@ -1,3 +1,4 @@
+from django.db import models
 from rest_framework import serializers
 from .models import Book, Recommendation, Category, Library, UserBookStock 
 from community.models import ChatMessage 
@@ -8,35 +9,97 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name']
 
+# 목록 직렬화 시 유저별 정보(판매가/찜/소장)를 페이지 단위로 한 번에 조회
+def prefetch_user_book_state(context, books):
+    """
+    books에 대한 현재 유저의 판매가·소장·찜 정보를 쿼리 2번으로 조회해 context에 저장
+    도서 수와 관계없이 쿼리 수가 일정하다 (N+1 방지)
+    """
+    request = context.get('request')
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return
+    book_ids = [b.id for b in books]
+    prices = dict(
+        UserBookStock.objects.filter(user=user, book_id__in=book_ids).values_list('book_id', 'selling_price')
+    )
+    wished = set(
+        Book.wish_users.through.objects.filter(user_id=user.pk, book_id__in=book_ids).values_list('book_id', flat=True)
+    )
+    state = context.setdefault('user_book_state', {'ids': set(), 'prices': {}, 'wished': set()})
+    state['ids'].update(book_ids)
+    state['prices'].update(prices)
+    state['wished'].update(wished)
+
+
+class UserBookStateListSerializer(serializers.ListSerializer):
+    """many=True 직렬화 전에 prefetch_user_book_state를 한 번 호출하는 공용 목록 시리얼라이저"""
+    book_attr = None  # 원소에서 Book을 꺼낼 속성명 (None이면 원소 자체가 Book)
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        books = [getattr(i, self.book_attr) for i in items] if self.book_attr else items
+        prefetch_user_book_state(self.context, books)
+        return super().to_representation(items)
+
+
 # 1. 도서 목록용 (홈 화면 & 마이페이지 나의 서가)
 class BookListSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     # 사용자가 등록한 희망 판매가
     price = serializers.SerializerMethodField()
+    is_wish = serializers.SerializerMethodField()
+    is_owned = serializers.SerializerMethodField()
 
     class Meta:
         model = Book
         fields = [
             'id', 'isbn', 'title', 'author', 'cover_url', 
-            'category', 'category_name', 'loan_count', 'price' # price 추가
+            'category', 'category_name', 'loan_count', 'price', # price 추가
+            'is_wish', 'is_owned'
         ]
+        list_serializer_class = UserBookStateListSerializer
+
+    def _user_state(self, obj):
+        """목록에서 미리 조회한 상태가 있으면 반환, 없으면(단건 직렬화) 바로 조회"""
+        state = self.context.get('user_book_state')
+        if state is None or obj.id not in state['ids']:
+            prefetch_user_book_state(self.context, [obj])
+            state = self.context.get('user_book_state')
+        return state
 
     def get_price(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            # 중개 모델에서 현재 유저가 이 책에 대해 등록한 판매가 조회
-            stock = UserBookStock.objects.filter(user=request.user, book=obj).first()
-            if stock:
-                return stock.selling_price
+        state = self._user_state(obj)
+        if state:
+            # 중개 모델에서 현재 유저가 이 책에 대해 등록한 판매가
+            return state['prices'].get(obj.id, 0)
         return 0 # 등록된 가격이 없으면 0원
 
+    def get_is_wish(self, obj):
+        state = self._user_state(obj)
+        return bool(state) and obj.id in state['wished']
+
+    def get_is_owned(self, obj):
+        state = self._user_state(obj)
+        return bool(state) and obj.id in state['prices']
+
 # 2. AI 추천 목록 전용 (홈 화면의 추천 섹션에서 사용)
+class RecommendationListSerializer(UserBookStateListSerializer):
+    book_attr = 'book'
+
+
 class RecommendationSerializer(serializers.ModelSerializer):
     book = BookListSerializer(read_only=True)
+    # AI 추천 생성 전 임시 추천(선호 장르 인기 도서)이면 True: 잠시 후 다시 조회하면 AI 추천으로 바뀜
+    pending = serializers.SerializerMethodField()
 
     class Meta:
         model = Recommendation
-        fields = ['id', 'book', 'reason', 'created_at']
+        fields = ['id', 'book', 'reason', 'created_at', 'pending']
+        list_serializer_class = RecommendationListSerializer
+
+    def get_pending(self, obj):
+        return obj.pk is None
 
 # 3. 도서관 목록 정보용 
 class LibrarySerializer(serializers.ModelSerializer):
@@ -86,6 +149,7 @@ class BookSerializer(serializers.ModelSerializer):
     
 
     def get_library_status(self, obj):
+        from .utils import get_library_full_status, get_nearby_libraries_list
         user = self.context.get('request').user
         
         # 1. 유저 위치 설정 (로그인 안 했거나 위치 정보 없으면 싸피 캠퍼스)
@@ -94,13 +158,10 @@ class BookSerializer(serializers.ModelSerializer):
         
         # 2. 우선순위 1: 자주 이용하는 도서관 (관심 도서관)
         fav_libs = []
-        fav_names = [] 
         
-        if user and user.is_authenticated and user.favorite_libraries:
-            fav_names = [n.strip() for n in user.favorite_libraries.split(',') if n.strip()]
-            
-            # lib_name으로 DB 조회
-            fav_libs = list(Library.objects.filter(lib_name__in=fav_names))
+        if user and user.is_authenticated:
+            # 정규화된 관계(lib_code)로 조인 조회
+            fav_libs = list(user.frequent_libraries.all())
 
         # 2. 부족한 만큼 주변 도서관 추가 (이미 찾은 관심 도서관은 제외)
         needed_count = 5 - len(fav_libs)
@@ -108,14 +169,8 @@ class BookSerializer(serializers.ModelSerializer):
         if needed_count > 0:
             # 이미 찾은 관심 도서관의 코드를 제외 리스트로 만듦
             excluded_codes = [l.lib_code for l in fav_libs]
-            
-            all_other_libs = Library.objects.exclude(lib_code__in=excluded_codes)
-            nearby_libs = sorted(
-                all_other_libs,
-                key=lambda l: (l.latitude - u_lat)**2 + (l.longitude - u_lon)**2
-            )[:needed_count]
+            nearby_libs = get_nearby_libraries_list(u_lat, u_lon, excluded_codes, limit=needed_count)
 
         # 3. 데이터 통합 및 실시간 조회
         final_lib_list = fav_libs + nearby_libs
-        from .utils import get_library_full_status
         return get_library_full_status(obj.isbn, final_lib_list, u_lat, u_lon)
\ No newline at end of file
@@ -0,0 +1,175 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from community.models import ChatMessage
+from .models import Book, Library, UserBookStock
+from . import search
+from .suggest import suggest_index
+from .candidates import candidate_pool
+from .similarity import similarity_index
+from .cooccurrence import cooccurrence
+from .geo import library_index
+from .cache import BOOKS_VERSION, COOCCURRENCE_VERSION, SharedVersion
+
+# 다른 프로세스의 도서 메모리 인덱스(자동완성 등)에 변경을 알리는 버전 표시
+books_version = SharedVersion(BOOKS_VERSION)
+# 다른 프로세스의 동시 출현 행렬에 찜/소장/채팅 변경을 알리는 버전 표시
+cooccurrence_version = SharedVersion(COOCCURRENCE_VERSION)
+
+
+def _apply_books_changed(books):
+    search.index_books(books)
+    for book in books:
+        suggest_index.update(book)
+        candidate_pool.update(book)
+    similarity_index.update(books)
+
+
+def _apply_books_removed(book_ids):
+    search.remove_books(list(book_ids))
+    for book_id in book_ids:
+        suggest_index.remove(book_id)
+        candidate_pool.remove(book_id)
+        similarity_index.remove(book_id)
+
+
+def _flush_pending(changed, deleted):
+    """커밋 후: 바뀐 도서를 DB에서 한 번에 다시 읽어 반영 (없어진 id는 인덱스에서 제거), 버전 표시는 1번만 갱신"""
+    books = list(Book.objects.select_related('category').filter(id__in=changed - deleted)) if changed - deleted else []
+    _apply_books_changed(books)
+    _apply_books_removed((changed | deleted) - {b.id for b in books})
+    if deleted:
+        # 찜 연결 행은 시그널 없이 함께 지워지므로 동시 출현 행렬은 다음 조회 때 다시 빌드
+        cooccurrence.invalidate()
+        _bump_cooccurrence_version()
+    books_version.bump()
+
+
+class _PendingChanges(threading.local):
+    """스레드(요청)별로 현재 트랜잭션 안에서 바뀐 도서 id를 모아두는 버퍼"""
+    callback = None
+    changed = deleted = None
+
+
+_pending = _PendingChanges()
+
+
+def _defer(changed=(), deleted=()):
+    """
+    트랜잭션 안이면 도서 id만 모아두고 커밋 때 한 번에 반영 (저장 중에 쓰기 잠금을 오래 잡지 않도록)
+    롤백되면 Django가 on_commit 콜백을 버리므로, 콜백이 아직 등록돼 있는지로 같은 트랜잭션인지 판단한다.
+    """
+    connection = transaction.get_connection()
+    registered = _pending.callback is not None and any(
+        func is _pending.callback for _, func, _ in connection.run_on_commit
+    )
+    if not registered:
+        pending_changed, pending_deleted = set(), set()
+
+        def callback():
+            _pending.callback = None
+            _flush_pending(pending_changed, pending_deleted)
+
+        _pending.callback, _pending.changed, _pending.deleted = callback, pending_changed, pending_deleted
+    _pending.changed.update(changed)
+    _pending.deleted.update(deleted)
+    if not registered:
+        # 트랜잭션 밖이면 바로 실행된다
+        transaction.on_commit(_pending.callback)
+
+
+def notify_books_changed(books):
+    """
+    도서가 추가/수정되었을 때 메모리·검색 인덱스에 반영
+    bulk_create/bulk_update는 post_save를 보내지 않으므로 배치 저장 후 직접 호출한다.
+    트랜잭션 안에서 호출되면 커밋 후로 미룬다.
+    """
+    if transaction.get_connection().in_atomic_block:
+        _defer(changed=[b.id for b in books])
+        return
+    _apply_books_changed(books)
+    books_version.bump()
+
+
+# 도서가 저장/삭제될 때 검색/자동완성 인덱스와 추천 후보 풀 동기화
+# (update_or_create를 쓰는 sync_popular_books_by_kdc, import_all_data 모두 여기를 거친다)
+@receiver(post_save, sender=Book)
+def index_book_on_save(sender, instance, **kwargs):
+    notify_books_changed([instance])
+
+
+@receiver(post_delete, sender=Book)
+def remove_book_on_delete(sender, instance, **kwargs):
+    _defer(deleted=[instance.id])
+
+
+# 도서관 정보가 바뀌면 공간 인덱스를 버리고 다음 조회 때 다시 만든다
+@receiver(post_save, sender=Library)
+@receiver(post_delete, sender=Library)
+def invalidate_library_index(sender, **kwargs):
+    library_index.invalidate()
+
+
+# 찜/소장/채팅 이벤트를 동시 출현 행렬(함께 찜한 도서)에 증분 반영
+def _bump_cooccurrence_version():
+    """커밋 후 동시 출현 버전 표시 갱신 (같은 트랜잭션의 여러 이벤트는 1번만, 트랜잭션 밖이면 바로)"""
+    connection = transaction.get_connection()
+    if not any(func == cooccurrence_version.bump for _, func, _ in connection.run_on_commit):
+        transaction.on_commit(cooccurrence_version.bump)
+
+
+def _record_m2m(kind, instance, action, reverse, pk_set):
+    if action == 'post_clear':
+        cooccurrence.invalidate()
+        _bump_cooccurrence_version()
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+    _bump_cooccurrence_version()
+    present = action == 'post_add'
+    for pk in pk_set or ():
+        # reverse면 instance는 사용자, pk_set은 도서 id
+        user_id, book_id = (instance.pk, pk) if reverse else (pk, instance.pk)
+        cooccurrence.record(user_id, book_id, kind, present)
+
+
+@receiver(m2m_changed, sender=Book.wish_users.through)
+def record_wish(sender, instance, action, reverse, pk_set, **kwargs):
+    _record_m2m('wish', instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Book.owned_users.through)
+def record_owned(sender, instance, action, reverse, pk_set, **kwargs):
+    _record_m2m('own', instance, action, reverse, pk_set)
+
+
+# UserBookStock을 직접 만들거나 지우는 경우 (owned_users.add/remove와 겹쳐도 같은 상태로 수렴)
+@receiver(post_save, sender=UserBookStock)
+def record_stock_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        cooccurrence.record(instance.user_id, instance.book_id, 'own', True)
+        _bump_cooccurrence_version()
+
+
+@receiver(post_delete, sender=UserBookStock)
+def record_stock_deleted(sender, instance, **kwargs):
+    cooccurrence.record(instance.user_id, instance.book_id, 'own', False)
+    _bump_cooccurrence_version()
+
+
+@receiver(post_save, sender=ChatMessage)
+def record_chat_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        cooccurrence.record(instance.user_id, instance.book_id, 'chat', True)
+        _bump_cooccurrence_version()
+
+
+@receiver(post_delete, sender=ChatMessage)
+def record_chat_deleted(sender, instance, **kwargs):
+    # 같은 도서에 남은 메시지가 있으면 채팅 신호는 유지
+    if not ChatMessage.objects.filter(user_id=instance.user_id, book_id=instance.book_id).exists():
+        cooccurrence.record(instance.user_id, instance.book_id, 'chat', False)
+        _bump_cooccurrence_version()
@@ -0,0 +1,366 @@
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from .search import _WORD_RE, _word_bigrams, normalize
+
+# 로컬 내용 기반 유사 도서 엔진
+# 제목/저자/카테고리/줄거리를 해시된 n-gram 특징으로 바꿔 TF-IDF 희소 행렬(CSR)을 만들고,
+# 코사인 유사도(행 단위 L2 정규화 후 내적)로 가장 비슷한 도서 k권을 찾는다.
+# - 모델은 .npy 파일로 저장하고 서버 시작 시 memory-map으로 읽는다
+# - 새로 저장된 도서는 메모리 delta에 쌓았다가 flush()로 본 행렬에 합쳐 다시 저장
+#   (MAX_DELTA_ROWS를 넘으면 백그라운드 스레드가 바로 flush)
+# - 다른 프로세스(수집 커맨드)가 모델을 갱신하면 manifest 버전을 보고 다시 읽는다
+# IDF는 전체 빌드 시점 값으로 고정되며, build_similarity_index 커맨드로 다시 계산한다.
+
+N_FEATURES = 1 << 18
+FIELD_WEIGHTS = {"t": 3.0, "a": 2.0, "c": 1.5, "d": 1.0}  # 제목, 저자, 카테고리, 줄거리
+MAX_DESCRIPTION_CHARS = 1000
+MODEL_ARRAYS = ("data", "indices", "indptr", "book_ids", "idf")
+RELOAD_CHECK_INTERVAL = 30  # 디스크 모델 변경 확인 주기 (초)
+MAX_DELTA_ROWS = 2000       # delta가 이만큼 쌓이면 본 행렬에 합쳐 저장
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 30
+
+
+def _hash(feature):
+    return zlib.crc32(feature.encode("utf-8")) & (N_FEATURES - 1)
+
+
+def book_features(title, author, category_name, description):
+    """도서 1권의 {특징 번호: 가중 빈도}"""
+    counts = Counter()
+    for word in _WORD_RE.findall(normalize(title)):
+        for gram in [word] + _word_bigrams(word):
+            counts[_hash("t:" + gram)] += FIELD_WEIGHTS["t"]
+    # 저자는 이름 단위로 (같은 저자끼리만 겹치도록)
+    for name in (author or "").replace(";", ",").split(","):
+        name = normalize(name).strip()
+        if name:
+            counts[_hash("a:" + name)] += FIELD_WEIGHTS["a"]
+    if category_name:
+        counts[_hash("c:" + normalize(category_name))] += FIELD_WEIGHTS["c"]
+    for word in _WORD_RE.findall(normalize((description or "")[:MAX_DESCRIPTION_CHARS])):
+        for gram in _word_bigrams(word):
+            counts[_hash("d:" + gram)] += FIELD_WEIGHTS["d"]
+    return counts
+
+
+def _sublinear(counts):
+    indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    # 같은 n-gram이 여러 번 나와도 선형으로 커지지 않도록 로그 스케일
+    return indices, 1.0 + np.log(values, dtype=np.float32)
+
+
+def _normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+
+def vectorize(feature_rows, idf):
+    """feature_rows: [{특징: 빈도}] → L2 정규화된 TF-IDF CSR 행렬"""
+    data, indices, indptr = [], [], [0]
+    for counts in feature_rows:
+        cols, values = _sublinear(counts)
+        indices.append(cols)
+        data.append(values * idf[cols])
+        indptr.append(indptr[-1] + len(cols))
+    matrix = sparse.csr_matrix(
+        (
+            np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+            np.array(indptr, dtype=np.int64),
+        ),
+        shape=(len(feature_rows), N_FEATURES),
+        dtype=np.float32,
+    )
+    matrix.sort_indices()
+    return _normalize_rows(matrix)
+
+
+def _category_names(books):
+    """도서들의 {category_id: 이름} (select_related로 이미 읽은 카테고리는 그대로 쓰고 나머지만 조회)"""
+    from .models import Book, Category
+
+    names, missing = {}, set()
+    for b in books:
+        if not b.category_id:
+            continue
+        if Book.category.is_cached(b):
+            names[b.category_id] = b.category.name if b.category else None
+        else:
+            missing.add(b.category_id)
+    missing -= names.keys()
+    if missing:
+        names.update(Category.objects.filter(id__in=missing).values_list('id', 'name'))
+    return names
+
+
+def _book_rows(books, category_names):
+    return [
+        book_features(b.title, b.author, category_names.get(b.category_id), b.description)
+        for b in books
+    ]
+
+
+class SimilarityIndex:
+    """TF-IDF 코사인 유사도 top-k 인덱스 (스레드 안전)"""
+
+    def __init__(self, model_dir=None):
+        self._model_dir = model_dir
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._matrix = None       # 본 행렬 (디스크 mmap)
+        self._book_ids = None     # 행 번호 -> book_id
+        self._row_of = {}         # book_id -> 행 번호
+        self._idf = None
+        self._stale = np.zeros(0, dtype=bool)  # delta로 대체되었거나 삭제된 본 행렬 행
+        self._delta = {}          # book_id -> 1행 CSR (아직 저장 전인 신규/수정 도서)
+        self._delta_stack = None  # (book_ids, delta 행을 쌓은 CSR) 캐시, delta가 바뀌면 None
+        self._flushing = False
+        self._version = None
+        self._checked_at = 0.0
+
+    @property
+    def model_dir(self):
+        if self._model_dir is None:
+            from django.conf import settings
+            self._model_dir = str(getattr(settings, 'SIMILARITY_MODEL_DIR', 'similarity'))
+        return self._model_dir
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    # --- 빌드 / 저장 / 로드 ---
+
+    def build(self, books=None):
+        """DB 전체로 IDF와 행렬을 새로 계산 (메모리에만, 저장은 save())"""
+        from .models import Book, Category
+
+        if books is None:
+            books = Book.objects.only('id', 'title', 'author', 'category_id', 'description').iterator(chunk_size=2000)
+        category_names = dict(Category.objects.values_list('id', 'name'))
+        book_ids, feature_rows = [], []
+        df = np.zeros(N_FEATURES, dtype=np.int64)
+        for book in books:
+            counts = book_features(book.title, book.author, category_names.get(book.category_id), book.description)
+            book_ids.append(book.id)
+            feature_rows.append(counts)
+            df[np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))] += 1
+        n = len(book_ids)
+        idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+        with self._lock:
+            self._set_model(vectorize(feature_rows, idf), np.array(book_ids, dtype=np.int64), idf)
+            self._reset_delta()
+            self._loaded = True
+        return n
+
+    def _set_model(self, matrix, book_ids, idf):
+        self._matrix = matrix
+        self._book_ids = book_ids
+        self._row_of = {int(book_id): row for row, book_id in enumerate(book_ids)}
+        self._idf = idf
+        self._stale = np.zeros(len(book_ids), dtype=bool)
+
+    def save(self):
+        """임시 디렉터리에 쓴 뒤 교체 (읽는 쪽이 반쯤 쓰인 파일을 보지 않도록)"""
+        with self._lock:
+            matrix = self._merged()
+            book_ids = self._merged_ids()
+            tmp_dir = self.model_dir + ".tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            arrays = {
+                "data": matrix.data, "indices": matrix.indices, "indptr": matrix.indptr,
+                "book_ids": book_ids, "idf": self._idf,
+            }
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+            version = f"{time.time():.6f}"
+            with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+                json.dump({"version": version, "rows": int(matrix.shape[0]), "features": N_FEATURES}, f)
+            old_dir = self.model_dir + ".old"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.exists(self.model_dir):
+                os.replace(self.model_dir, old_dir)
+            os.replace(tmp_dir, self.model_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            self._set_model(matrix, book_ids, self._idf)
+            self._reset_delta()
+            self._version = version
+
+    def _read_version(self):
+        try:
+            with open(os.path.join(self.model_dir, "manifest.json")) as f:
+                return json.load(f)["version"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def load(self, keep_delta=False):
+        """디스크 모델을 memory-map으로 읽기. 모델이 없으면 False (keep_delta면 저장 전 delta 유지)"""
+        version = self._read_version()
+        if version is None:
+            return False
+        arrays = {
+            name: np.load(os.path.join(self.model_dir, f"{name}.npy"), mmap_mode="r")
+            for name in MODEL_ARRAYS
+        }
+        matrix = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(len(arrays["book_ids"]), N_FEATURES), copy=False,
+        )
+        with self._lock:
+            self._set_model(matrix, np.asarray(arrays["book_ids"]), np.asarray(arrays["idf"]))
+            if keep_delta:
+                for book_id in self._delta:
+                    if book_id in self._row_of:
+                        self._stale[self._row_of[book_id]] = True
+            else:
+                self._reset_delta()
+            self._version = version
+            self._loaded = True
+        return True
+
+    def ensure_loaded(self):
+        """디스크 모델을 읽고, 없으면 DB로 만들어 저장"""
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded and not self.load():
+                self.build()
+                self.save()
+
+    def _maybe_reload(self):
+        """다른 프로세스가 모델을 다시 저장했으면 새 버전을 읽음 (이 프로세스의 delta는 유지)"""
+        now = time.monotonic()
+        if now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        version = self._read_version()
+        if version is not None and version != self._version:
+            self.load(keep_delta=True)
+
+    # --- 증분 갱신 ---
+
+    def update(self, books):
+        """
+        저장된 도서를 delta에 반영 (아직 로드 전이면 무시: 다음 빌드/로드 때 반영)
+        카테고리 이름은 select_related('category')로 읽어 온 값을 쓰고, 없을 때만 조회한다.
+        """
+        if not self._loaded or not books:
+            return
+        rows = vectorize(_book_rows(books, _category_names(books)), self._idf)
+        with self._lock:
+            for i, book in enumerate(books):
+                self._delta[book.id] = rows[i]
+                row = self._row_of.get(book.id)
+                if row is not None:
+                    self._stale[row] = True
+            self._delta_stack = None
+            if len(self._delta) >= MAX_DELTA_ROWS:
+                self._schedule_flush()
+
+    def remove(self, book_id):
+        if not self._loaded:
+            return
+        with self._lock:
+            if self._delta.pop(book_id, None) is not None:
+                self._delta_stack = None
+            row = self._row_of.get(book_id)
+            if row is not None:
+                self._stale[row] = True
+
+    def _reset_delta(self):
+        self._delta = {}
+        self._delta_stack = None
+
+    def _stacked_delta(self):
+        """delta 행을 CSR 1개로 쌓은 (book_ids, 행렬). delta가 바뀔 때만 다시 쌓는다 (비어 있으면 행렬은 None)"""
+        if self._delta_stack is None:
+            delta_ids = np.fromiter(self._delta.keys(), dtype=np.int64, count=len(self._delta))
+            matrix = sparse.vstack(list(self._delta.values()), format="csr", dtype=np.float32) if self._delta else None
+            self._delta_stack = (delta_ids, matrix)
+        return self._delta_stack
+
+    def _merged(self):
+        keep = np.flatnonzero(~self._stale)
+        _, delta = self._stacked_delta()
+        parts = [self._matrix[keep]] + ([delta] if delta is not None else [])
+        return sparse.vstack(parts, format="csr", dtype=np.float32)
+
+    def _merged_ids(self):
+        delta_ids, _ = self._stacked_delta()
+        return np.concatenate([np.asarray(self._book_ids)[~self._stale], delta_ids])
+
+    def _schedule_flush(self):
+        """delta가 MAX_DELTA_ROWS만큼 쌓이면 백그라운드 스레드에서 flush (동시에 1개만)"""
+        if self._flushing:
+            return
+        self._flushing = True
+
+        def run():
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ 유사 도서 모델 저장 실패: {e}")
+            finally:
+                self._flushing = False
+
+        threading.Thread(target=run, name='similarity-flush', daemon=True).start()
+
+    def flush(self):
+        """delta가 있으면 본 행렬에 합쳐 디스크에 저장 (수집 작업이 끝날 때 호출)"""
+        with self._lock:
+            if self._loaded and (self._delta or self._stale.any()):
+                self.save()
+
+    # --- 조회 ---
+
+    def similar(self, book_id, k=DEFAULT_LIMIT):
+        """book_id와 가장 비슷한 도서 [(book_id, 유사도)] k개. 인덱스에 없는 도서면 None"""
+        self.ensure_loaded()
+        with self._lock:
+            self._maybe_reload()
+            if book_id in self._delta:
+                query = self._delta[book_id]
+            elif book_id in self._row_of and not self._stale[self._row_of[book_id]]:
+                query = self._matrix[self._row_of[book_id]]
+            else:
+                return None
+
+            # 1. 본 행렬: 희소 행렬 × 희소 벡터 한 번으로 전체 코사인 유사도
+            scores = np.asarray(self._matrix.dot(query.T).todense()).ravel()
+            scores[self._stale] = -1.0
+            own_row = self._row_of.get(book_id)
+            if own_row is not None:
+                scores[own_row] = -1.0
+            candidates = []
+            if len(scores):
+                top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+                candidates = [(int(self._book_ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+            # 2. 아직 합쳐지지 않은 delta 도서: 쌓아 둔 delta 행렬과 한 번에 곱셈
+            delta_ids, delta = self._stacked_delta()
+            if delta is not None:
+                delta_scores = np.asarray(delta.dot(query.T).todense()).ravel()
+                candidates += [
+                    (int(other_id), float(score))
+                    for other_id, score in zip(delta_ids, delta_scores)
+                    if score > 0 and other_id != book_id
+                ]
+
+        candidates.sort(key=lambda x: (-x[1], x[0]))
+        return candidates[:k]
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,195 @@
+import bisect
+import heapq
+import threading
+
+from .cache import BOOKS_VERSION, SharedVersion
+from .search import normalize
+
+# 검색어 자동완성용 메모리 prefix 인덱스
+# 제목/저자의 (단어 시작 위치부터의) 문자열을 정렬 배열에 넣어두고 bisect로 접두어 범위를 찾는다.
+# 같은 키를 초성으로 분해한 배열도 함께 유지해서 "ㅎㄹㅍㅌ" 같은 초성 입력도 처리한다.
+# 키와 검색어는 모두 공백을 뺀 형태로 비교한다 ("청춘의독서", "ㅎㄹㅍㅌ" → "해리 포터").
+# 다른 프로세스(수집/임포트 커맨드)가 도서를 바꾸면 DB의 버전 표시를 보고 다시 빌드한다.
+
+CHOSUNG = [
+    "ㄱ", "ㄲ", "ㄴ", "ㄷ", "ㄸ", "ㄹ", "ㅁ", "ㅂ", "ㅃ", "ㅅ",
+    "ㅆ", "ㅇ", "ㅈ", "ㅉ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ",
+]
+_CHOSUNG_SET = set(CHOSUNG)
+_HANGUL_BASE, _HANGUL_LAST = 0xAC00, 0xD7A3
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 30
+# 키 하나에 담는 최대 길이 (긴 제목 뒤쪽까지 접두어로 칠 일은 없음)
+MAX_KEY_LENGTH = 30
+# 결과 memo 최대 개수 (넘치면 비움)
+MAX_MEMO_SIZE = 5000
+
+
+def to_chosung(text):
+    """완성형 한글을 초성으로 분해 (그 외 문자는 그대로 유지)"""
+    result = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            result.append(CHOSUNG[(code - _HANGUL_BASE) // 588])
+        else:
+            result.append(ch)
+    return "".join(result)
+
+
+def has_chosung(text):
+    return any(ch in _CHOSUNG_SET for ch in text)
+
+
+def _matches_syllables(query, key):
+    """초성 검색 후보 중, 검색어에 완성형 글자가 섞여 있으면 그 위치의 글자까지 일치하는지 확인"""
+    for q_ch, k_ch in zip(query, key):
+        if q_ch not in _CHOSUNG_SET and q_ch != k_ch:
+            return False
+    return True
+
+
+def _strip_spaces(text):
+    return "".join(text.split())
+
+
+def _key_variants(text):
+    """
+    문자열 전체 + 각 단어 시작 위치부터의 접미 문자열을 공백 없이 ("청춘의 독서" -> "청춘의독서", "독서")
+    검색어도 공백을 빼고 비교하므로 띄어쓰기가 달라도 찾는다.
+    """
+    words = normalize(text).split()
+    keys = []
+    for i in range(len(words)):
+        key = "".join(words[i:])[:MAX_KEY_LENGTH]
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+class SuggestIndex:
+    """정렬 배열 기반 자동완성 인덱스 (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._books = {}          # book_id -> 응답용 dict
+        self._keys = []           # [(키, book_id)] 완성형 정렬 배열
+        self._cho_keys = []       # [(초성 키, 완성형 키, book_id)] 초성 정렬 배열
+        self._book_keys = {}      # book_id -> 등록된 완성형 키 목록 (갱신/삭제용)
+        self._memo = {}           # (검색어, limit) -> 결과 (인덱스 변경 시 초기화)
+        self._version = SharedVersion(BOOKS_VERSION)
+
+    @property
+    def built(self):
+        return self._built
+
+    def build(self, books):
+        with self._lock:
+            self._books, self._keys, self._cho_keys, self._book_keys = {}, [], [], {}
+            for book in books:
+                self._add(book)
+            self._keys.sort()
+            self._cho_keys.sort()
+            self._memo = {}
+            self._built = True
+
+    def ensure_built(self):
+        # 이미 빌드됐어도 다른 프로세스가 도서를 바꿨으면 다시 빌드
+        rebuild = self._built and self._version.changed()
+        if self._built and not rebuild:
+            return
+        from .models import Book
+        with self._lock:
+            if self._built and not rebuild:
+                return
+            version = self._version.current()
+            self.build(Book.objects.only('id', 'isbn', 'title', 'author', 'loan_count'))
+            self._version.mark_built(version)
+
+    def _add(self, book, keep_sorted=False):
+        keys = _key_variants(book.title) + _key_variants(book.author)
+        self._books[book.id] = {
+            "isbn": book.isbn,
+            "title": book.title,
+            "author": book.author,
+            "loan_count": book.loan_count,
+        }
+        self._book_keys[book.id] = keys
+        for key in keys:
+            entry, cho_entry = (key, book.id), (to_chosung(key), key, book.id)
+            if keep_sorted:
+                bisect.insort(self._keys, entry)
+                bisect.insort(self._cho_keys, cho_entry)
+            else:
+                self._keys.append(entry)
+                self._cho_keys.append(cho_entry)
+
+    def _remove(self, book_id):
+        for key in self._book_keys.pop(book_id, []):
+            for arr, entry in ((self._keys, (key, book_id)), (self._cho_keys, (to_chosung(key), key, book_id))):
+                i = bisect.bisect_left(arr, entry)
+                if i < len(arr) and arr[i] == entry:
+                    del arr[i]
+        self._books.pop(book_id, None)
+
+    def update(self, book):
+        """도서 1권 저장 시 증분 반영 (아직 빌드 전이면 무시: 첫 조회 때 통째로 빌드됨)"""
+        if not self._built:
+            return
+        with self._lock:
+            self._remove(book.id)
+            self._add(book, keep_sorted=True)
+            self._memo = {}
+
+    def remove(self, book_id):
+        if not self._built:
+            return
+        with self._lock:
+            self._remove(book_id)
+            self._memo = {}
+
+    def _prefix_range(self, arr, prefix):
+        lo = bisect.bisect_left(arr, (prefix,))
+        hi = bisect.bisect_left(arr, (prefix + "\uffff",))
+        return lo, hi
+
+    def suggest(self, query, limit=DEFAULT_LIMIT):
+        query = _strip_spaces(normalize(query))
+        if not query:
+            return []
+        self.ensure_built()
+
+        memo_key = (query, limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            book_ids = set()
+            if has_chosung(query):
+                lo, hi = self._prefix_range(self._cho_keys, to_chosung(query))
+                for _, key, book_id in self._cho_keys[lo:hi]:
+                    if _matches_syllables(query, key):
+                        book_ids.add(book_id)
+            else:
+                lo, hi = self._prefix_range(self._keys, query)
+                book_ids.update(book_id for _, book_id in self._keys[lo:hi])
+
+            # 대출 많은 순으로 꺼내면서 같은 제목(판본/중복 등록)은 한 번만
+            heap = [(-self._books[i]["loan_count"], -i) for i in book_ids]
+            heapq.heapify(heap)
+            result, titles = [], set()
+            while heap and len(result) < limit:
+                book = self._books[-heapq.heappop(heap)[1]]
+                if book["title"] not in titles:
+                    titles.add(book["title"])
+                    result.append(book)
+            if len(self._memo) >= MAX_MEMO_SIZE:
+                self._memo = {}
+            self._memo[memo_key] = result
+        return result
+
+
+suggest_index = SuggestIndex()
@@ -1,3 +1,480 @@
-from django.test import TestCase
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from community.models import ChatMessage
+from .models import Book, Category, Recommendation, RecommendationJob, UserBookStock
+from .data4library import CircuitBreaker, Data4LibraryClient
+from .importer import iter_json_array
+from .search import search_books
+
+
+class BookListQueryCountTests(TestCase):
+    """목록 API의 쿼리 수가 페이지 크기와 무관하게 일정한지 확인 (N+1 방지)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='reader@example.com', password='pw-12345678', nickname='reader',
+            favorite_libraries='국립중앙도서관', age_group='20s', gender='F', preferred_genres='문학',
+        )
+        category = Category.objects.create(name='문학')
+        cls.books = [
+            Book.objects.create(
+                title=f'테스트 도서 {i}', author='저자', publisher='출판사',
+                isbn=f'97800000{i:05d}', category=category, loan_count=i,
+            )
+            for i in range(30)
+        ]
+        for book in cls.books[::2]:
+            UserBookStock.objects.create(user=cls.user, book=book, selling_price=1000 + book.id)
+            ChatMessage.objects.create(user=cls.user, book=book, content='좋아요')
+        for book in cls.books[::3]:
+            book.wish_users.add(cls.user)
+            Recommendation.objects.create(user=cls.user, book=book, reason='추천')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_book_list_query_count_is_constant(self):
+        small, _ = self._count_queries('/api/v1/books/', {'page_size': 5})
+        large, response = self._count_queries('/api/v1/books/', {'page_size': 30})
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 4)  # COUNT + 목록 + 판매가/소장 + 찜
+
+        results = {b['id']: b for b in response.json()['results']}
+        for book in self.books:
+            item = results[book.id]
+            owned = book in self.books[::2]
+            self.assertEqual(item['is_owned'], owned)
+            self.assertEqual(item['price'], 1000 + book.id if owned else 0)
+            self.assertEqual(item['is_wish'], book in self.books[::3])
+
+    def test_activity_and_recommendation_query_count_is_constant(self):
+        activity, response = self._count_queries('/api/v1/community/my-activities/')
+        self.assertEqual(len(response.json()), 15)
+        self.assertLessEqual(activity, 3)
+
+        recommendations, response = self._count_queries('/api/v1/books/recommendations/')
+        self.assertEqual(len(response.json()), 5)
+        self.assertLessEqual(recommendations, 4)  # exists + 목록 + 판매가/소장 + 찜
+
+
+class BookIndexOnCommitTests(TestCase):
+    """도서 저장 시 검색 인덱스 갱신은 커밋 후 한 번에 (트랜잭션 안에서 쓰기 잠금을 오래 잡지 않도록)"""
+
+    def _matches(self, query):
+        books, _ = search_books(Book.objects.all(), query)
+        return set(books.values_list('title', flat=True))
+
+    def test_saves_in_transaction_are_indexed_once_after_commit(self):
+        with mock.patch('books.signals.books_version') as version:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    for i in range(3):
+                        Book.objects.create(title=f'청춘의 독서 {i}', author='유시민', publisher='출판사', isbn=f'97811111{i:05d}')
+                    self.assertEqual(self._matches('청춘 독서'), set())
+            self.assertEqual(len(callbacks), 1)
+            version.bump.assert_called_once()
+        self.assertEqual(self._matches('청춘 독서'), {'청춘의 독서 0', '청춘의 독서 1', '청춘의 독서 2'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.get(isbn='9781111100000').delete()
+        self.assertEqual(self._matches('청춘 독서'), {'청춘의 독서 1', '청춘의 독서 2'})
+
+
+class UpsertBooksTests(TestCase):
+    """배치 저장 중 잘못된 행이 있어도 나머지는 저장"""
+
+    def _row(self, isbn, title):
+        return {'isbn': isbn, 'title': title, 'author': '저자', 'publisher': '출판사', 'loan_count': 1}
+
+    def test_bad_row_is_skipped_and_rest_saved(self):
+        from .ingest import upsert_books
+
+        rows = [self._row('9782222200001', '첫 책'), self._row('9782222200002', None), self._row('9782222200003', '셋째 책')]
+        self.assertEqual(upsert_books(rows), 2)
+        self.assertEqual(
+            set(Book.objects.values_list('isbn', flat=True)), {'9782222200001', '9782222200003'}
+        )
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """서킷 브레이커 상태 전이: closed → open → half-open(시험 호출 1번) → closed/open"""
+
+    def _open_breaker(self):
+        breaker = CircuitBreaker('test', window=4, min_calls=2, failure_rate=0.5, cooldown=30)
+        for _ in range(2):
+            breaker.record(breaker.allow(), False)
+        return breaker
+
+    def test_opens_after_failure_rate_and_rejects(self):
+        breaker = self._open_breaker()
+        self.assertEqual(breaker.state, 'open')
+        self.assertIsNone(breaker.allow())
+
+    def test_half_open_allows_single_trial(self):
+        breaker = self._open_breaker()
+        breaker._opened_at -= 31
+        trial = breaker.allow()
+        self.assertIsNotNone(trial)
+        self.assertIsNone(breaker.allow())
+        breaker.record(trial, True)
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_failed_trial_reopens(self):
+        breaker = self._open_breaker()
+        breaker._opened_at -= 31
+        breaker.record(breaker.allow(), False)
+        self.assertEqual(breaker.state, 'open')
+
+    def test_late_results_from_before_open_are_ignored(self):
+        breaker = CircuitBreaker('test', window=4, min_calls=2, failure_rate=0.5, cooldown=30)
+        late = breaker.allow()
+        for _ in range(2):
+            breaker.record(breaker.allow(), False)
+        breaker._opened_at -= 31
+        trial = breaker.allow()
+        breaker.record(late, True)
+        self.assertEqual(breaker.state, 'half-open')
+        self.assertIsNone(breaker.allow())
+        breaker.record(trial, True)
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_unexpected_error_in_trial_still_releases_it(self):
+        client = Data4LibraryClient(pool_size=1)
+        breaker = client.breaker('libSrch')
+        for _ in range(breaker.min_calls):
+            breaker.record(breaker.allow(), False)
+        breaker._opened_at -= breaker.cooldown + 1
+        with mock.patch.object(client.session, 'get', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                client.get('libSrch', retries=0)
+        # 시험 호출이 실패로 기록되어 다시 open, cooldown 후에는 새 시험 호출이 허용된다
+        self.assertEqual(breaker.state, 'open')
+        breaker._opened_at -= breaker.cooldown + 1
+        self.assertIsNotNone(breaker.allow())
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    """청크 경계가 어디서 잘려도 json.loads와 같은 원소를 돌려준다"""
+
+    SOURCE = '[1.5e3, {"a": [1, 2], "b": "x,]y"}, "s", true, null, -0.25E-2,12\n, [ ], 7 ]'
+
+    def test_every_chunk_size_matches_json_loads(self):
+        expected = json.loads(self.SOURCE)
+        for chunk_size in range(1, len(self.SOURCE) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_json_array(io.StringIO(self.SOURCE), chunk_size=chunk_size)), expected)
+
+    def test_unclosed_array_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[1, 2'), chunk_size=1))
+
+
+class FetchRegionLibrariesTests(SimpleTestCase):
+    """도서관 페이지 조회 종료 조건: 짧은 페이지에서 멈추고 numFound는 상한으로만 사용"""
+
+    def _fetch(self, pages, num_found, page_size=2):
+        from .ingest import _fetch_region_libraries
+
+        def get(endpoint, params):
+            items = pages[params['pageNo'] - 1] if params['pageNo'] <= len(pages) else []
+            return {'response': {'numFound': num_found, 'libs': [{'lib': {'libCode': c}} for c in items]}}
+
+        limiter = mock.Mock()
+        with mock.patch('books.ingest.data4library.get', side_effect=get) as api:
+            libs = _fetch_region_libraries(limiter, '11', page_size=page_size)
+        return [lib['libCode'] for lib in libs], api.call_count
+
+    def test_stops_on_short_page_even_if_num_found_is_larger(self):
+        self.assertEqual(self._fetch([['a', 'b'], ['c']], num_found=10), (['a', 'b', 'c'], 2))
+
+    def test_missing_num_found_keeps_paging_until_short_page(self):
+        self.assertEqual(self._fetch([['a', 'b'], ['c', 'd'], []], num_found=None), (['a', 'b', 'c', 'd'], 3))
+
+    def test_num_found_caps_full_pages(self):
+        self.assertEqual(self._fetch([['a', 'b'], ['c', 'd'], ['e', 'f']], num_found=4), (['a', 'b', 'c', 'd'], 2))
+
+
+class ClassifyLoanOnlyTests(TestCase):
+    """목록 해시가 같으면 지난번 목록 loanCnt와 비교해 대출 건수만 갱신"""
+
+    def setUp(self):
+        from .ingest import book_content_hash
+
+        self.b_info = {'isbn13': '9788900000001', 'bookname': '책', 'authors': '저자', 'loanCnt': '20'}
+        # loan_count는 상세 조회의 누적 건수(500), 지난번 목록 loanCnt는 10
+        self.book = Book.objects.create(
+            isbn='9788900000001', title='책', author='저자', description='줄거리',
+            loan_count=500, list_loan_count=10, content_hash=book_content_hash(self.b_info),
+        )
+
+    def test_higher_list_loan_count_writes_only_loan_columns(self):
+        from .ingest import _classify, update_loan_counts
+
+        full, loan_only, unchanged = _classify({self.b_info['isbn13']: self.b_info})
+        self.assertEqual((full, loan_only, unchanged), ([], {'9788900000001': 20}, 0))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(update_loan_counts(loan_only), 1)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "books_book"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"title"', updates[0])
+        self.assertNotIn('"description"', updates[0])
+
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.loan_count, self.book.list_loan_count, self.book.description), (500, 20, '줄거리'))
+        # 같은 목록이 다시 오면 변경 없음
+        self.assertEqual(_classify({self.b_info['isbn13']: self.b_info}), ([], {}, 1))
+
+    def test_list_loan_count_above_stored_total_raises_loan_count(self):
+        from .ingest import update_loan_counts
+
+        update_loan_counts({self.b_info['isbn13']: 700})
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.loan_count, self.book.list_loan_count), (700, 700))
+
+
+class SimilarityDeltaTests(TestCase):
+    """유사 도서 delta: 카테고리는 select_related 값을 쓰고, 쌓인 행이 상한을 넘으면 본 행렬로 합쳐 저장"""
+
+    def setUp(self):
+        import tempfile
+        from .similarity import SimilarityIndex
+
+        self.category = Category.objects.create(name='소설')
+        self.books = [
+            Book.objects.create(isbn=f'97889000001{i:02d}', title=f'바다 이야기 {i}', author='김작가', category=self.category)
+            for i in range(3)
+        ]
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.index = SimilarityIndex(model_dir=f'{tmp_dir.name}/model')
+        self.index.ensure_loaded()
+
+    def test_update_uses_selected_category_without_query(self):
+        books = list(Book.objects.select_related('category').filter(id__in=[b.id for b in self.books]))
+        with self.assertNumQueries(0):
+            self.index.update(books)
+        similar = dict(self.index.similar(self.books[0].id, k=5))
+        self.assertEqual(set(similar), {self.books[1].id, self.books[2].id})
+
+    def test_delta_over_limit_is_flushed(self):
+        with mock.patch('books.similarity.MAX_DELTA_ROWS', 2), \
+                mock.patch.object(self.index, '_schedule_flush', self.index.flush):
+            self.index.update(self.books[:1])
+            self.assertEqual(len(self.index._delta), 1)
+            self.index.update(self.books[1:])
+        self.assertEqual(self.index._delta, {})
+        self.assertFalse(self.index._stale.any())
+        self.assertEqual(len(self.index.similar(self.books[0].id, k=5)), 2)
+
+
+class CooccurrenceVersionTests(TestCase):
+    """찜/소장/채팅 변경은 버전 표시로 다른 프로세스의 동시 출현 행렬에 전달된다"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='co@example.com', password='pw', nickname='co', favorite_libraries='도서관', preferred_genres='소설',
+        )
+        self.books = [Book.objects.create(isbn=f'97889000002{i:02d}', title=f'책 {i}') for i in range(2)]
+
+    def test_wishes_in_one_transaction_bump_once_after_commit(self):
+        with mock.patch('books.signals.cooccurrence_version') as version, \
+                self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.books[0].wish_users.add(self.user)
+                self.books[1].wish_users.add(self.user)
+                version.bump.assert_not_called()
+        version.bump.assert_called_once_with()
+
+    def test_other_process_change_triggers_rebuild(self):
+        from .cooccurrence import CooccurrenceModel
+        from .signals import cooccurrence_version
+
+        model = CooccurrenceModel()
+        model.ensure_built()
+        self.assertEqual(model.related(self.books[0].id), [])
+
+        # 다른 프로세스에서 찜한 것처럼: 이 모델에는 record되지 않고 버전만 바뀜
+        with mock.patch('books.signals.cooccurrence.record'), self.captureOnCommitCallbacks(execute=True):
+            self.books[0].wish_users.add(self.user)
+            self.books[1].wish_users.add(self.user)
+        self.assertEqual(model.related(self.books[0].id), [])  # 확인 주기 전에는 그대로
+
+        model._version._checked_at = 0.0
+        self.assertEqual(model.related(self.books[0].id), [(self.books[1].id, 1.0)])
+        self.assertEqual(model._version._built_version, cooccurrence_version.current())
+
+
+class EmbeddedWorkerTests(SimpleTestCase):
+    """웹 프로세스 내장 워커는 인기 도서 스냅샷 갱신 없이 실행"""
+
+    def test_embedded_worker_skips_demographic_refresh(self):
+        from . import jobs
+
+        with mock.patch.object(jobs, '_embedded_started', False), mock.patch.object(jobs.threading, 'Thread') as thread:
+            jobs.start_embedded_worker()
+        self.assertEqual(thread.call_args.kwargs['kwargs'], {'refresh_demographics': False})
+        thread.return_value.start.assert_called_once_with()
+
+
+class KeysetPaginationTests(TestCase):
+    """커서 페이지네이션: 앞/뒤로 넘겨도 같은 페이지, NULL 출판 연도는 항상 맨 뒤"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='cursor@example.com', password='pw-12345678', nickname='cursor',
+            favorite_libraries='국립중앙도서관', age_group='20s', gender='F', preferred_genres='문학',
+        )
+        years = [2020, None, 2021, 2020, None, 2019, 2021]
+        cls.books = [
+            Book.objects.create(title=f'커서 도서 {i}', isbn=f'97811111{i:05d}', pub_year=year, loan_count=i % 3)
+            for i, year in enumerate(years)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, key):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([b['id'] for b in response.json()['results']])
+            url = response.json()[key]
+        return pages
+
+    def _assert_round_trip(self, sort, expected):
+        forward = self._walk(f'/api/v1/books/?sort={sort}&pagination=cursor&page_size=2', 'next')
+        self.assertEqual(sum(forward, []), expected)
+        self.assertTrue(all(len(page) == 2 for page in forward[:-1]))
+
+        # 마지막 페이지에서 이전 링크로 돌아가면 같은 페이지를 역순으로 지난다
+        last = self.client.get(f'/api/v1/books/?sort={sort}&pagination=cursor&page_size=2')
+        url = last.json()['next']
+        while True:
+            body = self.client.get(url).json()
+            if not body['next']:
+                break
+            url = body['next']
+        backward = self._walk(body['previous'], 'previous')
+        self.assertEqual(backward[::-1], forward[:-1])
+
+    def test_latest_puts_null_years_last(self):
+        expected = [b.id for b in sorted(self.books, key=lambda b: (b.pub_year is None, -(b.pub_year or 0), -b.id))]
+        self._assert_round_trip('latest', expected)
+
+    def test_popular_breaks_ties_by_id(self):
+        expected = [b.id for b in sorted(self.books, key=lambda b: (-b.loan_count, -b.id))]
+        self._assert_round_trip('popular', expected)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get('/api/v1/books/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class JobQueueTests(TestCase):
+    """추천 작업 큐: 실행 시각 순 선점, 같은 사용자 동시 실행 금지, 중단된 작업 재시도"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        self.now = timezone.now()
+        self.past = self.now - timedelta(seconds=60)
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f'job{i}@example.com', password='pw', nickname=f'job{i}',
+                favorite_libraries='도서관', preferred_genres='소설',
+            )
+            for i in range(3)
+        ]
+
+    def _job(self, user, **fields):
+        fields.setdefault('run_after', self.past)
+        return RecommendationJob.objects.create(user=user, **fields)
+
+    def test_claims_due_jobs_in_run_after_order(self):
+        from datetime import timedelta
+        from .jobs import claim_next_job
+
+        later = self._job(self.users[0])
+        earlier = self._job(self.users[1], run_after=self.past - timedelta(seconds=30))
+        self._job(self.users[2], run_after=self.now + timedelta(hours=1))
+
+        first = claim_next_job()
+        self.assertEqual((first.id, first.status, first.attempts), (earlier.id, RecommendationJob.RUNNING, 1))
+        self.assertEqual(claim_next_job().id, later.id)
+        self.assertIsNone(claim_next_job())  # 남은 작업은 아직 실행 시각 전
+
+    def test_skips_user_with_running_job(self):
+        from .jobs import claim_next_job
+
+        self._job(self.users[0], status=RecommendationJob.RUNNING, started_at=self.now)
+        self._job(self.users[0])
+        self.assertIsNone(claim_next_job())
+
+    def test_requeue_stale_jobs_retries_then_fails(self):
+        from datetime import timedelta
+        from .jobs import requeue_stale_jobs
+
+        started = self.now - timedelta(hours=1)
+        retry = self._job(self.users[0], status=RecommendationJob.RUNNING, started_at=started, attempts=1)
+        give_up = self._job(self.users[1], status=RecommendationJob.RUNNING, started_at=started, attempts=4)
+        fresh = self._job(self.users[2], status=RecommendationJob.RUNNING, started_at=self.now, attempts=1)
+
+        self.assertEqual(requeue_stale_jobs(), 2)
+        retry.refresh_from_db()
+        give_up.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(retry.status, RecommendationJob.PENDING)
+        self.assertGreater(retry.run_after, self.now)  # 백오프 후 재시도
+        self.assertEqual(give_up.status, RecommendationJob.FAILED)
+        self.assertEqual(fresh.status, RecommendationJob.RUNNING)
+
+
+class PersonalizeTests(TestCase):
+    """코호트 LLM 응답을 사용자별로: 이미 반응한 도서는 빼고, 모자라면 동시 출현 도서로 채움"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='pick@example.com', password='pw', nickname='pick', favorite_libraries='도서관', preferred_genres='소설',
+        )
+        self.books = [Book.objects.create(isbn=f'97822222{i:05d}', title=f'추천 도서 {i}') for i in range(6)]
+
+    def test_excludes_reacted_and_fills_from_cooccurrence(self):
+        from .precompute import COOCCURRENCE_REASON, _personalize
+
+        b = self.books
+        answer = [
+            {'book_id': b[0].id, 'reason': '이미 찜함'},
+            {'book_id': b[1].id, 'reason': '추천 1'},
+            {'book_id': -1, 'reason': '후보에 없음'},
+            'junk',
+            {'book_id': b[1].id, 'reason': '중복'},
+        ]
+        candidates = {book.id: book for book in b[:3]}
+        with mock.patch('books.precompute.cooccurrence') as model:
+            model.reacted.return_value = {b[0].id}
+            model.recommend.return_value = [(b[1].id, 3.0), (b[4].id, 2.0), (b[5].id, 1.0)]
+            picks = _personalize(self.user, answer, candidates, {b[1].id: b[1], b[4].id: b[4]})
+
+        self.assertEqual([(p.book_id, p.reason) for p in picks], [(b[1].id, '추천 1'), (b[4].id, COOCCURRENCE_REASON)])
+        self.assertTrue(all(p.user_id == self.user.id and p.pk is None for p in picks))
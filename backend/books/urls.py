@@ -1,13 +1,18 @@
 from django.urls import path
-from .views import RecommendationView, BookActionView, BookListView, BookDetailView, CategoryListView, LibraryListView
+from .views import RecommendationView, RecommendationStreamView, BookActionView, BookListView, BookSuggestView, BookDetailView, BookSimilarView, BookAlsoWantedView, CategoryListView, LibraryListView, CacheStatsView
 from users import views as user_views
 
 urlpatterns = [
     path('', BookListView.as_view(), name='book-list'),
+    path('suggest/', BookSuggestView.as_view(), name='book-suggest'),
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('recommendations/', RecommendationView.as_view(), name='recommendation_list'),
+    path('recommendations/stream/', RecommendationStreamView.as_view(), name='recommendation_stream'),
     path('libraries/', LibraryListView.as_view(), name='library-list'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
     path('<str:isbn>/', BookDetailView.as_view(), name='book-detail'),
+    path('<str:isbn>/similar/', BookSimilarView.as_view(), name='book-similar'),
+    path('<str:isbn>/also-wanted/', BookAlsoWantedView.as_view(), name='book-also-wanted'),
     path('<str:isbn>/action/<str:action>/', BookActionView.as_view(), name='book-action'),
     path('<str:isbn>/register-price/', user_views.register_price, name='register_price'),
     path('<str:isbn>/owners/', user_views.get_owners, name='get_owners'),
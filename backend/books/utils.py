@@ -1,17 +1,21 @@
 import re
 import os 
-import time
-import math
 import json
-import requests
-import xmltodict 
-from datetime import datetime, timedelta
+import hashlib
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
 from django.conf import settings
 
-from django.db.models import Q, Count
-from openai import OpenAI
+from django.db.models import Count
 
-from .models import Book, Category, Recommendation, Library
+from .models import Book, DemographicPopularity, Recommendation
+from .cache import TTLCache, MISSING
+from .geo import haversine, haversine_many, library_index
+from .candidates import candidate_pool
+from .cooccurrence import cooccurrence
+from .llm import llm, LLMError
+from .data4library import client as data4library, Data4LibraryError
 from community.models import ChatMessage
 
 # --- [1] 데이터 정제 및 유틸리티 ---
@@ -22,15 +26,10 @@ def fetch_books_from_api(api_type="loanItemSrch"):
     if not auth_key:
         return {"response": {"docs": []}} 
 
-    url = f"http://data4library.kr/api/{api_type}"
-    params = {"authKey": auth_key, "pageSize": 50, "format": "json"}
     try:
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            if 'application/json' in response.headers.get('Content-Type', ''):
-                return response.json()
-            return json.loads(json.dumps(xmltodict.parse(response.content)))
-    except Exception as e:
+        # JSON/XML 응답 모두 공용 클라이언트에서 dict로 변환됨
+        return data4library.get(api_type, {"pageSize": 50})
+    except Data4LibraryError as e:
         print(f"⚠️ API 호출 에러: {e}")
     return None
 
@@ -72,168 +71,173 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     """두 지점 사이의 직선 거리를 km로 계산 (Haversine 공식)"""
     if None in [lat1, lon1, lat2, lon2]:
         return 0
-    radius = 6371  # 지구 반지름 (km)
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2) * math.sin(dlat/2) + math.cos(math.radians(lat1)) \
-        * math.cos(math.radians(lat2)) * math.sin(dlon/2) * math.sin(dlon/2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return round(radius * c, 2)
+    return round(haversine(lat1, lon1, lat2, lon2), 2)
+
+def calculate_distances(lat, lon, points):
+    """calculate_distance의 일괄 버전: [(위도, 경도)] 목록까지의 거리(km) 리스트 (좌표가 없으면 0)"""
+    if lat is None or lon is None or not points:
+        return [0] * len(points)
+    lats = np.array([p[0] if p[0] is not None else np.nan for p in points], dtype=float)
+    lons = np.array([p[1] if p[1] is not None else np.nan for p in points], dtype=float)
+    distances = np.round(haversine_many(lat, lon, lats, lons), 2)
+    return [0 if np.isnan(d) else float(d) for d in distances]
 
 # --- [2] 도서 정보 수집 및 API 동기화 (통합본) ---
 
-def get_detailed_book_info(isbn):
-    """상세 API 호출: 줄거리(description) 및 누적 대출 건수 반환"""
-    auth_key = getattr(settings, 'LIBRARY_API_KEY', None)
-    url = "http://data4library.kr/api/srchDtlList"
-    params = {"authKey": auth_key, "isbn13": isbn, "loaninfoYN": "Y", "format": "json"}
-    
+def fetch_book_detail(isbn):
+    """
+    상세 API 호출: 줄거리(description) 및 누적 대출 건수 반환
+    호출 자체가 실패하면 Data4LibraryError (줄거리가 없는 도서와 구분하기 위함)
+    """
+    params = {"isbn13": isbn, "loaninfoYN": "Y"}
     res_data = {"loan_count": 0, "description": ""}
+    resp = data4library.get("srchDtlList", params).get('response', {})
+    # 대출 정보
+    loan_info = resp.get('loanInfo', [])
+    if loan_info:
+        res_data["loan_count"] = int(loan_info[0].get('Total', {}).get('loanCnt', 0))
+    # 줄거리 후보 필드 순차 확인
+    detail = resp.get('detail', [])
+    if detail:
+        b = detail[0].get('book', {})
+        res_data["description"] = (b.get('description') or b.get('bookIntroduction') or b.get('contents') or "").strip()
+    return res_data
+
+def get_detailed_book_info(isbn):
+    """상세 API 호출: 줄거리(description) 및 누적 대출 건수 반환 (실패 시 빈 값)"""
     try:
-        resp = requests.get(url, params=params, timeout=5).json().get('response', {})
-        # 대출 정보
-        loan_info = resp.get('loanInfo', [])
-        if loan_info:
-            res_data["loan_count"] = int(loan_info[0].get('Total', {}).get('loanCnt', 0))
-        # 줄거리 후보 필드 순차 확인
-        detail = resp.get('detail', [])
-        if detail:
-            b = detail[0].get('book', {})
-            res_data["description"] = (b.get('description') or b.get('bookIntroduction') or b.get('contents') or "").strip()
+        return fetch_book_detail(isbn)
     except: pass
-    return res_data
+    return {"loan_count": 0, "description": ""}
 
-def sync_popular_books_by_kdc(pages=2):
-    """KDC 분류별 인기 도서 수집 및 동기화 (최근 3개월 기준)"""
-    auth_key = getattr(settings, 'LIBRARY_API_KEY', None)
-    base_url = "http://data4library.kr/api/loanItemSrch"
-    start_dt = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-    end_dt = datetime.now().strftime('%Y-%m-%d')
-
-    for kdc in [str(i) for i in range(10)]:
-        print(f"📂 KDC {kdc} 분류 동기화 시작...")
-        for page in range(1, pages + 1):
-            params = {"authKey": auth_key, "kdc": kdc, "startDt": start_dt, "endDt": end_dt, "pageSize": 50, "pageNo": page, "format": "json"}
-            try:
-                time.sleep(0.5)
-                docs = requests.get(base_url, params=params).json().get('response', {}).get('docs', [])
-                for item in docs:
-                    b_info = item.get('doc', {})
-                    isbn = b_info.get('isbn13')
-                    if not isbn: continue
-
-                    detailed = get_detailed_book_info(isbn)
-                    title, author = clean_book_data(b_info.get('bookname', ''), b_info.get('authors', ''))
-                    
-                    cat_nm = b_info.get('class_nm', '').split('>')[0].strip() or "기타"
-                    cat_inst, _ = Category.objects.get_or_create(name=cat_nm)
-
-                    Book.objects.update_or_create(
-                        isbn=isbn,
-                        defaults={
-                            'title': title, 'author': author, 'publisher': b_info.get('publisher'),
-                            'description': detailed["description"] or b_info.get('description', ""),
-                            'cover_url': b_info.get('bookImageURL'), 'category': cat_inst,
-                            'loan_count': max(int(b_info.get('loanCnt', 0)), detailed["loan_count"]),
-                            'pub_year': int(str(b_info.get('publication_year'))[:4]) if b_info.get('publication_year') else None,
-                        }
-                    )
-            except Exception as e: print(f"❌ 에러({kdc}-{page}): {e}")
-
-def fix_missing_descriptions():
-    """DB 내 줄거리가 없는 도서들만 골라 정밀 보강"""
-    targets = Book.objects.filter(
-        Q(description__isnull=True) | Q(description="") | Q(description__contains="준비 중")
+def sync_popular_books_by_kdc(pages=2, workers=None, rate=None, batch_size=200, dry_run=False, force=False):
+    """
+    KDC 분류별 인기 도서 수집 및 동기화 (최근 3개월 기준)
+    목록/상세 조회는 동시에(전체 호출 속도는 DATA4LIBRARY_RATE_LIMIT로 제한), 저장은 배치 bulk upsert
+    KDC별 워터마크와 도서별 내용 해시로 바뀐 도서만 상세 조회/저장 (dry_run이면 바뀔 건수만 보고)
+    """
+    from .ingest import run_popular_books_sync
+    return run_popular_books_sync(
+        pages=pages, workers=workers, rate=rate, batch_size=batch_size, dry_run=dry_run, force=force,
     )
-    print(f"🚀 총 {targets.count()}권 보강 시작...")
-    
-    updated = 0
-    for i, book in enumerate(targets, 1):
-        time.sleep(0.5)
-        detailed = get_detailed_book_info(book.isbn)
-        if detailed["description"]:
-            book.description = detailed["description"]
-            book.save()
-            updated += 1
-            print(f"[{i}] ✅ {book.title} 업데이트")
-        else:
-            # 보강 실패 시 중복 작업을 막기 위해 기본 문구 삽입
-            book.description = "상세 정보가 제공되지 않는 도서입니다."
-            book.save()
-    print(f"✨ 완료: {updated}권 보강됨")
+
+def fix_missing_descriptions(workers=None, rate=None, batch_size=100, restart=False):
+    """
+    DB 내 줄거리가 없는 도서들만 골라 정밀 보강 (중단되면 마지막 체크포인트부터 이어서 실행)
+    상세 조회는 동시에(DATA4LIBRARY_RATE_LIMIT로 제한), 저장은 description 필드만 배치 bulk_update
+    """
+    from .ingest import run_description_backfill
+    return run_description_backfill(workers=workers, rate=rate, batch_size=batch_size, restart=restart)
 
 # --- [3] AI 추천 로직 ---
 
-def get_popular_books_by_user(user):
-    """사용자의 성별/연령대별 최근 3개월 인기 대출 도서 리스트 조회"""
-    auth_key = getattr(settings, 'LIBRARY_API_KEY', None)
-    url = "http://data4library.kr/api/loanItemSrch"
-    # 1. 날짜 설정: 현재 날짜 기준 3개월 전부터 어제까지
-    end_dt = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-    start_dt = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-    # 2. 성별/연령대 매핑 (API 코드 명세 반영)
-    gender_code = '0' if user.gender == 'M' else '1' if user.gender == 'F' else '2'
-    age_map = {'10s': '14', '20s': '20', '30s': '30', '40s': '40', '50s': '50', '60s+': '60'}
-    age_code = age_map.get(user.age_group, '20')
-    params = {
-        "authKey": auth_key,
-        "startDt": start_dt,
-        "endDt": end_dt,
-        "gender": gender_code,
-        "age": age_code,
-        "pageSize": 10,
-        "format": "json"
-    }
-    try:
-        response = requests.get(url, params=params)
-        docs = response.json().get('response', {}).get('docs', [])
-        # API 응답에서 도서명(bookname) 리스트 추출
-        return [d.get('doc', {}).get('bookname') for d in docs]
-    except:
-        return []
+def get_fallback_recommendations(user, k=5):
+    """
+    AI 추천이 아직 없을 때 바로 보여줄 추천: 선호 카테고리별 대출 상위 도서를 번갈아 k권 (쿼리 1번)
+    저장하지 않은 Recommendation 객체(id 없음)로 반환한다.
+    """
+    category_ids = list(user.preferred_categories.values_list('id', flat=True))
+    books = Book.objects.select_related('category').order_by('-loan_count', 'id')
+    if category_ids:
+        books = books.filter(category_id__in=category_ids)[:k * len(category_ids)]
+    else:
+        books = books[:k]
+
+    # 카테고리마다 대출 순위를 유지한 채 한 권씩 번갈아 뽑아 여러 선호 장르가 고르게 섞이게
+    by_category = {}
+    for book in books:
+        by_category.setdefault(book.category_id, []).append(book)
+    picked = []
+    while len(picked) < k and any(by_category.values()):
+        for queue in by_category.values():
+            if queue and len(picked) < k:
+                picked.append(queue.pop(0))
+
+    return [
+        Recommendation(
+            user=user, book=book,
+            reason=f"{book.category.name} 분야에서 지금 가장 많이 읽히는 책!" if book.category else "지금 가장 많이 읽히는 책!",
+        )
+        for book in picked
+    ]
 
-def generate_ai_recommendations(user, force_update=False):
-    """사용자 프로필 + 실시간 인기 통계 + 커뮤니티 활동 기반 AI 추천 생성"""
+def get_popular_books_by_user(user):
+    """
+    사용자의 성별/연령대별 최근 3개월 인기 대출 도서 리스트 (미리 저장해 둔 스냅샷 조회, 외부 API 호출 없음)
+    오늘 스냅샷이 아직 없으면 가장 최근 스냅샷을 쓴다.
+    """
+    from .ingest import demographic_codes
 
-    # 이미 추천 데이터가 있고 강제 업데이트가 아니면 그냥 리턴
-    if not force_update and Recommendation.objects.filter(user=user).exists():
-        return True
-    
-    if not settings.OPENAI_API_KEY: return False
-    client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url="https://gms.ssafy.io/gmsapi/api.openai.com/v1")
+    gender_code, age_code = demographic_codes(user.gender, user.age_group)
+    snapshot = (
+        DemographicPopularity.objects.filter(gender=gender_code, age=age_code)
+        .order_by('-end_dt').values_list('books', flat=True).first()
+    )
+    return [b['title'] for b in snapshot or []]
+
+def refresh_demographic_popularity(workers=None, rate=None, force=False):
+    """성별/연령대별 인기 도서 스냅샷 갱신 (스케줄 작업/워커에서 호출)"""
+    from .ingest import run_demographic_popularity_refresh
+    return run_demographic_popularity_refresh(workers=workers, rate=rate, force=force)
+
+def _cohort_seed(user, category_ids, active_interests):
+    """같은 날 같은 코호트(연령대/성별/선호 카테고리/활동 카테고리)면 같은 후보를 뽑도록 하는 난수 시드"""
+    key = f"{user.age_group}|{user.gender}|{sorted(category_ids)}|{active_interests}|{datetime.now():%Y-%m-%d}"
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:12], 16)
+
+def _parse_recommendations(content):
+    """LLM 응답에서 [{book_id, reason}] 목록 추출 (형식이 다르면 예외 → 캐시하지 않음)"""
+    content = content.strip()
+    # 마크다운 태그 제거 로직
+    if "```" in content:
+        content = content.split("```")[1].replace("json", "").strip()
+    recommendations = json.loads(content)
+    if not isinstance(recommendations, list):
+        raise ValueError("JSON 배열이 아님")
+    return recommendations
+
+def build_recommendation_request(user, personal=True):
+    """
+    사용자 프로필 + 실시간 인기 통계 + 커뮤니티 활동 기반 추천 프롬프트 → (LLM 메시지, {후보 도서 id: Book})
+    personal=False면 활동 분석/동시 출현 후보 없이 코호트(연령대/성별/선호 장르)만으로 구성 (일괄 사전 계산용)
+    """
 
     # 1. 커뮤니티 활동 분석 (댓글 5개 이상 시 카테고리 추출)
     user_comments = ChatMessage.objects.filter(user=user).select_related('book__category')
     active_interests = ""
-    if user_comments.count() >= 5:
-        top_cats = user_comments.values('book__category__name').annotate(c=Count('book__category')).order_by('-c')[:2]
-        active_interests = f"최근 관심 카테고리: {', '.join([c['book__category__name'] for c in top_cats])}"
+    if personal and user_comments.count() >= 5:
+        top_cats = user_comments.values('book__category__name').annotate(c=Count('book__category')).order_by('-c', 'book__category__name')[:2]
+        active_interests = f"최근 관심 카테고리: {', '.join([c['book__category__name'] or '기타' for c in top_cats])}"
 
     # 2. 도서관 인기 대출 통계 확보 (최근 3개월 데이터)
     stat_popular_books = get_popular_books_by_user(user)
-    stat_context = f"현재 해당 연령대/성별 인기 도서: {', '.join(stat_popular_books)}"
-
-    # 3. 추천 후보 도서 추출 (다중 장르 대응)
-    genres = [g.strip() for g in user.preferred_genres.split(',') if g.strip()]
+    stat_context = f"현재 해당 연령대/성별 인기 도서: {', '.join(filter(None, stat_popular_books))}"
+
+    # 3. 추천 후보 도서 추출 (다중 장르 대응, 정규화된 선호 카테고리로 조회)
+    #    찜/소장/채팅 동시 출현 기반 후보를 먼저 넣고, 나머지는 카테고리별 후보 풀에서 인기도 가중 무작위 추출
+    #    (ORDER BY RANDOM() 없이 id만 뽑고 1번 조회)
+    #    동시 출현 후보가 없는 사용자는 코호트 시드로 뽑아 같은 코호트끼리 프롬프트가 같아지게 한다 (LLM 응답 캐시 공유)
+    candidate_ids = [book_id for book_id, _ in cooccurrence.recommend(user.id, k=10)] if personal else []
+    preferred = list(user.preferred_categories.order_by('name').values_list('id', 'name'))
+    category_ids = [cid for cid, _ in preferred]
+    seed = None if candidate_ids else _cohort_seed(user, category_ids, active_interests)
+    # 이미 고른 후보는 제외하고 뽑아 중복으로 후보 수가 30권보다 줄지 않게
+    candidate_ids += candidate_pool.sample(category_ids, k=30 - len(candidate_ids), seed=seed, exclude=candidate_ids)
     
-    query = Q()
-    for genre in genres:
-        query |= Q(category__name__icontains=genre)
-    
-    # 선호 장르가 없거나 검색 결과가 없을 경우를 대비해 베스트셀러/소설 등 기본 후보 확보
-    candidate_books = Book.objects.filter(query).order_by('?')[:30]
-    
-    if not candidate_books.exists():
-        candidate_books = Book.objects.all().order_by('-loan_count')[:30]
+    # 선호 장르 후보가 없을 경우를 대비해 전체 풀에서 기본 후보 확보
+    if len(candidate_ids) < 30 and category_ids:
+        candidate_ids += candidate_pool.sample(None, k=30 - len(candidate_ids), seed=seed, exclude=candidate_ids)
+    candidate_books = list(Book.objects.filter(id__in=candidate_ids).select_related('category').order_by('id'))
 
     book_list_str = "\n".join([
-        f"- ID:{b.id} | 제목:{b.title} | 카테고리:{b.category.name} | 줄거리:{b.description[:100]}" 
+        f"- ID:{b.id} | 제목:{b.title} | 카테고리:{b.category.name if b.category else '기타'} | 줄거리:{(b.description or '')[:100]}" 
         for b in candidate_books
     ])
+    genres = ', '.join(name for _, name in preferred) or user.preferred_genres
 
     # 4. 고도화된 프롬프트 구성
     prompt = f"""
-    사용자 정보: {user.get_age_group_display()} {user.get_gender_display()}, 선호: {user.preferred_genres}
+    사용자 정보: {user.get_age_group_display()} {user.get_gender_display()}, 선호: {genres}
     활동 분석: {active_interests if active_interests else "신규 유저"}
     외부 통계: {stat_context}
     
@@ -248,98 +252,157 @@ def generate_ai_recommendations(user, force_update=False):
     반드시 순수 JSON 형식으로만 응답할 것: [{{ "book_id": ID, "reason": "이유" }}]
     """
 
+    messages = [
+        {"role": "developer", "content": "당신은 트렌디한 감각을 가진 전문 사서입니다."},
+        {"role": "user", "content": prompt},
+    ]
+    return messages, {b.id: b for b in candidate_books}
+
+def _pick_recommendation(user, books, rec, picked):
+    """LLM 응답 항목 1개 검증: 후보 목록에 있고 아직 안 뽑힌 도서면 저장 전 Recommendation, 아니면 None"""
+    if not isinstance(rec, dict) or len(picked) >= 5:
+        return None
+    book = books.get(rec.get('book_id'))
+    if book is None or book.id in picked:
+        return None
+    picked[book.id] = Recommendation(user=user, book=book, reason=rec.get('reason') or '')
+    return picked[book.id]
+
+def save_recommendations(user, recommendations):
+    """기존 추천을 새 추천으로 한 번에 교체"""
+    from django.db import transaction
+    with transaction.atomic():
+        Recommendation.objects.filter(user=user).delete()
+        return Recommendation.objects.bulk_create(recommendations)
+
+def generate_ai_recommendations(user, force_update=False):
+    """사용자 프로필 + 실시간 인기 통계 + 커뮤니티 활동 기반 AI 추천 생성"""
+
+    # 이미 추천 데이터가 있고 강제 업데이트가 아니면 그냥 리턴
+    if not force_update and Recommendation.objects.filter(user=user).exists():
+        return True
+    
+    if not settings.OPENAI_API_KEY: return False
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "developer", "content": "당신은 트렌디한 감각을 가진 전문 사서입니다."}, {"role": "user", "content": prompt}],
-            temperature=0.8
-        )
-        content = response.choices[0].message.content.strip()
-        # 마크다운 태그 제거 로직
-        if "```" in content:
-            content = content.split("```")[1].replace("json", "").strip()
-        
-        recommendations = json.loads(content)
+        messages, books = build_recommendation_request(user)
+        # 공용 게이트웨이: 같은 프롬프트(같은 코호트)는 캐시/진행 중 호출을 재사용
+        recommendations = llm.complete(messages, temperature=0.8, parse=_parse_recommendations, purpose="recommendation")
         
-        # 5. DB 업데이트 (트랜잭션 권장)
-        from django.db import transaction
-        with transaction.atomic():
-            Recommendation.objects.filter(user=user).delete()
-            for rec in recommendations[:5]: # 최대 5개 제한
-                book = Book.objects.filter(id=rec.get('book_id')).first()
-                if book:
-                    Recommendation.objects.create(
-                        user=user, 
-                        book=book, 
-                        reason=rec.get('reason')
-                    )
+        # 5. DB 업데이트 (후보 목록에 있던 도서만, 중복 제외 최대 5개)
+        picked = {}
+        for rec in recommendations:
+            _pick_recommendation(user, books, rec, picked)
+        if not picked:
+            # 쓸 수 있는 추천이 없으면 기존 추천을 유지하고 실패로 처리 (작업 큐에서 재시도)
+            print("❌ AI 오류: 후보 목록에 있는 추천 도서가 없음")
+            return False
+        save_recommendations(user, list(picked.values()))
         return True
     except Exception as e:
         print(f"❌ AI 오류: {e}")
         return False
+
+def stream_ai_recommendations(user):
+    """
+    LLM 스트리밍 응답에서 추천이 1건 해석될 때마다 저장 전 Recommendation을 yield하고, 끝나면 한 번에 저장
+    실패하면 LLMError (기존 추천은 그대로 유지)
+    """
+    messages, books = build_recommendation_request(user)
+    picked = {}
+    # 5권을 넘어도 끝까지 읽어야 전체 응답이 캐시에 남는다
+    for rec in llm.stream_objects(messages, temperature=0.8, purpose="recommendation-stream"):
+        recommendation = _pick_recommendation(user, books, rec, picked)
+        if recommendation is not None:
+            yield recommendation
+    if not picked:
+        raise LLMError("후보 목록에 있는 추천 도서가 없음")
+    save_recommendations(user, list(picked.values()))
     
 # --- [4] 도서관 및 위치 기반 기능 ---
 
 # 도서관 목록 업데이트 
-def update_libraries():
-    auth_key = getattr(settings, 'LIBRARY_API_KEY', None)
-    base_url = "http://data4library.kr/api/libSrch"
-    regions = ["11", "31", "22", "21", "23", "24", "25", "26", "32", "33", "34", "35", "36", "37", "38", "39"]
-    total_count = 0
-
-    for region_code in regions:
-        params = {"authKey": auth_key, "region": region_code, "pageSize": 100, "format": "json"}
-        try:
-            response = requests.get(base_url, params=params)
-            data = response.json()
-            libs_list = data.get('response', {}).get('libs', [])
-            for item in libs_list:
-                lib_info = item.get('lib', {})
-                Library.objects.update_or_create(
-                    lib_code=lib_info.get('libCode'),
-                    defaults={
-                        'lib_name': lib_info.get('libName'),
-                        'address': lib_info.get('address'),
-                        'tel': lib_info.get('tel'),
-                        'latitude': float(lib_info.get('latitude')) if lib_info.get('latitude') else None,
-                        'longitude': float(lib_info.get('longitude')) if lib_info.get('longitude') else None,
-                        'homepage': lib_info.get('homepage'),
-                    }
-                )
-                total_count += 1
-        except Exception as e:
-            print(f"Error region {region_code}: {e}")
-    print(f"✅ {total_count}개 도서관 저장 완료")
+def update_libraries(workers=None, rate=None):
+    """
+    지역별 도서관 목록을 모든 페이지에 걸쳐 동시에 조회하고, 새로 생겼거나 바뀐 도서관만 bulk 저장
+    """
+    from .ingest import run_library_sync
+    return run_library_sync(workers=workers, rate=rate)
+
+# 소장 여부를 제시간에 확인하지 못한 도서관에 표시하는 값 (Y/N과 구분)
+LIBRARY_STATUS_UNKNOWN = "unknown"
+
+# bookExist 동시 호출용 공용 스레드 풀 (요청마다 스레드를 만들지 않도록 프로세스당 하나)
+_library_status_pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'LIBRARY_STATUS_MAX_WORKERS', 16),
+    thread_name_prefix='book-exist',
+)
+
+# (lib_code, isbn13) -> (hasBook, loanAvailable) 캐시
+# 인기 도서는 같은 도서관 조회가 몰리므로 TTL 동안은 외부 API를 다시 부르지 않고,
+# TTL이 지난 값은 일단 응답한 뒤 백그라운드에서 갱신한다.
+book_exist_cache = TTLCache(
+    'book_exist',
+    ttl=getattr(settings, 'BOOK_EXIST_CACHE_TTL', 60),
+    stale_ttl=getattr(settings, 'BOOK_EXIST_CACHE_STALE_TTL', 600),
+    maxsize=getattr(settings, 'BOOK_EXIST_CACHE_MAXSIZE', 10000),
+    executor=_library_status_pool,
+)
+
+def fetch_book_exist(lib_code, isbn):
+    """도서관 1곳의 실시간 소장/대출 가능 여부 (hasBook, loanAvailable) 조회"""
+    params = {
+        "libCode": lib_code,
+        "isbn13": isbn,
+    }
+    # 타임아웃을 짧게 설정하여 상세페이지 로딩 지연 방지
+    timeout = getattr(settings, 'LIBRARY_STATUS_TIMEOUT', 1.5)
+    resp = data4library.get("bookExist", params, timeout=timeout)
+    exist_res = resp.get('response', {}).get('result', {})
+    return exist_res.get('hasBook', 'N'), exist_res.get('loanAvailable', 'N')
+
+def _fetch_book_exist_by_key(key):
+    return fetch_book_exist(*key)
+
+def _load_book_exist(key):
+    """캐시 미스/갱신용 로더: 조회에 성공한 결과만 캐시에 저장"""
+    result = fetch_book_exist(*key)
+    book_exist_cache.set(key, result)
+    return result
 
 def get_library_full_status(isbn, libraries, user_lat, user_lon):
     """
     도서관 객체 리스트를 받아 실시간 상태 및 거리 정보를 포함한 데이터 반환
     이 함수가 기존의 get_realtime_library_status를 대체합니다.
+    도서관별 조회는 동시에 실행하고 전체 마감 시간(LIBRARY_STATUS_DEADLINE) 안에
+    응답하지 못한(또는 실패한) 도서관은 "unknown"으로 표시합니다.
     """
-    auth_key = getattr(settings, 'LIBRARY_API_KEY', None)
-    url = "http://data4library.kr/api/bookExist"
-    results = []
+    deadline = getattr(settings, 'LIBRARY_STATUS_DEADLINE', 2.0)
 
+    # 캐시에 있는 도서관은 바로 사용하고, 없는 도서관만 외부 API를 동시에 호출
+    cached, futures = {}, {}
     for lib in libraries:
-        # 실시간 API 호출 (소장 여부 확인)
-        params = {
-            "authKey": auth_key,
-            "libCode": lib.lib_code,
-            "isbn13": isbn,
-            "format": "json"
-        }
-        
-        has_book = "N"
-        loan_available = "N"
-        
-        try:
-            # 타임아웃을 짧게 설정하여 상세페이지 로딩 지연 방지
-            resp = requests.get(url, params=params, timeout=1.5).json()
-            exist_res = resp.get('response', {}).get('result', {})
-            has_book = exist_res.get('hasBook', 'N')
-            loan_available = exist_res.get('loanAvailable', 'N')
-        except:
-            pass # 실패 시 기본값 N 유지
+        key = (lib.lib_code, isbn)
+        value = book_exist_cache.get(key, loader=_fetch_book_exist_by_key)
+        if value is MISSING:
+            futures[lib.lib_code] = _library_status_pool.submit(_load_book_exist, key)
+        else:
+            cached[lib.lib_code] = value
+    if futures:
+        wait(futures.values(), timeout=deadline)
+
+    distances = calculate_distances(user_lat, user_lon, [(lib.latitude, lib.longitude) for lib in libraries])
+
+    results = []
+    for lib, distance in zip(libraries, distances):
+        has_book = loan_available = LIBRARY_STATUS_UNKNOWN
+        future = futures.get(lib.lib_code)
+        if future is None:
+            has_book, loan_available = cached[lib.lib_code]
+        elif future.done() and not future.exception():
+            has_book, loan_available = future.result()
+        else:
+            future.cancel() # 아직 시작 못 한 호출은 취소
 
         results.append({
             "libCode": lib.lib_code,
@@ -349,98 +412,30 @@ def get_library_full_status(isbn, libraries, user_lat, user_lon):
             "homepage": lib.homepage,
             "hasBook": has_book,
             "loanAvailable": loan_available,
-            "distance": calculate_distance(user_lat, user_lon, lib.latitude, lib.longitude)
+            "distance": distance
         })
     return results
 
 def get_nearby_libraries_list(user_lat, user_lon, exclude_codes, limit=5):
     """
-    관심 도서관을 제외한 주변 도서관 객체 리스트 반환
+    관심 도서관을 제외한 주변 도서관 객체 리스트 반환 (공간 인덱스로 실제 거리순 조회)
     """
-    # 관심 도서관 제외하고 필터링
-    all_other_libs = Library.objects.exclude(lib_code__in=exclude_codes)
-    
-    # 거리순 정렬 (단순 위경도 차이의 제곱합 사용 - 정렬용으로는 충분)
-    nearby_libs = sorted(
-        all_other_libs,
-        key=lambda l: (l.latitude - user_lat)**2 + (l.longitude - user_lon)**2
-    )
-    
-    return nearby_libs[:limit]
+    return library_index.nearest(user_lat, user_lon, k=limit, exclude=exclude_codes)
 
 # [5] 데이터 임포트 
     
-def import_all_data():
-    """books.json 파일에서 카테고리, 도서관, 도서를 순차적으로 임포트"""
-    
+def import_all_data(batch_size=500):
+    """books.json 파일에서 카테고리, 도서관, 도서를 스트리밍으로 임포트 (import_books 커맨드와 동일)"""
+    from .importer import import_fixture
+
     path = os.path.join(settings.BASE_DIR, 'fixtures', 'books.json')
     
     if not os.path.exists(path):
         print(f"❌ 파일을 찾을 수 없습니다: {path}")
         return
 
-    with open(path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # 1. 카테고리(Category) 임포트
-    cat_count = 0
-    for item in data:
-        if item.get('model') == 'books.category':
-            fields = item['fields']
-            Category.objects.update_or_create(
-                id=item['pk'],
-                defaults={'name': fields.get('name')}
-            )
-            cat_count += 1
-    print(f"✅ 카테고리 임포트 완료: {cat_count}개")
-
-    # 2. 도서관(Library) 임포트
-    lib_count = 0
-    for item in data:
-        if item.get('model') == 'books.library':
-            fields = item['fields']
-            Library.objects.update_or_create(
-                lib_code=item['pk'],
-                defaults={
-                    'lib_name': fields.get('lib_name'),
-                    'address': fields.get('address'),
-                    'tel': fields.get('tel'),
-                    'latitude': fields.get('latitude'),
-                    'longitude': fields.get('longitude'),
-                    'homepage': fields.get('homepage'),
-                }
-            )
-            lib_count += 1
-    print(f"✅ 도서관 임포트 완료: {lib_count}개")
-
-    # 3. 도서(Book) 임포트
-    book_count = 0
-    for item in data:
-        if item.get('model') == 'books.book':
-            fields = item['fields']
-            
-            category_instance = Category.objects.filter(id=fields.get('category')).first()
-            
-            # pub_year 정제
-            pub_year = fields.get('pub_year')
-            if not pub_year and fields.get('pub_date'):
-                try:
-                    pub_year = int(str(fields.get('pub_date'))[:4])
-                except:
-                    pub_year = None
-
-            Book.objects.update_or_create(
-                isbn=fields.get('isbn'),
-                defaults={
-                    'title': fields.get('title'),
-                    'author': fields.get('author'),
-                    'publisher': fields.get('publisher'),
-                    'description': fields.get('description'),
-                    'cover_url': fields.get('cover_url') or fields.get('cover'),
-                    'category': category_instance,
-                    'pub_year': pub_year,
-                    'loan_count': fields.get('loan_count', 0),
-                }
-            )
-            book_count += 1
-    print(f"✅ 도서 임포트 완료: {book_count}개")
+    result = import_fixture(path, batch_size=batch_size)
+    print(f"✅ 카테고리 임포트 완료: {result['category']}개")
+    print(f"✅ 도서관 임포트 완료: {result['library']}개")
+    print(f"✅ 도서 임포트 완료: {result['book']}개")
+    return result
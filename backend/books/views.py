@@ -1,13 +1,31 @@
+import json
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, generics
-from rest_framework.permissions import AllowAny
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from .models import Book, Recommendation, Category, Library, UserBookStock
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+from .models import Book, Recommendation, RecommendationJob, Category, Library, UserBookStock
 from .serializers import RecommendationSerializer, BookSerializer, BookListSerializer, CategorySerializer, LibrarySerializer 
-from .utils import generate_ai_recommendations
+from .utils import get_fallback_recommendations, stream_ai_recommendations
+from .jobs import request_recommendation_refresh, claim_pending_job, finish_job, fail_job
+from .search import search_books
+from .pagination import BookPagination, BookKeysetPagination
+from .cache import cache_stats
+from .suggest import suggest_index, DEFAULT_LIMIT, MAX_LIMIT
+from . import similarity
+from .cooccurrence import cooccurrence, DEFAULT_LIMIT as COOCCURRENCE_DEFAULT_LIMIT, MAX_LIMIT as COOCCURRENCE_MAX_LIMIT
+
+def _recommendations_stale(recommendations):
+    """최신 추천이 RECOMMENDATION_MAX_AGE보다 오래됐는지"""
+    max_age = timedelta(seconds=getattr(settings, 'RECOMMENDATION_MAX_AGE', 7 * 24 * 3600))
+    return recommendations[0].created_at < timezone.now() - max_age
 
 # 1. AI 추천 뷰 
 class RecommendationView(APIView):
@@ -16,20 +34,102 @@ class RecommendationView(APIView):
     def get(self, request):
         user = request.user
         # 최신 순으로 5개 가져오기
-        recommendations = Recommendation.objects.filter(user=user).order_by('-created_at')[:5]
+        recommendations = list(
+            Recommendation.objects.filter(user=user).select_related('book__category').order_by('-created_at')[:5]
+        )
         
-        # 1. 추천 데이터가 아예 없는 경우에만 실시간 생성 (force_update=False)
-        if not recommendations.exists():
-            success = generate_ai_recommendations(user, force_update=False)
-            if success:
-                recommendations = Recommendation.objects.filter(user=user).order_by('-created_at')[:5]
-            else:
-                return Response({"error": "AI 추천을 생성할 수 없습니다."}, status=500)
+        # 1. 추천 데이터가 없으면 AI 생성을 기다리지 않고 선호 장르 인기 도서로 바로 응답 (pending: true)
+        #    AI 추천 생성은 작업 큐 워커가 백그라운드에서 처리
+        if not recommendations:
+            request_recommendation_refresh(user)
+            recommendations = get_fallback_recommendations(user)
+
+        # 2. 오래된 추천은 그대로 응답하고 백그라운드에서 갱신
+        elif _recommendations_stale(recommendations):
+            request_recommendation_refresh(user)
         
-        # 2. 결과 반환 
+        # 3. 결과 반환 
         serializer = RecommendationSerializer(recommendations, many=True, context={'request': request})
         return Response(serializer.data)
 
+class EventStreamRenderer(BaseRenderer):
+    """Accept: text/event-stream 요청을 받기 위한 렌더러 (인증 오류 등 일반 응답은 JSON 본문으로)"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+def _sse(event, data):
+    """SSE 이벤트 1건 (data는 한 줄 JSON)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 1-1. AI 추천 스트리밍 뷰 (SSE)
+class RecommendationStreamView(APIView):
+    """
+    추천을 Server-Sent Events로 전송. 저장된 추천이 최신이면 바로 보내고,
+    없거나 오래됐으면 LLM 스트리밍으로 생성하면서 추천이 해석되는 대로 1건씩 보낸다.
+    이벤트: recommendation (1건) → done (저장된 최종 목록, GET /recommendations/와 같은 형식) 또는 error
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        response = StreamingHttpResponse(self._events(request), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # 프록시가 버퍼링하지 않고 바로 전달
+        return response
+
+    def _events(self, request):
+        user = request.user
+        context = {'request': request}
+        yield ": connected\n\n"  # 헤더를 바로 내보내 연결 확인
+
+        # 1. 최신 추천이 있으면 생성 없이 그대로 전송
+        stored = list(Recommendation.objects.filter(user=user).select_related('book__category').order_by('-created_at')[:5])
+        if stored and not _recommendations_stale(stored):
+            data = RecommendationSerializer(stored, many=True, context=context).data
+            for item in data:
+                yield _sse('recommendation', item)
+            yield _sse('done', data)
+            return
+
+        # 2. 대기 중인 추천 작업이 있으면 워커 대신 이 요청이 가져가서 바로 생성
+        job = claim_pending_job(user)
+        error = None  # None: 중단(클라이언트 연결 끊김), '': 완료, 그 외: 오류 메시지
+        try:
+            for rec in stream_ai_recommendations(user):
+                yield _sse('recommendation', {
+                    'book': BookListSerializer(rec.book, context=context).data,
+                    'reason': rec.reason,
+                    'pending': False,
+                })
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        else:
+            error = ''
+        finally:
+            # 연결이 끊겨 끝내지 못한 작업은 워커가 다시 처리하도록 되돌린다
+            if error is None and job is not None:
+                fail_job(job, "스트리밍 중단")
+
+        # 3. 실패하면 작업 큐에서 재시도
+        if error:
+            print(f"❌ AI 추천 스트리밍 오류: {error}")
+            if job is not None:
+                fail_job(job, error)
+            else:
+                request_recommendation_refresh(user)
+            yield _sse('error', {'error': 'AI 추천을 생성할 수 없습니다.'})
+            return
+
+        # 4. 저장된 최종 목록 전송
+        if job is not None:
+            finish_job(job, RecommendationJob.DONE)
+        saved = Recommendation.objects.filter(user=user).select_related('book__category').order_by('-created_at')[:5]
+        yield _sse('done', RecommendationSerializer(saved, many=True, context=context).data)
+
 # 2. 도서 액션 뷰 (희망도서/소장도서)
 class BookActionView(APIView):
 
@@ -63,11 +163,6 @@ class BookActionView(APIView):
 
         return Response({"message": message}, status=status.HTTP_200_OK)
 
-class BookPagination(PageNumberPagination):
-    page_size = 100             # 한 페이지당 100권
-    page_size_query_param = 'page_size' # 프론트에서 ?page_size= 로 조절 가능
-    max_page_size = 200
-
 # 도서 검색 및 목록 조회 
 class BookListView(APIView):
     def get(self, request):
@@ -90,25 +185,36 @@ class BookListView(APIView):
                 # 로그인 안 되어있으면 빈 목록 반환
                 return Response({"results": [], "count": 0})
 
-        # 2-2. 검색 필터링 (기존 코드)
+        # 2-2. 검색 필터링 (FTS 인덱스 사용, 불가능하면 icontains로 대체)
+        ranked = False
         if query:
-            books = books.filter(
-                Q(title__icontains=query) | Q(author__icontains=query)
-            )
+            books, ranked = search_books(books, query)
 
         # 3. 카테고리 필터링 (기존 코드)
         if category_id:
             books = books.filter(category_id=category_id)
 
-        # 4. 정렬 (기존 코드)
-        if sort == 'popular':
-            books = books.order_by('-loan_count', '-id')
+        # 4. 정렬 (검색 중 인기순은 관련도 + 대출 건수를 섞은 점수로 정렬)
+        ordering = None
+        if sort == 'popular' and ranked:
+            ordering = ['-search_score', '-loan_count', '-id']
+        elif sort == 'popular':
+            ordering = ['-loan_count', '-id']
         elif sort == 'latest':
-            books = books.order_by('-pub_year', '-id')
+            ordering = ['-pub_year', '-id']
+        if ordering:
+            books = books.order_by(*ordering)
 
         # 5. 페이지네이션 적용
-        paginator = BookPagination()
-        result_page = paginator.paginate_queryset(books, request)
+        # ?pagination=cursor 또는 ?cursor= 가 오면 커서(keyset) 방식, 그 외(?page=)는 기존 페이지 번호 방식
+        if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+            paginator = BookKeysetPagination()
+            result_page = paginator.paginate_queryset(
+                books, request, ordering=ordering or ['-id'], nullable=['pub_year']
+            )
+        else:
+            paginator = BookPagination()
+            result_page = paginator.paginate_queryset(books, request)
         
         # [수정] 목록용 시리얼라이저에 context 추가 
         # (그래야 Serializer 안에서 request.user를 인식해 is_owned 필드를 채울 수 있습니다)
@@ -116,7 +222,52 @@ class BookListView(APIView):
         
         return paginator.get_paginated_response(serializer.data)
 
-# 도서 정보 상세 조회 
+# 검색어 자동완성 (완성형/초성 접두어, 대출 건수 순)
+class BookSuggestView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        return Response(suggest_index.suggest(query, limit=max(limit, 1)))
+
+def _limit_param(request, default, maximum):
+    try:
+        return max(min(int(request.query_params.get('limit', default)), maximum), 1)
+    except ValueError:
+        return default
+
+def _scored_book_list(request, scored, score_key):
+    """[(book_id, 점수)] 순서를 유지하며 한 번에 조회해 목록 형식으로 직렬화 (그 사이 삭제된 도서는 빠짐)"""
+    books = Book.objects.filter(id__in=[book_id for book_id, _ in scored]).select_related('category').in_bulk()
+    ordered = [(books[book_id], score) for book_id, score in scored if book_id in books]
+    data = BookListSerializer([b for b, _ in ordered], many=True, context={'request': request}).data
+    for item, (_, score) in zip(data, ordered):
+        item[score_key] = round(score, 4)
+    return data
+
+# 비슷한 도서 (로컬 TF-IDF 유사도, LLM 호출 없음)
+class BookSimilarView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, isbn):
+        book = get_object_or_404(Book, isbn=isbn)
+        limit = _limit_param(request, similarity.DEFAULT_LIMIT, similarity.MAX_LIMIT)
+        scored = similarity.similarity_index.similar(book.id, k=limit) or []
+        return Response(_scored_book_list(request, scored, 'similarity'))
+
+# 이 책을 찜/소장/대화한 사람들이 함께 찜/소장/대화한 도서 (동시 출현 기반)
+class BookAlsoWantedView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, isbn):
+        book = get_object_or_404(Book, isbn=isbn)
+        limit = _limit_param(request, COOCCURRENCE_DEFAULT_LIMIT, COOCCURRENCE_MAX_LIMIT)
+        return Response(_scored_book_list(request, cooccurrence.related(book.id, k=limit), 'score'))
+
 # 도서 정보 상세 조회 
 class BookDetailView(APIView):
     permission_classes = [AllowAny]
@@ -175,3 +326,10 @@ class LibraryListView(generics.ListAPIView):
                 Q(lib_name__icontains=query) | Q(address__icontains=query)
             )
         return queryset[:50]
+
+class CacheStatsView(APIView):
+    """메모리 캐시 적중/미스 카운터 (운영 모니터링용, 관리자 전용)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db import DatabaseError
+
+from .suggest import suggest_index
+from .geo import library_index
+from .candidates import candidate_pool
+from .similarity import similarity_index
+from .cooccurrence import cooccurrence
+from .jobs import start_embedded_worker
+
+
+def warm_up():
+    """서버 프로세스 시작 시 메모리 인덱스를 미리 만들어 첫 요청 지연을 없앤다"""
+    try:
+        suggest_index.ensure_built()
+        library_index.ensure_built()
+        candidate_pool.ensure_built()
+        similarity_index.ensure_loaded()
+        cooccurrence.ensure_built()
+    except DatabaseError as e:
+        # 마이그레이션 전 등 테이블이 없으면 첫 요청 때 다시 시도
+        print(f"⚠️ 인덱스 예열 실패: {e}")
+
+    # 별도 워커 프로세스 없이 운영하는 경우 추천 작업 워커를 웹 프로세스 안에서 실행
+    if getattr(settings, 'RECOMMENDATION_WORKER_EMBEDDED', False):
+        start_embedded_worker()
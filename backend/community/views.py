@@ -31,7 +31,7 @@ class MyActivityListView(APIView):
 
     def get(self, request):
         # 1. 내가(request.user) 메시지(messages)를 남긴 책들을 중복 없이(distinct) 가져옴
-        books = Book.objects.filter(messages__user=request.user).distinct()
+        books = Book.objects.filter(messages__user=request.user).distinct().select_related('category')
         
         # 2. 기존에 쓰던 책 목록 시리얼라이저로 예쁘게 포장
         serializer = BookListSerializer(books, many=True, context={'request': request})
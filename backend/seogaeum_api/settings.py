@@ -14,6 +14,55 @@ DEBUG = True
 LIBRARY_API_KEY = os.getenv("LIBRARY_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# OpenAI 호출 게이트웨이 (AI 추천)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://gms.ssafy.io/gmsapi/api.openai.com/v1")
+OPENAI_MODEL = "gpt-4o-mini"
+LLM_TIMEOUT = 20                  # 호출 1건 타임아웃 (초)
+LLM_MAX_RETRIES = 1               # 클라이언트 자체 재시도 횟수
+LLM_MAX_CONCURRENCY = 4           # 프로세스당 동시 호출 수
+LLM_CACHE_TTL = 6 * 3600          # 같은 프롬프트 응답 재사용 시간 (초)
+LLM_CACHE_MAXSIZE = 2048
+
+# 도서관정보나루 수집 작업
+DATA4LIBRARY_RATE_LIMIT = 8  # 초당 최대 API 호출 수 (수집 작업 전체 공유)
+SYNC_WORKERS = 8             # 수집 작업 동시 호출 스레드 수
+DATA4LIBRARY_POOL_SIZE = 32  # 공용 HTTP 커넥션 풀 크기 (keep-alive)
+
+# 도서관정보나루 녹화/재생 (오프라인 벤치마크용)
+# live: 실제 호출 / record: 실제 호출 + 응답 저장 / replay: 저장된 응답으로 응답 (네트워크 없음)
+DATA4LIBRARY_MODE = os.getenv("DATA4LIBRARY_MODE", "live")
+DATA4LIBRARY_CASSETTE_DIR = os.getenv("DATA4LIBRARY_CASSETTE_DIR", str(BASE_DIR / "fixtures" / "data4library"))
+DATA4LIBRARY_REPLAY_LATENCY = float(os.getenv("DATA4LIBRARY_REPLAY_LATENCY", "0"))        # 평균 지연 (초)
+DATA4LIBRARY_REPLAY_JITTER = float(os.getenv("DATA4LIBRARY_REPLAY_JITTER", "0"))          # 지연 ± 범위 (초)
+DATA4LIBRARY_REPLAY_ERROR_RATE = float(os.getenv("DATA4LIBRARY_REPLAY_ERROR_RATE", "0"))  # 오류 주입 확률 (0~1)
+DATA4LIBRARY_REPLAY_FALLBACK = True  # 같은 요청의 녹화가 없으면 같은 API의 다른 응답으로 대체
+
+# 도서관 실시간 소장 조회 (bookExist)
+LIBRARY_STATUS_TIMEOUT = 1.5     # 도서관 1곳 호출 타임아웃 (초)
+LIBRARY_STATUS_DEADLINE = 2.0    # 상세 페이지 1회당 전체 마감 시간 (초)
+LIBRARY_STATUS_MAX_WORKERS = 16  # 동시 호출 스레드 수 (프로세스 공용)
+BOOK_EXIST_CACHE_TTL = 60          # 캐시 값을 그대로 쓰는 시간 (초)
+BOOK_EXIST_CACHE_STALE_TTL = 600   # TTL 이후에도 응답하면서 백그라운드 갱신하는 시간 (초)
+BOOK_EXIST_CACHE_MAXSIZE = 10000   # (도서관, ISBN) 최대 항목 수 (LRU 제거)
+
+# 유사 도서 엔진 모델 저장 위치 (TF-IDF 희소 행렬 .npy, 서버 시작 시 memory-map)
+SIMILARITY_MODEL_DIR = BASE_DIR / "var" / "similarity"
+
+# AI 추천 생성 작업 큐 (워커: python manage.py recommendation_worker)
+RECOMMENDATION_WORKERS = 2                # 워커 프로세스의 동시 처리 스레드 수
+RECOMMENDATION_JOB_DEBOUNCE = 5           # 같은 사용자의 연속 요청을 모으는 대기 시간 (초)
+RECOMMENDATION_JOB_MAX_ATTEMPTS = 4       # 실패 시 최대 시도 횟수
+RECOMMENDATION_JOB_BACKOFF = 30           # 재시도 대기 기본값 (초, 시도마다 2배)
+RECOMMENDATION_JOB_TIMEOUT = 300          # 이 시간 넘게 실행 중이면 워커 중단으로 보고 재시도 (초)
+RECOMMENDATION_JOB_RETENTION_DAYS = 7     # 완료/실패 작업 보관 기간
+RECOMMENDATION_MAX_AGE = 7 * 24 * 3600    # 추천 조회 시 이보다 오래된 추천은 응답 후 백그라운드 갱신 (초)
+RECOMMENDATION_REFRESH_COOLDOWN = 600     # 조회로 인한 갱신 요청 최소 간격 (초, 실패 반복 방지)
+RECOMMENDATION_PRECOMPUTE_ACTIVE_DAYS = 30  # 야간 일괄 사전 계산 대상: 이 기간 안에 로그인한 사용자 (일)
+RECOMMENDATION_PRECOMPUTE_BATCH_SIZE = 500  # 사전 계산 결과를 한 트랜잭션에 저장하는 사용자 수
+# 웹 프로세스 안에서 워커 실행 (기본 꺼짐: recommendation_worker를 따로 실행해야 추천이 생성됨)
+# 켜도 인기 도서 스냅샷 갱신은 하지 않는다 (refresh_demographic_popularity 또는 별도 워커)
+RECOMMENDATION_WORKER_EMBEDDED = os.getenv("RECOMMENDATION_WORKER_EMBEDDED", "0") == "1"
+
 ALLOWED_HOSTS = []
 
 # Application definition
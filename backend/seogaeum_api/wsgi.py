@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "seogaeum_api.settings")
 
 application = get_wsgi_application()
+
+# 자동완성 등 메모리 인덱스 예열
+from books.warmup import warm_up  # noqa: E402
+
+warm_up()
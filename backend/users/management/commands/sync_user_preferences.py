@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "모든 유저의 관심 도서관/선호 장르 문자열을 Library/Category 관계로 다시 동기화합니다. (fixture 로딩 후 사용)"
+
+    def handle(self, *args, **options):
+        count = 0
+        for user in User.objects.iterator():
+            user.sync_preference_relations()
+            count += 1
+        self.stdout.write(f"✅ {count}명 동기화 완료")
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+def _split_csv(value):
+    return [v.strip() for v in (value or '').split(',') if v.strip()]
+
+
+def convert_preference_strings(apps, schema_editor):
+    """기존 쉼표 구분 문자열을 Library(이름 일치)/Category(부분 일치) 관계로 변환"""
+    User = apps.get_model('users', 'User')
+    Library = apps.get_model('books', 'Library')
+    Category = apps.get_model('books', 'Category')
+    categories = list(Category.objects.all())
+
+    for user in User.objects.all():
+        names = _split_csv(user.favorite_libraries)
+        if names:
+            user.frequent_libraries.set(Library.objects.filter(lib_name__in=names))
+        genres = [g.lower() for g in _split_csv(user.preferred_genres)]
+        if genres:
+            user.preferred_categories.set(
+                [c for c in categories if any(g in c.name.lower() for g in genres)]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_book_sort_indexes'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='frequent_libraries',
+            field=models.ManyToManyField(blank=True, related_name='frequent_users', to='books.library', verbose_name='자주 이용하는 공공도서관 (정규화)'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='preferred_categories',
+            field=models.ManyToManyField(blank=True, related_name='preferred_users', to='books.category', verbose_name='선호 카테고리 (정규화)'),
+        ),
+        migrations.RunPython(convert_preference_strings, migrations.RunPython.noop),
+    ]
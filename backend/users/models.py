@@ -3,6 +3,18 @@ from django.core.validators import MinLengthValidator
 from django.core.exceptions import ValidationError
 from django.db import models
 
+# 정규화된 관계(frequent_libraries/preferred_categories)의 원본 문자열 필드
+PREFERENCE_FIELDS = ('favorite_libraries', 'preferred_genres')
+
+def split_csv(value):
+    """"서초구립반포도서관, 국립중앙도서관" -> ["서초구립반포도서관", "국립중앙도서관"]"""
+    return [v.strip() for v in (value or '').split(',') if v.strip()]
+
+def match_categories(categories, genres):
+    """선호 장르 문자열과 이름이 (부분) 일치하는 카테고리 목록 (기존 icontains 검색과 같은 기준)"""
+    genres = [g.lower() for g in genres]
+    return [c for c in categories if any(g in c.name.lower() for g in genres)]
+
 # 이메일을 로그인 ID로 사용하기 위한 커스텀 매니저 
 class UserManager(BaseUserManager):
     # 일반 사용자 생성 로직 
@@ -56,6 +68,17 @@ class User(AbstractUser):
             verbose_name="선호 카테고리"
         )
     
+    # 위 문자열을 정규화한 관계 (저장 시 signals에서 자동 동기화, API 응답은 기존 문자열 그대로)
+    # 관심 도서관 조회와 "이 도서관을 자주 이용하는 유저" 역조회를 인덱스 조인으로 처리
+    frequent_libraries = models.ManyToManyField(
+        'books.Library', related_name='frequent_users', blank=True,
+        verbose_name="자주 이용하는 공공도서관 (정규화)"
+    )
+    preferred_categories = models.ManyToManyField(
+        'books.Category', related_name='preferred_users', blank=True,
+        verbose_name="선호 카테고리 (정규화)"
+    )
+
     # 사용자의 위치 정보 
     latitude = models.FloatField(null=True, blank=True, verbose_name="위도")
     longitude = models.FloatField(null=True, blank=True, verbose_name="경도")
@@ -70,6 +93,27 @@ class User(AbstractUser):
         if not self.preferred_genres or self.preferred_genres.strip() == "":
             raise ValidationError({'preferred_genres': "선호 장르 정보가 비어있습니다."})
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # DB에서 읽은 시점의 취향 문자열 (지연 로딩된 필드는 없음 → 바뀐 것으로 간주)
+        instance._loaded_preferences = {f: instance.__dict__[f] for f in PREFERENCE_FIELDS if f in instance.__dict__}
+        return instance
+
+    def preferences_changed(self):
+        """DB에서 읽은 뒤 관심 도서관/선호 장르 문자열이 바뀌었는지 (새로 만든 객체면 True)"""
+        loaded = getattr(self, '_loaded_preferences', None)
+        if loaded is None:
+            return True
+        return any(f not in loaded or loaded[f] != getattr(self, f) for f in PREFERENCE_FIELDS)
+
+    def sync_preference_relations(self):
+        """문자열로 저장된 관심 도서관/선호 장르를 Library/Category 관계로 변환해 저장"""
+        from books.models import Library, Category
+        self.frequent_libraries.set(Library.objects.filter(lib_name__in=split_csv(self.favorite_libraries)))
+        self.preferred_categories.set(match_categories(Category.objects.all(), split_csv(self.preferred_genres)))
+        self._loaded_preferences = {f: getattr(self, f) for f in PREFERENCE_FIELDS}
+
     USERNAME_FIELD = 'email'  # 로그인 ID로 email 사용
     REQUIRED_FIELDS = ['nickname', 'age_group', 'gender', 'favorite_libraries', 'preferred_genres']  # superuser 생성 시 필수 입력 필드
 
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import PREFERENCE_FIELDS, User
+
+
+# 관심 도서관/선호 장르 문자열이 저장되면 정규화된 관계도 함께 갱신
+@receiver(post_save, sender=User)
+def sync_user_preferences(sender, instance, raw=False, update_fields=None, **kwargs):
+    # fixture 로딩 중에는 도서관/카테고리가 아직 없을 수 있으므로 건너뜀 (sync_user_preferences 명령으로 보정)
+    if raw:
+        return
+    # 로그인 시각 갱신처럼 취향과 무관한 저장은 건너뜀
+    if update_fields is not None and not set(PREFERENCE_FIELDS) & set(update_fields):
+        return
+    # 취향 문자열이 읽어온 값 그대로면 관계를 다시 만들지 않음 (카테고리 전체 조회 + M2M 재설정 생략)
+    if not instance.preferences_changed():
+        return
+    instance.sync_preference_relations()
@@ -1,3 +1,71 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from books.models import Book, UserBookStock
+
+
+class OwnersDistanceSortTests(TestCase):
+    """판매자 목록: 기본은 기존 순서/형식, ?sort=distance일 때만 거리순 + distance 필드"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+
+        def make_user(name, lat, lon):
+            return User.objects.create_user(
+                email=f'{name}@example.com', password='pw-12345678', nickname=name,
+                favorite_libraries='', age_group='20s', gender='F', preferred_genres='',
+                latitude=lat, longitude=lon,
+            )
+
+        cls.me = make_user('me', 37.50, 127.04)
+        book = Book.objects.create(title='책', author='저자', publisher='출판사', isbn='9780000000001')
+        # 먼 판매자, 위치 없는 판매자, 가까운 판매자 순으로 등록
+        for user in (make_user('busan', 35.18, 129.08), make_user('nowhere', None, None), make_user('near', 37.51, 127.05)):
+            UserBookStock.objects.create(user=user, book=book, selling_price=5000)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def test_default_keeps_baseline_payload(self):
+        response = self.client.get('/api/v1/users/9780000000001/owners/')
+        self.assertEqual([o['nickname'] for o in response.json()], ['busan', 'nowhere', 'near'])
+        self.assertTrue(all('distance' not in o for o in response.json()))
+
+    def test_sort_distance_orders_nearest_first(self):
+        response = self.client.get('/api/v1/users/9780000000001/owners/', {'sort': 'distance'})
+        owners = response.json()
+        self.assertEqual([o['nickname'] for o in owners], ['near', 'busan', 'nowhere'])
+        self.assertLess(owners[0]['distance'], 2)
+        self.assertIsNone(owners[2]['distance'])
+
+
+class PreferenceSyncTests(TestCase):
+    """취향 문자열이 바뀐 저장에서만 정규화된 관계를 다시 만든다"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from books.models import Category
+        cls.novel = Category.objects.create(name='문학')
+        cls.history = Category.objects.create(name='역사')
+        cls.user = get_user_model().objects.create_user(
+            email='pref@example.com', password='pw-12345678', nickname='pref',
+            favorite_libraries='', age_group='20s', gender='F', preferred_genres='문학',
+        )
+
+    def test_unchanged_preferences_skip_sync(self):
+        user = get_user_model().objects.get(id=self.user.id)
+        user.nickname = 'renamed'
+        with self.assertNumQueries(1):  # UPDATE만
+            user.save()
+
+    def test_changed_preferences_resync_relations(self):
+        user = get_user_model().objects.get(id=self.user.id)
+        self.assertEqual(list(user.preferred_categories.all()), [self.novel])
+        user.preferred_genres = '역사'
+        user.save()
+        self.assertEqual(list(user.preferred_categories.all()), [self.history])
+        with self.assertNumQueries(1):
+            user.save()
@@ -1,4 +1,3 @@
-import threading    # AI 추천 생성을 백그라운드에서 처리 
 from rest_framework import status, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -10,8 +9,9 @@ from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
 from books.models import Book, UserBookStock
 
-# books 앱의 utils에서 AI 추천 함수 임포트
-from books.utils import generate_ai_recommendations
+from books.geo import rank_by_distance
+# AI 추천 생성은 작업 큐에 등록하고 워커가 처리
+from books.jobs import enqueue_recommendation
 
 from .serializers import (
     UserRegistrationSerializer, 
@@ -30,8 +30,8 @@ class UserRegistrationView(generics.CreateAPIView):
         user = serializer.save()
         update_last_login(None, user)
 
-        # 회원가입 성공 후 백그라운드에서 AI 추천 생성
-        threading.Thread(target=generate_ai_recommendations, args=(user, True)).start()
+        # 회원가입 성공 후 AI 추천 생성 작업 등록 (워커가 백그라운드에서 처리)
+        enqueue_recommendation(user, force=True)
 
         # JWT 토큰 생성
         refresh = RefreshToken.for_user(user)
@@ -111,8 +111,8 @@ class UserProfileUpdateView(generics.UpdateAPIView):
             serializer.is_valid(raise_exception=True)
             user = serializer.save() # 수정된 유저 객체 저장
 
-            # 프로필 정보(나이, 성별, 선호장르 등)가 변경되었으므로 추천 강제 갱신
-            threading.Thread(target=generate_ai_recommendations, args=(user, True)).start()
+            # 프로필 정보(나이, 성별, 선호장르 등)가 변경되었으므로 추천 강제 갱신 (연속 수정은 작업 1건으로 합쳐짐)
+            enqueue_recommendation(user, force=True)
 
             return Response({
                 'message': '프로필이 수정되었습니다.',
@@ -186,7 +186,7 @@ def get_owners(request, isbn):
         if request.user.is_authenticated:
             queryset = queryset.exclude(id__in=UserBookStock.objects.filter(user=request.user, book__isbn=isbn))
             
-        owners_stock = queryset.select_related('user')
+        owners_stock = list(queryset.select_related('user'))
         
         results = []
         for s in owners_stock:
@@ -196,6 +196,27 @@ def get_owners(request, isbn):
                 'price': s.selling_price,
                 'libraries': s.user.favorite_libraries 
             })
+
+        # 3. ?sort=distance면 가까운 판매자 순으로 정렬하고 distance(km) 추가 (위치 정보가 있는 유저만, 기본은 기존 순서/형식)
+        me = request.user
+        if (request.query_params.get('sort') == 'distance' and me.is_authenticated
+                and me.latitude is not None and me.longitude is not None):
+            located = [i for i, s in enumerate(owners_stock) if s.user.latitude is not None and s.user.longitude is not None]
+            order, distances = rank_by_distance(
+                me.latitude, me.longitude,
+                [owners_stock[i].user.latitude for i in located], [owners_stock[i].user.longitude for i in located],
+            )
+            ranked = []
+            for j in order:
+                item = results[located[j]]
+                item['distance'] = round(float(distances[j]), 2)
+                ranked.append(item)
+            located_set = set(located)
+            for i, item in enumerate(results):
+                if i not in located_set:
+                    item['distance'] = None
+                    ranked.append(item)
+            results = ranked
             
         return Response(results, status=status.HTTP_200_OK)
         